@@ -0,0 +1,197 @@
+from operator import attrgetter
+from typing import Callable, Dict, List, Type
+
+from jsondoc.convert.placeholder import (
+    BreakElementPlaceholderBlock,
+    CaptionPlaceholderBlock,
+    CellPlaceholderBlock,
+    FigurePlaceholderBlock,
+    PlaceholderBlockBase,
+)
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.block.types.bulleted_list_item import BulletedListItemBlock
+from jsondoc.models.block.types.code import CodeBlock
+from jsondoc.models.block.types.column import ColumnBlock
+from jsondoc.models.block.types.column_list import ColumnListBlock
+from jsondoc.models.block.types.divider import DividerBlock
+from jsondoc.models.block.types.equation import EquationBlock
+from jsondoc.models.block.types.heading_1 import Heading1Block
+from jsondoc.models.block.types.heading_2 import Heading2Block
+from jsondoc.models.block.types.heading_3 import Heading3Block
+from jsondoc.models.block.types.image import ImageBlock
+from jsondoc.models.block.types.numbered_list_item import NumberedListItemBlock
+from jsondoc.models.block.types.paragraph import ParagraphBlock
+from jsondoc.models.block.types.quote import QuoteBlock
+from jsondoc.models.block.types.rich_text.base import RichTextBase
+from jsondoc.models.block.types.table import TableBlock
+from jsondoc.models.block.types.table_row import TableRowBlock
+from jsondoc.models.block.types.to_do import ToDoBlock
+from jsondoc.models.block.types.toggle import ToggleBlock
+
+BLOCKS_WITH_RICH_TEXT: List[Type[BlockBase]] = [
+    ParagraphBlock,
+    CodeBlock,
+    Heading1Block,
+    Heading2Block,
+    Heading3Block,
+    QuoteBlock,
+    BulletedListItemBlock,
+    NumberedListItemBlock,
+    ToDoBlock,
+    ToggleBlock,
+]
+
+PLACEHOLDER_BLOCKS_WITH_RICH_TEXT: List[Type[PlaceholderBlockBase]] = [
+    CaptionPlaceholderBlock,
+    CellPlaceholderBlock,
+]
+
+BLOCKS_WITH_CAPTION: List[Type[BlockBase]] = [
+    CodeBlock,
+    ImageBlock,
+]
+
+# Cell fields are nested lists of rich texts
+BLOCKS_WITH_CELLS: List[Type[BlockBase]] = [
+    TableRowBlock,
+]
+
+BLOCKS_WITHOUT_TEXT: List[Type[BlockBase]] = [
+    ColumnBlock,
+    ColumnListBlock,
+    DividerBlock,
+    EquationBlock,
+    TableBlock,
+    BreakElementPlaceholderBlock,
+    FigurePlaceholderBlock,
+]
+
+
+def _get_block_field_name(block_class: Type[BlockBase]) -> str:
+    """
+    Returns the name of the field that contains the block type specific
+    data, which is the same as the block type, e.g. "paragraph"
+    """
+    return block_class.model_fields["type"].default
+
+
+def _make_rich_text_getter(
+    container_getter: Callable | None,
+) -> Callable[[BlockBase], List[RichTextBase]]:
+    """
+    Returns a getter that initializes the rich text to an empty list if it is None.
+    If container_getter is None, the rich text is a field of the block itself.
+    """
+    if container_getter is None:
+
+        def get_rich_text(block: BlockBase) -> List[RichTextBase]:
+            if block.rich_text is None:
+                block.rich_text = []
+            return block.rich_text
+
+    else:
+
+        def get_rich_text(block: BlockBase) -> List[RichTextBase]:
+            container = container_getter(block)
+            if container.rich_text is None:
+                container.rich_text = []
+            return container.rich_text
+
+    return get_rich_text
+
+
+class BlockTextAccessors:
+    """
+    Field paths and precomputed getters for the rich text, caption and cell
+    fields of a block class. Paths are in the format accepted by
+    compile_path, e.g. ".paragraph.rich_text", and are None if the block
+    class does not have the field, in which case the getter is None too.
+
+    get_rich_text initializes an unset rich text to an empty list,
+    get_caption and get_cells return the field as is and can return None.
+    """
+
+    __slots__ = [
+        "block_class",
+        "rich_text_path",
+        "caption_path",
+        "cells_path",
+        "get_rich_text",
+        "get_caption",
+        "get_cells",
+    ]
+
+    def __init__(
+        self,
+        block_class: Type[BlockBase],
+        rich_text: bool = False,
+        caption: bool = False,
+        cells: bool = False,
+    ):
+        self.block_class = block_class
+        self.rich_text_path = None
+        self.caption_path = None
+        self.cells_path = None
+        self.get_rich_text = None
+        self.get_caption = None
+        self.get_cells = None
+
+        if not (rich_text or caption or cells):
+            return
+
+        is_placeholder = issubclass(block_class, PlaceholderBlockBase)
+        field_name = None if is_placeholder else _get_block_field_name(block_class)
+
+        if rich_text:
+            if is_placeholder:
+                self.rich_text_path = ".rich_text"
+                self.get_rich_text = _make_rich_text_getter(None)
+            else:
+                self.rich_text_path = f".{field_name}.rich_text"
+                self.get_rich_text = _make_rich_text_getter(attrgetter(field_name))
+
+        if caption:
+            self.caption_path = f".{field_name}.caption"
+            self.get_caption = attrgetter(f"{field_name}.caption")
+
+        if cells:
+            self.cells_path = f".{field_name}.cells"
+            self.get_cells = attrgetter(f"{field_name}.cells")
+
+
+def _build_block_text_accessors() -> Dict[Type[BlockBase], BlockTextAccessors]:
+    block_classes = (
+        BLOCKS_WITH_RICH_TEXT
+        + PLACEHOLDER_BLOCKS_WITH_RICH_TEXT
+        + BLOCKS_WITH_CAPTION
+        + BLOCKS_WITH_CELLS
+        + BLOCKS_WITHOUT_TEXT
+    )
+    # dict.fromkeys() removes duplicates while keeping the order
+    return {
+        block_class: BlockTextAccessors(
+            block_class,
+            rich_text=block_class in BLOCKS_WITH_RICH_TEXT
+            or block_class in PLACEHOLDER_BLOCKS_WITH_RICH_TEXT,
+            caption=block_class in BLOCKS_WITH_CAPTION,
+            cells=block_class in BLOCKS_WITH_CELLS,
+        )
+        for block_class in dict.fromkeys(block_classes)
+    }
+
+
+# Maps each block class to its text accessors. Lookups are by exact type,
+# so that a single dict lookup replaces chains of isinstance checks.
+BLOCK_TEXT_ACCESSORS: Dict[Type[BlockBase], BlockTextAccessors] = (
+    _build_block_text_accessors()
+)
+
+_NO_ACCESSORS = BlockTextAccessors(BlockBase)
+
+
+def get_block_text_accessors(block: BlockBase) -> BlockTextAccessors:
+    """
+    Returns the text accessors of a block. For unknown block types,
+    returns accessors whose paths and getters are all None.
+    """
+    return BLOCK_TEXT_ACCESSORS.get(type(block), _NO_ACCESSORS)
@@ -0,0 +1,438 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, TextIO, Tuple
+
+from jsondoc.utils.cache import ConversionCache, get_converter_fingerprint
+
+# Source formats inferred from file extensions in batch mode. Files with other
+# extensions are converted with pandoc, which infers their format itself.
+EXTENSION_FORMATS = {
+    "html": "html",
+    "htm": "html",
+    "json": "jsondoc",
+    "md": "markdown",
+    "markdown": "markdown",
+}
+
+TARGET_EXTENSIONS = {
+    "jsondoc": ".json",
+    "markdown": ".md",
+}
+
+N_SLOWEST_FILES = 5
+
+# File in the output directory with the key of the options that its outputs
+# were converted with, see get_options_key()
+OPTIONS_FILE = ".jsondoc-batch-options"
+
+
+class BatchResult:
+    """
+    Result of converting a single file in batch mode
+    """
+
+    __slots__ = ["input_file", "output_file", "seconds", "n_bytes", "error", "cached"]
+
+    def __init__(
+        self,
+        input_file: str,
+        output_file: str,
+        seconds: float = 0.0,
+        n_bytes: int = 0,
+        error: str | None = None,
+        cached: bool = False,
+    ):
+        self.input_file = input_file
+        self.output_file = output_file
+        self.seconds = seconds
+        self.n_bytes = n_bytes
+        self.error = error
+        self.cached = cached
+
+
+class BatchSummary:
+    """
+    Results of a batch conversion. Skipped files had up-to-date outputs.
+    """
+
+    def __init__(self):
+        self.converted: List[BatchResult] = []
+        self.failed: List[BatchResult] = []
+        self.skipped: List[str] = []
+        self.seconds = 0.0
+
+    def add(self, result: BatchResult) -> None:
+        if result.error is None:
+            self.converted.append(result)
+        else:
+            self.failed.append(result)
+
+    def format(self) -> str:
+        n_bytes = sum(result.n_bytes for result in self.converted)
+        n_cached = sum(result.cached for result in self.converted)
+        seconds = max(self.seconds, 1e-9)
+        lines = [
+            f"Converted {len(self.converted)} files ({n_cached} from the cache), "
+            f"skipped {len(self.skipped)} "
+            f"up-to-date files, {len(self.failed)} failed in {self.seconds:.2f}s "
+            f"({len(self.converted) / seconds:.1f} files/s, "
+            f"{n_bytes / seconds / 1e6:.2f} MB/s)"
+        ]
+
+        slowest = sorted(
+            [result for result in self.converted if not result.cached],
+            key=lambda result: -result.seconds,
+        )
+        if slowest:
+            lines.append("Slowest files:")
+            for result in slowest[:N_SLOWEST_FILES]:
+                lines.append(f"  {result.seconds:.3f}s {result.input_file}")
+
+        if self.failed:
+            lines.append("Failures:")
+            for result in self.failed:
+                lines.append(f"  {result.input_file}: {result.error}")
+
+        return "\n".join(lines)
+
+
+def get_source_format(input_file: str, source_format: str | None) -> str | None:
+    if source_format is not None:
+        return source_format
+    extension = os.path.splitext(input_file)[1][1:].lower()
+    return EXTENSION_FORMATS.get(extension)
+
+
+def get_output_file(
+    input_file: Path, input_dir: Path, output_dir: Path, target_format: str | None
+) -> Path:
+    extension = TARGET_EXTENSIONS[target_format or "jsondoc"]
+    return (output_dir / input_file.relative_to(input_dir)).with_suffix(extension)
+
+
+def get_options_key(source_format: str | None, options: dict) -> str:
+    """
+    Returns a hash of the conversion options and the converter fingerprint.
+    Outputs are only up to date if they were converted with the same key.
+    """
+    data = {
+        "source_format": source_format,
+        "options": options,
+        "converter": get_converter_fingerprint(),
+    }
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _read_options_key(output_dir: Path) -> str | None:
+    try:
+        return (output_dir / OPTIONS_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+
+
+def is_up_to_date(input_file: Path, output_file: Path) -> bool:
+    try:
+        return output_file.stat().st_mtime >= input_file.stat().st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _convert_file(
+    convert_fn: Callable,
+    input_file: str,
+    output_file: str,
+    source_format: str | None,
+    options: dict,
+) -> BatchResult:
+    """
+    Converts a single file, in a worker process or in the main process.
+    The output is written to a temporary file first, so that an interrupted
+    conversion never leaves an output that looks up to date.
+    """
+    start = time.perf_counter()
+    tmp_file = f"{output_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        convert_fn(
+            input_file,
+            tmp_file,
+            source_format=get_source_format(input_file, source_format),
+            **options,
+        )
+        os.replace(tmp_file, output_file)
+    except Exception as e:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return BatchResult(
+            input_file,
+            output_file,
+            seconds=time.perf_counter() - start,
+            error=f"{type(e).__name__}: {e}",
+        )
+
+    return BatchResult(
+        input_file,
+        output_file,
+        seconds=time.perf_counter() - start,
+        n_bytes=os.path.getsize(input_file),
+    )
+
+
+def _convert_files(
+    convert_many_fn: Callable,
+    tasks: List[Tuple[str, str]],
+    source_format: str | None,
+    options: dict,
+) -> List[BatchResult]:
+    """
+    Converts files together with convert_many_fn, in a worker process or in
+    the main process. The time of the batch is split evenly between its files.
+    """
+    start = time.perf_counter()
+    outputs: List[str | Exception | None] = [None] * len(tasks)
+    indices = []
+    documents = []
+    for idx, (input_file, _) in enumerate(tasks):
+        format = get_source_format(input_file, source_format)
+        content = None
+        # Without a format, pandoc reads the file to infer it from its extension
+        if format is not None:
+            try:
+                with open(input_file, "rb") as file:
+                    content = file.read()
+            except OSError as e:
+                outputs[idx] = e
+                continue
+        indices.append(idx)
+        documents.append((content, format, input_file))
+
+    for idx, output in zip(indices, convert_many_fn(documents, **options)):
+        outputs[idx] = output
+    seconds = (time.perf_counter() - start) / len(tasks)
+
+    results = []
+    for (input_file, output_file), output in zip(tasks, outputs):
+        tmp_file = f"{output_file}.{os.getpid()}.tmp"
+        try:
+            if isinstance(output, Exception):
+                raise output
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(tmp_file, "w", encoding="utf-8") as file:
+                file.write(output)
+            os.replace(tmp_file, output_file)
+        except Exception as e:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            results.append(
+                BatchResult(
+                    input_file,
+                    output_file,
+                    seconds=seconds,
+                    error=f"{type(e).__name__}: {e}",
+                )
+            )
+            continue
+        results.append(
+            BatchResult(
+                input_file,
+                output_file,
+                seconds=seconds,
+                n_bytes=os.path.getsize(input_file),
+            )
+        )
+    return results
+
+
+def convert_directory(
+    convert_fn: Callable,
+    input_dir: str,
+    output_dir: str,
+    glob: str = "*",
+    workers: int | None = None,
+    source_format: str | None = None,
+    target_format: str | None = None,
+    progress: TextIO | None = sys.stderr,
+    initializer: Callable | None = None,
+    initargs: tuple = (),
+    cache: ConversionCache | None = None,
+    convert_many_fn: Callable | None = None,
+    batch_size: int = 1,
+    **options,
+) -> BatchSummary:
+    """
+    Converts the files in input_dir that match glob with convert_fn, which is
+    called like convert_to_jsondoc(input_file, output_file, source_format=...,
+    target_format=..., **options). Outputs keep the paths relative to
+    input_dir and are skipped if they are newer than their inputs and were
+    converted with the same options, which are recorded in OPTIONS_FILE in
+    output_dir.
+
+    With more than one worker, files are converted by a pool of worker
+    processes that is started once, so that each file doesn't pay for
+    starting Python and importing the converters. initializer(*initargs) is
+    called once in each worker, or in this process without workers.
+
+    With a cache, outputs are looked up and stored in this process, so that
+    workers only convert the files that aren't in the cache.
+
+    With convert_many_fn and a batch_size above 1, the files that are
+    converted with pandoc are converted in batches of batch_size files
+    instead, with convert_many_fn([(content, source_format, input_file),
+    ...], target_format=..., **options), which returns the output of each
+    file or the exception raised while converting it.
+    """
+    input_path = Path(input_dir)
+    output_path = Path(output_dir)
+    if not input_path.is_dir():
+        raise ValueError(f"Input directory does not exist: {input_dir}")
+
+    summary = BatchSummary()
+    start = time.perf_counter()
+
+    options["target_format"] = target_format
+    options_key = get_options_key(source_format, options)
+    has_same_options = _read_options_key(output_path) == options_key
+    if not has_same_options:
+        # Until all files are converted with the new options, no output is
+        # up to date
+        try:
+            os.remove(output_path / OPTIONS_FILE)
+        except FileNotFoundError:
+            pass
+
+    tasks = []
+    for input_file in sorted(input_path.glob(glob)):
+        if not input_file.is_file() or output_path in input_file.parents:
+            continue
+        output_file = get_output_file(
+            input_file, input_path, output_path, target_format
+        )
+        if has_same_options and is_up_to_date(input_file, output_file):
+            summary.skipped.append(str(input_file))
+            continue
+        tasks.append((str(input_file), str(output_file)))
+
+    if cache is not None:
+        tasks, keys = _get_cached_outputs(
+            cache, tasks, source_format, options, summary, progress
+        )
+
+    def add(result: BatchResult) -> None:
+        _report_progress(result, progress)
+        summary.add(result)
+        if cache is not None and result.error is None:
+            with open(result.output_file, "r", encoding="utf-8") as file:
+                cache.put(keys[result.input_file], file.read())
+
+    # Calls that each convert one file or a batch of files
+    calls = []
+    batch = []
+    for input_file, output_file in tasks:
+        extension = os.path.splitext(input_file)[1][1:].lower()
+        if convert_many_fn is None or batch_size < 2 or extension in EXTENSION_FORMATS:
+            calls.append(
+                (_convert_file, convert_fn, input_file, output_file, source_format)
+            )
+            continue
+        batch.append((input_file, output_file))
+        if len(batch) == batch_size:
+            calls.append((_convert_files, convert_many_fn, batch, source_format))
+            batch = []
+    if batch:
+        calls.append((_convert_files, convert_many_fn, batch, source_format))
+
+    def add_all(results: BatchResult | List[BatchResult]) -> None:
+        for result in results if isinstance(results, list) else [results]:
+            add(result)
+
+    if workers is None or workers < 2 or len(calls) < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        for fn, *args in calls:
+            add_all(fn(*args, options))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(calls)),
+            initializer=initializer,
+            initargs=initargs,
+        ) as executor:
+            futures = [executor.submit(fn, *args, options) for fn, *args in calls]
+            for future in as_completed(futures):
+                add_all(future.result())
+
+    # Outputs of failed files may have been converted with other options
+    if not has_same_options and not summary.failed:
+        os.makedirs(output_path, exist_ok=True)
+        (output_path / OPTIONS_FILE).write_text(options_key, encoding="utf-8")
+
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def _get_cached_outputs(
+    cache: ConversionCache,
+    tasks: List[Tuple[str, str]],
+    source_format: str | None,
+    options: dict,
+    summary: BatchSummary,
+    progress: TextIO | None,
+) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    """
+    Writes the outputs of the tasks that are in the cache. Returns the other
+    tasks and the cache keys of their input files.
+    """
+    remaining_tasks = []
+    keys = {}
+    for input_file, output_file in tasks:
+        start = time.perf_counter()
+        with open(input_file, "rb") as file:
+            content = file.read()
+        key = cache.make_key(
+            content,
+            # Without a format, pandoc infers it from the extension
+            source_format=get_source_format(input_file, source_format)
+            or os.path.splitext(input_file)[1],
+            **options,
+        )
+        output = cache.get(key)
+        if output is None:
+            remaining_tasks.append((input_file, output_file))
+            keys[input_file] = key
+            continue
+
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        tmp_file = f"{output_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as file:
+            file.write(output)
+        os.replace(tmp_file, output_file)
+
+        result = BatchResult(
+            input_file,
+            output_file,
+            seconds=time.perf_counter() - start,
+            n_bytes=len(content),
+            cached=True,
+        )
+        _report_progress(result, progress)
+        summary.add(result)
+
+    return remaining_tasks, keys
+
+
+def _report_progress(result: BatchResult, progress: TextIO | None) -> None:
+    if progress is None:
+        return
+    if result.error is not None:
+        status = "FAILED"
+    elif result.cached:
+        status = "CACHED"
+    else:
+        status = f"{result.seconds:.3f}s"
+    progress.write(f"{status} {result.input_file}\n")
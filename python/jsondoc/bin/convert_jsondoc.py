@@ -1,11 +1,28 @@
 import argparse
+import logging
+import os
 import sys
+from typing import List, Tuple
 
 import pypandoc
+
+from jsondoc.bin.batch import convert_directory
+from jsondoc.bin.jsonl import convert_jsonl
 from jsondoc.convert.html import html_to_jsondoc
 from jsondoc.convert.markdown import jsondoc_to_markdown
+from jsondoc.convert.markdown_in import MARKDOWN_FORMAT_OPTIONS, markdown_to_jsondoc
+from jsondoc.convert.pandoc import (
+    PANDOC_DEFAULT_BATCH_SIZE,
+    PANDOC_SERVER_DEFAULT_TIMEOUT,
+    PandocPool,
+    convert_many_to_html,
+    convert_to_html,
+    set_pandoc_servers,
+)
 from jsondoc.serialize import jsondoc_dump_json, load_jsondoc
 from jsondoc.utils import set_created_by
+from jsondoc.utils.cache import ConversionCache
+from jsondoc.utils.profiling import collect_profile, profile_stage
 
 ALLOWED_FORMATS = [
     "jsondoc",
@@ -60,6 +77,26 @@ def validate_format(format):
             raise ValueError(f"Format not supported: {format}")
 
 
+def is_pandoc_format(format: str | None) -> bool:
+    """
+    Whether documents of a source format are converted to HTML with pandoc
+    """
+    return format not in ["html", "jsondoc", *MARKDOWN_FORMAT_OPTIONS]
+
+
+def _get_pandoc_error(e: RuntimeError, input_file: str | None) -> Exception:
+    # Handle different error message from Pandoc
+    error_message = str(e)
+    if "invalid input format" in error_message.lower():
+        return ValueError(f"File type not supported for conversion: {input_file}")
+    elif "missing format" in error_message.lower():
+        return ValueError(
+            "Could not determine file type for conversion. "
+            "Please specify the source formats with -s or --source_format."
+        )
+    return e
+
+
 def convert_to_jsondoc(
     input_file: str | None = None,
     output_file: str | None = None,
@@ -68,9 +105,11 @@ def convert_to_jsondoc(
     target_format: str | None = None,
     force_page: bool = False,
     created_by: str | None = None,
+    cache: ConversionCache | None = None,
 ):
     """
-    Convert to and from JSON-DOC format.
+    Convert to and from JSON-DOC format. With a cache, the output of an
+    input that was converted before with the same options is reused.
     """
     # Determine the file type based on extension
     if source_format is not None and input_file is not None:
@@ -88,12 +127,72 @@ def convert_to_jsondoc(
         )
 
         # Read from stdin
-        input_content = sys.stdin.read()
+        with profile_stage("read"):
+            input_content = sys.stdin.read()
     else:
-        if source_format in ["html", "jsondoc"]:
-            with open(input_file, "r") as file:
+        if source_format in ["html", "jsondoc", *MARKDOWN_FORMAT_OPTIONS]:
+            with profile_stage("read"), open(input_file, "r") as file:
                 input_content = file.read()
 
+    output = None
+    if cache is not None:
+        if input_content is not None:
+            key_content = input_content
+        else:
+            with profile_stage("read"), open(input_file, "rb") as file:
+                key_content = file.read()
+        with profile_stage("cache"):
+            key = cache.make_key(
+                key_content,
+                # Without a format, pandoc infers it from the extension
+                source_format=source_format or os.path.splitext(input_file)[1],
+                target_format=target_format,
+                indent=indent,
+                force_page=force_page,
+                created_by=created_by,
+            )
+            output = cache.get(key)
+
+    if output is None:
+        output = convert_content(
+            input_content,
+            source_format,
+            target_format=target_format,
+            indent=indent,
+            force_page=force_page,
+            created_by=created_by,
+            input_file=input_file,
+        )
+        if cache is not None:
+            with profile_stage("cache"):
+                cache.put(key, output)
+    with profile_stage("write"):
+        if output_file:
+            # Write the output to a file
+            with open(output_file, "w") as file:
+                file.write(output)
+        else:
+            # Print to terminal
+            print(output)
+
+
+def convert_content(
+    input_content: str | dict | list | None,
+    source_format: str | None,
+    target_format: str | None = None,
+    indent: int | None = None,
+    force_page: bool = False,
+    created_by: str | None = None,
+    input_file: str | None = None,
+) -> str:
+    """
+    Converts a document to or from JSON-DOC and returns the output. If
+    input_content is None, pandoc reads input_file instead.
+
+    The stages of the conversion are recorded in the active profile, if any,
+    see jsondoc.utils.profiling.collect_profile().
+    """
+    validate_format(source_format)
     if target_format is not None:
         validate_format(target_format)
 
@@ -115,52 +214,115 @@ def convert_to_jsondoc(
                 "This should not happen"
             )
 
-        jsondoc = load_jsondoc(input_content)
-        if output_file:
-            with open(output_file, "w") as file:
-                file.write(jsondoc_to_markdown(jsondoc))
-        else:
-            print(jsondoc_to_markdown(jsondoc))
+        with profile_stage("load_jsondoc"):
+            jsondoc = load_jsondoc(input_content)
+        with profile_stage("jsondoc_to_markdown"):
+            return jsondoc_to_markdown(jsondoc)
     else:
+        html_content = None
         if source_format == "html":
             html_content = input_content
-        else:
+        elif source_format not in MARKDOWN_FORMAT_OPTIONS:
             try:
-                html_content = pypandoc.convert_file(
-                    input_content if input_content is not None else input_file,
-                    "html",
-                    format=source_format,
-                    extra_args=["--wrap=none"],
-                )
-            except RuntimeError as e:
-                # Handle different error message from Pandoc
-                error_message = str(e)
-                if "invalid input format" in error_message.lower():
-                    raise ValueError(
-                        f"File type not supported for conversion: {input_file}"
-                    )
-                elif "missing format" in error_message.lower():
-                    raise ValueError(
-                        "Could not determine file type for conversion. "
-                        "Please specify the source formats with -s or --source_format."
+                with profile_stage("pandoc"):
+                    html_content = convert_to_html(
+                        input_file, source_format, content=input_content
                     )
-                else:
-                    raise e
+            except RuntimeError as e:
+                raise _get_pandoc_error(e, input_file)
 
-        jsondoc = html_to_jsondoc(html_content, force_page=force_page)
+        if source_format in MARKDOWN_FORMAT_OPTIONS:
+            # Markdown is converted in-process, without pandoc
+            with profile_stage("markdown_to_jsondoc"):
+                jsondoc = markdown_to_jsondoc(
+                    input_content,
+                    force_page=force_page,
+                    **MARKDOWN_FORMAT_OPTIONS[source_format],
+                )
+        else:
+            # The converter records its own stages, from parsing to create_page
+            jsondoc = html_to_jsondoc(html_content, force_page=force_page)
         if created_by is not None:
-            set_created_by(jsondoc, created_by)
+            with profile_stage("set_created_by"):
+                set_created_by(jsondoc, created_by)
 
         # Serialize the jsondoc
-        serialized_jsondoc = jsondoc_dump_json(jsondoc, indent=indent)
+        with profile_stage("jsondoc_dump_json"):
+            return jsondoc_dump_json(jsondoc, indent=indent)
 
-        if output_file:
-            # Write the output to a file
-            with open(output_file, "w") as file:
-                file.write(serialized_jsondoc)
-        else:
-            # Print to terminal
-            print(serialized_jsondoc)
+
+def convert_many_contents(
+    documents: List[Tuple[str | bytes | dict | list | None, str | None, str | None]],
+    target_format: str | None = None,
+    indent: int | None = None,
+    force_page: bool = False,
+    created_by: str | None = None,
+) -> List[str | Exception]:
+    """
+    Converts (input_content, source_format, input_file) documents like
+    convert_content(), and returns the output of each document or the
+    exception raised while converting it. The documents that are converted
+    with pandoc are sent to it together, in batches if pandoc servers are
+    set, see jsondoc.convert.pandoc.PandocClient.convert_many().
+    """
+    options = dict(
+        target_format=target_format,
+        indent=indent,
+        force_page=force_page,
+        created_by=created_by,
+    )
+    results: List[str | Exception] = [None] * len(documents)
+    pandoc_indices = []
+    documents = list(documents)
+    for idx, (content, source_format, input_file) in enumerate(documents):
+        if content is None and source_format is None and input_file is not None:
+            # Like pandoc run on a file, infer the format from the extension
+            extension = os.path.splitext(input_file)[1].strip(".").lower()
+            format = pypandoc.normalize_format(extension) if extension else None
+            if format in ALLOWED_FORMATS and is_pandoc_format(format):
+                try:
+                    with open(input_file, "rb") as file:
+                        content = file.read()
+                except OSError as e:
+                    results[idx] = e
+                    continue
+                source_format = format
+                documents[idx] = (content, source_format, input_file)
+        if (
+            content is not None
+            and source_format in ALLOWED_FORMATS
+            and is_pandoc_format(source_format)
+        ):
+            pandoc_indices.append(idx)
+            continue
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+        try:
+            results[idx] = convert_content(
+                content, source_format, input_file=input_file, **options
+            )
+        except Exception as e:
+            results[idx] = e
+
+    with profile_stage("pandoc"):
+        html_contents = convert_many_to_html(
+            [(documents[idx][0], documents[idx][1]) for idx in pandoc_indices]
+        )
+    for idx, html_content in zip(pandoc_indices, html_contents):
+        input_file = documents[idx][2]
+        if isinstance(html_content, RuntimeError):
+            html_content = _get_pandoc_error(html_content, input_file)
+        if isinstance(html_content, Exception):
+            results[idx] = html_content
+            continue
+        try:
+            results[idx] = convert_content(
+                html_content, "html", input_file=input_file, **options
+            )
+        except Exception as e:
+            results[idx] = e
+
+    return results
 
 
 def main():
@@ -207,8 +369,188 @@ def main():
         help="An identifier for the entity that created the JSON-DOC file",
         default=None,
     )
+    parser.add_argument(
+        "--input-dir",
+        help="Convert all files in this directory that match --glob",
+        default=None,
+    )
+    parser.add_argument(
+        "--output-dir",
+        help="Directory for the outputs of --input-dir",
+        default=None,
+    )
+    parser.add_argument(
+        "--glob",
+        help="Pattern of the files to convert in --input-dir, e.g. '**/*.html'",
+        default="*",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Convert JSONL records {id, format, content} from stdin to JSONL "
+        "records {id, jsondoc}, {id, markdown} or {id, error} on stdout",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for --input-dir and --jsonl",
+        default=1,
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Maximum number of records read ahead of the output in --jsonl "
+        "mode, by default two per worker",
+        default=None,
+    )
+    parser.add_argument(
+        "--pandoc-servers",
+        type=int,
+        help="Number of long-lived pandoc servers that convert the non-HTML "
+        "inputs of --input-dir and --jsonl, instead of a pandoc process each",
+        default=0,
+    )
+    parser.add_argument(
+        "--pandoc-timeout",
+        type=float,
+        help="Seconds per document after which a pandoc conversion fails",
+        default=PANDOC_SERVER_DEFAULT_TIMEOUT,
+    )
+    parser.add_argument(
+        "--pandoc-batch-size",
+        type=int,
+        help="Maximum number of non-HTML inputs of --input-dir and --jsonl "
+        "sent to a pandoc server in one request",
+        default=PANDOC_DEFAULT_BATCH_SIZE,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="Directory of a cache of conversion outputs, which are reused for "
+        "inputs that were converted before with the same options",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=float,
+        help="Maximum size of the cache in MB, least recently used outputs are "
+        "removed first",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print the hits, misses and size of the cache to stderr",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print the wall and CPU time, peak memory and allocations of each "
+        "stage of the conversion to stderr",
+    )
     args = parser.parse_args()
 
+    if args.profile:
+        if args.workers > 1:
+            print("--profile requires --workers 1")
+            exit(1)
+        with collect_profile() as profile:
+            try:
+                _run(args)
+            finally:
+                print(profile.format_table(), file=sys.stderr)
+    else:
+        _run(args)
+
+
+def _run(args: argparse.Namespace):
+    cache = None
+    if args.cache_dir is not None:
+        max_size = args.cache_max_size
+        if max_size is not None:
+            max_size = int(max_size * 1024 * 1024)
+        cache = ConversionCache(args.cache_dir, max_size=max_size)
+    elif args.cache_stats or args.cache_max_size is not None:
+        print("--cache-stats and --cache-max-size require --cache-dir")
+        exit(1)
+
+    try:
+        _convert(args, cache)
+    finally:
+        if cache is not None and args.cache_stats:
+            print(cache.format_stats(), file=sys.stderr)
+
+
+def _convert(args: argparse.Namespace, cache: ConversionCache | None):
+    if args.input_dir is not None or args.jsonl:
+        if args.input_file or args.output_file:
+            print("--input-dir and --jsonl don't take an input or output file")
+            exit(1)
+        if args.input_dir is not None and (args.output_dir is None or args.jsonl):
+            print("--input-dir requires --output-dir and can't be used with --jsonl")
+            exit(1)
+
+        if args.pandoc_batch_size < 1:
+            print("--pandoc-batch-size must be at least 1")
+            exit(1)
+
+        pool = None
+        urls = None
+        if args.pandoc_servers > 0:
+            try:
+                pool = PandocPool(
+                    args.pandoc_servers,
+                    timeout=args.pandoc_timeout,
+                    batch_size=args.pandoc_batch_size,
+                )
+                urls = pool.start().urls
+            except RuntimeError as e:
+                logging.warning(f"{e}, running pandoc as a subprocess instead")
+        # Without servers, pandoc runs once per document anyway
+        batch_size = args.pandoc_batch_size if urls else 1
+
+        options = dict(
+            workers=args.workers,
+            source_format=args.source_format,
+            target_format=args.target_format,
+            indent=args.indent,
+            force_page=args.force_page,
+            created_by=args.created_by,
+            initializer=set_pandoc_servers,
+            initargs=(urls, args.pandoc_timeout, args.pandoc_batch_size),
+            cache=cache,
+            convert_many_fn=convert_many_contents,
+            batch_size=batch_size,
+        )
+        try:
+            if args.jsonl:
+                _, n_failed = convert_jsonl(
+                    convert_content,
+                    sys.stdin,
+                    sys.stdout,
+                    max_in_flight=args.max_in_flight,
+                    is_batched_format=is_pandoc_format,
+                    **options,
+                )
+            else:
+                summary = convert_directory(
+                    convert_to_jsondoc,
+                    args.input_dir,
+                    args.output_dir,
+                    glob=args.glob,
+                    **options,
+                )
+                print(summary.format())
+                n_failed = len(summary.failed)
+        except ValueError as e:
+            print(e)
+            exit(1)
+        finally:
+            if pool is not None:
+                pool.close()
+        if n_failed:
+            exit(1)
+        return
+
     try:
         convert_to_jsondoc(
             args.input_file,
@@ -218,6 +560,7 @@ def main():
             target_format=args.target_format,
             force_page=args.force_page,
             created_by=args.created_by,
+            cache=cache,
         )
     except (ValueError, RuntimeError) as e:
         print(e)
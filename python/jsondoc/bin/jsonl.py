@@ -0,0 +1,363 @@
+import codecs
+import json
+import os
+import queue
+import select
+import stat
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterator, List, TextIO, Tuple
+
+from jsondoc.utils.cache import ConversionCache
+
+# Keys of the converted content in output records, by target format
+OUTPUT_KEYS = {"jsondoc": "jsondoc", "markdown": "markdown"}
+
+
+def _make_error_record(record_id, error: Exception) -> str:
+    return json.dumps({"id": record_id, "error": f"{type(error).__name__}: {error}"})
+
+
+def _make_output_record(record_id, target_format: str, output: str) -> str:
+    if target_format == "jsondoc":
+        # The output is already serialized, so it's embedded as is
+        return f'{{"id": {json.dumps(record_id)}, "jsondoc": {output}}}'
+    return json.dumps({"id": record_id, OUTPUT_KEYS[target_format]: output})
+
+
+def _parse_record(
+    line: str, source_format: str | None, target_format: str | None
+) -> Tuple[Any, tuple | None, Exception | None]:
+    """
+    Parses a JSONL record {"id", "format", "content"}. Returns the id of the
+    record and either its content, format and target format, or an error.
+    """
+    record_id = None
+    try:
+        record = json.loads(line)
+        if not isinstance(record, dict) or "content" not in record:
+            raise ValueError('Records must be objects with a "content" key')
+        record_id = record.get("id")
+        format = record.get("format") or source_format
+        if format is None:
+            raise ValueError("The record has no format and no -s was given")
+    except Exception as e:
+        return record_id, None, e
+
+    target = target_format or ("markdown" if format == "jsondoc" else "jsondoc")
+    return record_id, (record["content"], format, target), None
+
+
+def convert_record(
+    convert_fn: Callable,
+    record_id: Any,
+    content: str | dict | list,
+    format: str,
+    target_format: str,
+    options: dict,
+) -> Tuple[str, bool, str | None]:
+    """
+    Converts the content of a JSONL record. Returns the output record,
+    whether the conversion succeeded and the converted output. Failures are
+    returned as {"id", "error"} records instead of raised.
+    """
+    try:
+        output = convert_fn(content, format, target_format=target_format, **options)
+    except Exception as e:
+        return _make_error_record(record_id, e), False, None
+    return _make_output_record(record_id, target_format, output), True, output
+
+
+def convert_records(
+    convert_many_fn: Callable,
+    records: List[Tuple[Any, str | dict | list, str]],
+    target_format: str,
+    options: dict,
+) -> List[Tuple[str, bool, str | None]]:
+    """
+    Converts the (id, content, format) of JSONL records together with
+    convert_many_fn. Returns what convert_record() returns for each record.
+    """
+    try:
+        outputs = convert_many_fn(
+            [(content, format, None) for _, content, format in records],
+            target_format=target_format,
+            **options,
+        )
+    except Exception as e:
+        outputs = [e] * len(records)
+
+    results = []
+    for (record_id, _, _), output in zip(records, outputs):
+        if isinstance(output, Exception):
+            results.append((_make_error_record(record_id, output), False, None))
+        else:
+            record = _make_output_record(record_id, target_format, output)
+            results.append((record, True, output))
+    return results
+
+
+def _convert_record_list(*args) -> List[Tuple[str, bool, str | None]]:
+    return [convert_record(*args)]
+
+
+def _is_ready(fd: int) -> bool:
+    try:
+        return bool(select.select([fd], [], [], 0)[0])
+    except (OSError, ValueError):
+        # E.g. pipes on Windows, which can't be polled
+        return True
+
+
+def _iter_lines(input: TextIO) -> Iterator[str | None]:
+    """
+    Yields the lines of input, and None whenever the next line isn't
+    available yet, i.e. reading it would wait on a pipe or a terminal.
+    Pipes and terminals are read directly from their file descriptor, so
+    that no line is held in the buffer of input. Other inputs, e.g. files,
+    are always ready.
+    """
+    try:
+        fd = input.fileno()
+        is_stream = not stat.S_ISREG(os.fstat(fd).st_mode)
+    except (AttributeError, OSError, ValueError):
+        is_stream = False
+    if not is_stream:
+        yield from input
+        return
+
+    decoder = codecs.getincrementaldecoder(getattr(input, "encoding", None) or "utf-8")(
+        getattr(input, "errors", None) or "strict"
+    )
+    lines: deque = deque()
+    partial = ""
+    while True:
+        if lines:
+            yield lines.popleft()
+            continue
+        if not _is_ready(fd):
+            yield None
+        data = os.read(fd, 65536)
+        text = partial + decoder.decode(data, final=not data)
+        if not data:
+            if text:
+                yield text
+            return
+        lines.extend(text.split("\n"))
+        partial = lines.pop()
+
+
+def _make_future(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def convert_jsonl(
+    convert_fn: Callable,
+    input: TextIO,
+    output: TextIO,
+    workers: int | None = None,
+    max_in_flight: int | None = None,
+    source_format: str | None = None,
+    target_format: str | None = None,
+    initializer: Callable | None = None,
+    initargs: tuple = (),
+    cache: ConversionCache | None = None,
+    convert_many_fn: Callable | None = None,
+    batch_size: int = 1,
+    is_batched_format: Callable[[str], bool] | None = None,
+    **options,
+) -> Tuple[int, int]:
+    """
+    Converts a stream of JSONL records {"id", "format", "content"} with
+    convert_fn, which is called like convert_content(content, format,
+    target_format=..., **options). Writes one record per input record, in
+    the same order: {"id", "jsondoc"} or {"id", "markdown"}, or {"id",
+    "error"} if the record couldn't be converted. The format of a record
+    defaults to source_format. Empty lines are skipped.
+
+    Each output record is flushed as soon as it's ready, so this can run as
+    a long-lived filter. With more than one worker, records are converted
+    in worker processes and written in order by a thread, without waiting
+    for the next input line. At most max_in_flight records or batches of
+    records, by default two per worker, are read ahead of the output.
+
+    initializer(*initargs) is called once in each worker, or in this process
+    without workers. With a cache, outputs are looked up and stored in this
+    process. Returns the number of converted and failed records.
+
+    With convert_many_fn and a batch_size above 1, consecutive records with
+    the same target format whose format passes is_batched_format, e.g. the
+    formats that are converted with pandoc, are converted in batches of
+    batch_size with convert_many_fn([(content, format, None), ...],
+    target_format=..., **options). A batch is converted once it's full,
+    once a record that can't join it is read, or once no more input is
+    ready, so records aren't held back waiting for the next ones.
+    """
+    if target_format is not None and target_format not in OUTPUT_KEYS:
+        raise ValueError(f"Target format not supported in JSONL mode: {target_format}")
+
+    # Each output record must fit on one line
+    options.pop("indent", None)
+
+    n_converted = 0
+    n_failed = 0
+
+    # Records that are waiting for their batch to be full, as (id, content,
+    # format), and their target format and cache keys
+    batch: List[Tuple[Any, str | dict | list, str]] = []
+    batch_target = None
+    batch_keys: List[str | None] = []
+    can_batch = convert_many_fn is not None and batch_size > 1
+
+    def submit_batch(
+        executor: ProcessPoolExecutor | None,
+    ) -> Tuple[Future, List[str | None]] | None:
+        nonlocal batch, batch_keys
+        if not batch:
+            return None
+        args = (convert_many_fn, batch, batch_target, options)
+        keys = batch_keys
+        batch, batch_keys = [], []
+        if executor is None:
+            return _make_future(convert_records(*args)), keys
+        return executor.submit(convert_records, *args), keys
+
+    def submit(
+        line: str, executor: ProcessPoolExecutor | None
+    ) -> List[Tuple[Future, List[str | None]]]:
+        """
+        Returns the futures of the records that are ready to be written, in
+        order, with their cache keys
+        """
+        nonlocal batch_target
+        record_id, task, error = _parse_record(line, source_format, target_format)
+        if error is not None:
+            result = (_make_error_record(record_id, error), False, None)
+            submitted = [(_make_future([result]), [None])]
+        else:
+            content, format, target = task
+            key = None
+            cached_output = None
+            if cache is not None:
+                key = cache.make_key(
+                    content if isinstance(content, str) else json.dumps(content),
+                    source_format=format,
+                    target_format=target,
+                    **options,
+                )
+                cached_output = cache.get(key)
+
+            if cached_output is not None:
+                record = _make_output_record(record_id, target, cached_output)
+                submitted = [(_make_future([(record, True, None)]), [None])]
+            elif can_batch and (is_batched_format is None or is_batched_format(format)):
+                if batch and batch_target != target:
+                    submitted = [submit_batch(executor)]
+                else:
+                    submitted = []
+                batch.append((record_id, content, format))
+                batch_keys.append(key)
+                batch_target = target
+                if len(batch) == batch_size:
+                    submitted.append(submit_batch(executor))
+                return submitted
+            else:
+                args = (convert_fn, record_id, content, format, target, options)
+                if executor is None:
+                    future = _make_future([convert_record(*args)])
+                else:
+                    future = executor.submit(_convert_record_list, *args)
+                submitted = [(future, [key])]
+
+        # Records are written in order, so the records of a batch go first
+        pending = submit_batch(executor)
+        return ([pending] if pending else []) + submitted
+
+    def write(future: Future, keys: List[str | None]) -> None:
+        nonlocal n_converted, n_failed
+        for (record, success, converted_output), key in zip(future.result(), keys):
+            output.write(record + "\n")
+            output.flush()
+            if success:
+                n_converted += 1
+            else:
+                n_failed += 1
+            if key is not None and converted_output is not None:
+                cache.put(key, converted_output)
+
+    lines = _iter_lines(input) if can_batch else input
+
+    def submit_line(
+        line: str | None, executor: ProcessPoolExecutor | None
+    ) -> List[Tuple[Future, List[str | None]]]:
+        if line is None:
+            # No more input is ready, so the batch is converted as is
+            pending = submit_batch(executor)
+            return [pending] if pending else []
+        if not line.strip():
+            return []
+        return submit(line, executor)
+
+    if workers is None or workers < 2:
+        if initializer is not None:
+            initializer(*initargs)
+        for line in lines:
+            for submitted in submit_line(line, None):
+                write(*submitted)
+        pending = submit_batch(None)
+        if pending:
+            write(*pending)
+        return n_converted, n_failed
+
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+
+    # Futures are written in order by a thread, which frees a slot for each
+    # one. The first error stops the writing and is raised here.
+    slots = threading.Semaphore(max_in_flight)
+    to_write: queue.Queue = queue.Queue()
+    errors: List[BaseException] = []
+
+    def write_in_order() -> None:
+        while True:
+            submitted = to_write.get()
+            if submitted is None:
+                return
+            try:
+                if not errors:
+                    write(*submitted)
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                slots.release()
+
+    def enqueue(submitted: Tuple[Future, List[str | None]] | None) -> None:
+        if submitted is not None:
+            slots.acquire()
+            to_write.put(submitted)
+
+    writer = threading.Thread(target=write_in_order, daemon=True)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    ) as executor:
+        writer.start()
+        try:
+            for line in lines:
+                if errors:
+                    break
+                for submitted in submit_line(line, executor):
+                    enqueue(submitted)
+            if not errors:
+                enqueue(submit_batch(executor))
+        finally:
+            to_write.put(None)
+            writer.join()
+
+    if errors:
+        raise errors[0]
+    return n_converted, n_failed
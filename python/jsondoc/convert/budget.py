@@ -0,0 +1,85 @@
+from typing import Callable
+
+
+class RenderBudget:
+    """
+    Limits the length of the output of a renderer. max_chars counts
+    characters and max_units counts the units of length_function, e.g.
+    tokens, which defaults to len. None means unlimited.
+
+    Renderers add the output of each block with add() and stop at the first
+    block that doesn't fit, whose id is then stored in stopped_at_block_id.
+    The output thus always ends on a block boundary.
+    """
+
+    __slots__ = [
+        "max_chars",
+        "max_units",
+        "length_function",
+        "n_chars",
+        "n_units",
+        "stopped_at_block_id",
+    ]
+
+    def __init__(
+        self,
+        max_chars: int | None = None,
+        max_units: int | None = None,
+        length_function: Callable[[str], int] | None = None,
+    ):
+        if (max_chars is not None and max_chars < 0) or (
+            max_units is not None and max_units < 0
+        ):
+            raise ValueError("Budgets must not be negative")
+
+        self.max_chars = max_chars
+        self.max_units = max_units
+        self.length_function = length_function or len
+        self.reset()
+
+    def reset(self) -> None:
+        self.n_chars = 0
+        self.n_units = 0
+        self.stopped_at_block_id: str | None = None
+
+    @property
+    def is_limited(self) -> bool:
+        return self.max_chars is not None or self.max_units is not None
+
+    @property
+    def is_exhausted(self) -> bool:
+        """
+        True if rendering stopped or no non-empty output can fit anymore
+        """
+        return (
+            self.stopped_at_block_id is not None
+            or (self.max_chars is not None and self.n_chars >= self.max_chars)
+            or (self.max_units is not None and self.n_units >= self.max_units)
+        )
+
+    def add(self, text: str, block_id: str) -> bool:
+        """
+        Counts the output of a block against the budget. Returns False and
+        stops rendering at the block if the output doesn't fit.
+        """
+        if self.stopped_at_block_id is not None:
+            return False
+
+        n_chars = self.n_chars + len(text)
+        if self.max_chars is not None and n_chars > self.max_chars:
+            self.stopped_at_block_id = block_id
+            return False
+
+        if self.max_units is not None:
+            n_units = self.n_units + self.length_function(text)
+            if n_units > self.max_units:
+                self.stopped_at_block_id = block_id
+                return False
+            self.n_units = n_units
+
+        self.n_chars = n_chars
+        return True
+
+    def stop(self, block_id: str) -> None:
+        if self.stopped_at_block_id is None:
+            self.stopped_at_block_id = block_id
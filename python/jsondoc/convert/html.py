@@ -1,21 +1,28 @@
+import hashlib
+import inspect
+import logging
 import re
+import time
+from datetime import datetime
+from difflib import SequenceMatcher
 from types import NoneType
-from typing import Callable, List, Union
+from typing import Callable, List, Literal, Union
 
-from bs4 import BeautifulSoup, Comment, Doctype, NavigableString
+from bs4 import BeautifulSoup, Comment, Doctype, NavigableString, Tag
 from pydantic import BaseModel
 
+from jsondoc.accessors import get_block_text_accessors
 from jsondoc.convert.placeholder import (
     BreakElementPlaceholderBlock,
     CaptionPlaceholderBlock,
     CellPlaceholderBlock,
     FigurePlaceholderBlock,
+    PlaceholderBlockBase,
 )
 from jsondoc.convert.utils import (
-    append_rich_text_to_block,
     append_to_parent_block,
     append_to_rich_text,
-    block_supports_rich_text,
+    assign_block_ids,
     create_bullet_list_item_block,
     create_cell_placeholder_block,
     create_code_block,
@@ -45,18 +52,65 @@ from jsondoc.models.block.types.table_row import TableRowBlock
 from jsondoc.models.page import Page
 from jsondoc.models.shared_definitions import Annotations
 from jsondoc.rules import is_block_child_allowed
-from jsondoc.utils import generate_block_id, get_current_time
+from jsondoc.utils import (
+    DEFERRED_ID_STRATEGIES,
+    generate_block_id,
+    get_content_hash,
+    get_current_time,
+)
+from jsondoc.utils.profiling import (
+    ConversionProfile,
+    get_active_profile,
+    profile_stage,
+)
+
+MISSING = object()
 
 line_beginning_re = re.compile(r"^", re.MULTILINE)
 whitespace_re = re.compile(r"[\t ]+")
 all_whitespace_re = re.compile(r"[\s]+")
 html_heading_re = re.compile(r"h[1-6]")
 
+# Tags in which whitespace-only text nodes are ignored
+NESTED_NODE_TAGS = {
+    "ol",
+    "ul",
+    "li",
+    "table",
+    "thead",
+    "tbody",
+    "tfoot",
+    "tr",
+    "td",
+    "th",
+}
+
+# Tags whose children are treated as top-level sections of a document
+SECTION_CONTAINER_TAGS = ["html", "body"]
+
+# Metadata key that records which top-level section a block was converted from
+HTML_SECTION_METADATA_KEY = "html_section"
+
+# Tag of the containers that delimit the fragments in convert_fragments()
+FRAGMENT_CONTAINER_TAG = "jsondoc-fragment"
+
 
 CHILDREN_TYPE = Union[BlockBase, RichTextBase, str]
 RICH_TEXT_TYPE = Union[RichTextBase, RichTextEquation]
 
 
+class ConversionBudgetExceeded(RuntimeError):
+    """
+    Raised when an HTML conversion goes over one of the resource budgets
+    given in HtmlToJsonDocConverter.Options
+    """
+
+    def __init__(self, budget: str, limit: int | float):
+        self.budget = budget
+        self.limit = limit
+        super().__init__(f"HTML conversion exceeded budget {budget}={limit}")
+
+
 class ConvertOutput(BaseModel):
     """
     Return type for convert functions
@@ -310,11 +364,15 @@ def reconcile_to_block(
     block: BlockBase,
     children: List[CHILDREN_TYPE],
     typeid: bool = False,
+    defer_ids: bool = False,
 ) -> List[CHILDREN_TYPE]:
     """
     Given a block and a list of children,
     this function will reconcile the children to the block
     and return a list of objects
+
+    If defer_ids is True, new blocks are created with empty ids
+    to be assigned later with assign_block_ids()
     """
     override_reconcile_fn = OVERRIDE_RECONCILE_FUNCTIONS.get(type(block))
     if override_reconcile_fn:
@@ -323,6 +381,9 @@ def reconcile_to_block(
     remaining_children = []
     objects = [block]
 
+    # Looked up once per block instead of once per child
+    get_rich_text = get_block_text_accessors(block).get_rich_text
+
     # Any string will be added to the current rich text
     current_rich_text = None
     for child in children:
@@ -332,14 +393,14 @@ def reconcile_to_block(
 
             append_to_rich_text(current_rich_text, child)
 
-            if block_supports_rich_text(block):
-                append_rich_text_to_block(block, current_rich_text)
+            if get_rich_text is not None:
+                get_rich_text(block).append(current_rich_text)
             else:
                 remaining_children.append(current_rich_text)
 
         elif isinstance(child, RichTextBase):
-            if block_supports_rich_text(block):
-                append_rich_text_to_block(block, child)
+            if get_rich_text is not None:
+                get_rich_text(block).append(child)
                 current_rich_text = None
             else:
                 remaining_children.append(child)
@@ -352,7 +413,7 @@ def reconcile_to_block(
             # Get corresponding field from the block
             block_field = getattr(block, block_type)
             init_kwargs = {
-                "id": generate_block_id(typeid=typeid),
+                "id": "" if defer_ids else generate_block_id(typeid=typeid),
                 "created_time": child.created_time,
                 block_type: type(block_field)(),
             }
@@ -384,6 +445,125 @@ def reconcile_to_block(
     return objects
 
 
+def is_nested_node(el) -> bool:
+    return bool(el) and el.name in NESTED_NODE_TAGS
+
+
+def extract_ignorable_whitespace(node: Tag):
+    """
+    Removes whitespace-only text nodes from a purely nested node
+    """
+    contents = node.contents
+    idx = 0
+    while idx < len(contents):
+        el = contents[idx]
+        # Only extract (remove) whitespace-only text node if any of the
+        # conditions is true:
+        # - el is the first element in its parent
+        # - el is the last element in its parent
+        # - el is adjacent to an nested node
+        if (
+            isinstance(el, NavigableString)
+            and str(el).strip() == ""
+            and (
+                not el.previous_sibling
+                or not el.next_sibling
+                or is_nested_node(el.previous_sibling)
+                or is_nested_node(el.next_sibling)
+            )
+        ):
+            el.extract()
+        # The element after an extracted one is skipped on purpose, this
+        # matches the behavior of extracting while iterating over the children
+        idx += 1
+
+
+def normalize_text(el: NavigableString, in_pre: bool) -> str | None:
+    """
+    Normalizes the whitespace of a text node. Returns None if nothing is left.
+    """
+    text = str(el)
+
+    # normalize whitespace if we're not inside a preformatted element
+    if not in_pre and ("\t" in text or "  " in text):
+        text = whitespace_re.sub(" ", text)
+
+    # Convert whitespace at the end and at the beginning to a single space
+    if text and text[-1].isspace():
+        text = text.rstrip() + " "
+    if text and text[0].isspace():
+        text = " " + text.lstrip()
+
+    if not el.previous_sibling:
+        text = text.lstrip()
+
+    if not el.next_sibling:
+        text = text.rstrip()
+
+    if len(text) == 0:
+        return None
+
+    return text
+
+
+def normalize_whitespace(soup: BeautifulSoup, processed_texts: dict):
+    """
+    Whitespace normalization pre-pass, run once before conversion.
+    Walks the document in order, removes whitespace-only text nodes in
+    purely nested nodes and stores the normalized text of every remaining
+    text node in processed_texts, keyed by id().
+    """
+    # Stack of (children iterator, whether the children are inside <pre>)
+    stack = [(iter(soup.contents), False)]
+    while stack:
+        children, in_pre = stack[-1]
+        el = next(children, None)
+        if el is None:
+            stack.pop()
+        elif isinstance(el, Tag):
+            if is_nested_node(el):
+                extract_ignorable_whitespace(el)
+            stack.append((iter(el.contents), in_pre or el.name == "pre"))
+        elif isinstance(el, Comment) or isinstance(el, Doctype):
+            continue
+        elif isinstance(el, NavigableString):
+            processed_texts[id(el)] = normalize_text(el, in_pre)
+
+
+def _count_convert_output_objects(convert_output: ConvertOutput | str | None) -> int:
+    if convert_output is None:
+        return 0
+    elif isinstance(convert_output, ConvertOutput):
+        return 1 + len(convert_output.prev_objects) + len(convert_output.next_objects)
+    return 1
+
+
+def get_section_hash(section) -> str:
+    """
+    Returns a hash of a top-level section subtree. Two sections with the same
+    hash are guaranteed to convert to the same blocks (up to ids and timestamps).
+    """
+    hash_ = hashlib.sha1(str(section).encode("utf-8"))
+    if isinstance(section, NavigableString):
+        # Top-level text is stripped depending on whether it has siblings,
+        # see HtmlToJsonDocConverter.process_text
+        hash_.update(b"%d%d" % (not section.previous_sibling, not section.next_sibling))
+    return hash_.hexdigest()
+
+
+def annotate_section_blocks(
+    blocks: List[BlockBase], section_idx: int, section_hash: str
+) -> List[BlockBase]:
+    """
+    Records the section a list of top-level blocks was converted from
+    in their metadata
+    """
+    value = f"{section_idx}:{section_hash}"
+    for block in blocks:
+        block.metadata = {**(block.metadata or {}), HTML_SECTION_METADATA_KEY: value}
+    return blocks
+
+
 class HtmlToJsonDocConverter(object):
     class Options(BaseModel):
         autolinks: bool = True
@@ -395,6 +575,23 @@ class HtmlToJsonDocConverter(object):
         strip: str | None = None
         force_page: bool = False
         typeid: bool = False
+        # One of jsondoc.utils.ID_STRATEGIES, defaults to typeid or uuid4
+        # depending on the typeid option
+        id_strategy: Literal["uuid4", "typeid", "counter", "content"] | None = None
+        # Created time of all blocks, defaults to the time of the conversion
+        created_time: datetime | None = None
+        annotate_sections: bool = False
+        # Resource budgets, None means unlimited. max_nodes counts HTML elements
+        # and max_output_blocks counts blocks created from HTML elements
+        max_nodes: int | None = None
+        max_depth: int | None = None
+        max_output_blocks: int | None = None
+        deadline_seconds: float | None = None
+        # "raise" raises ConversionBudgetExceeded, "truncate" stops converting
+        # and returns the objects converted so far
+        on_budget_exceeded: Literal["raise", "truncate"] = "raise"
+        # Collect per-stage, per-tag and per-handler statistics in self.profile
+        profile: bool = False
 
     def __init__(self, **options):
         self.options = self.Options(**options)
@@ -403,15 +600,290 @@ class HtmlToJsonDocConverter(object):
                 "You may specify either tags to strip or tags to convert, but not both."
             )
 
+        self.has_budget = any(
+            limit is not None
+            for limit in [
+                self.options.max_nodes,
+                self.options.max_depth,
+                self.options.max_output_blocks,
+                self.options.deadline_seconds,
+            ]
+        )
+        self.id_strategy = self.options.id_strategy or (
+            "typeid" if self.options.typeid else "uuid4"
+        )
+        self.reset_block_kwargs()
+        self.reset_budget()
+        # Normalized text of text nodes, see normalize_whitespace()
+        self.processed_texts: dict[int, str | None] = {}
+
+        self.profile: ConversionProfile | None = None
+        if self.options.profile:
+            self._enable_profiling()
+
+    def _enable_profiling(self):
+        """
+        Wraps process_tag and all convert handlers with profiling code.
+        Instance attributes are used so that nothing changes when disabled.
+        """
+        # Statistics go to the active profile, if any, see collect_profile()
+        profile = self.profile = get_active_profile() or ConversionProfile()
+
+        def profiled(group, name, fn, count_objects):
+            def wrapper(el, *args, **kwargs):
+                name_ = el.name if name is None else name
+                ret = None
+                start = profile.enter(group, name_)
+                try:
+                    ret = fn(el, *args, **kwargs)
+                    return ret
+                finally:
+                    profile.exit(group, name_, start, count_objects(ret))
+
+            return wrapper
+
+        self.process_tag = profiled(
+            "tags", None, self.process_tag, lambda ret: len(ret) if ret else 0
+        )
+
+        for attr in dir(type(self)):
+            if not attr.startswith("convert_"):
+                continue
+
+            fn = getattr(self, attr)
+            if not callable(fn):
+                continue
+
+            # Handlers are the methods that are called as convert_fn(el, convert_as_inline)
+            if list(inspect.signature(fn).parameters) != ["el", "convert_as_inline"]:
+                continue
+
+            setattr(
+                self,
+                attr,
+                profiled("handlers", attr, fn, _count_convert_output_objects),
+            )
+
+    def _stage(self, name: str):
+        if self.profile is None:
+            return profile_stage(name)
+        return self.profile.stage(name)
+
+    def _start_conversion(self, *soups: BeautifulSoup):
+        """
+        Resets the state of the previous conversion and prepares the given soups
+        """
+        self.reset_block_kwargs()
+        self.reset_budget()
+        self.processed_texts = {}
+        with self._stage("normalize_whitespace"):
+            for soup in soups:
+                normalize_whitespace(soup, self.processed_texts)
+
+    def reset_block_kwargs(self):
+        """
+        Sets the keyword arguments for creating blocks in the current conversion.
+        All blocks share a single created_time, and they get empty ids if the
+        id strategy assigns them after the conversion.
+        Called at the start of every conversion.
+        """
+        self.block_kwargs = {
+            "created_time": self.options.created_time or get_current_time(),
+            "typeid": self.id_strategy == "typeid",
+        }
+        if self.id_strategy in DEFERRED_ID_STRATEGIES:
+            self.block_kwargs["id"] = ""
+
+    def reset_budget(self):
+        """
+        Resets the resource budget counters. Called at the start of every conversion.
+        """
+        # Set to the first exceeded budget when truncating
+        self.budget_exceeded: ConversionBudgetExceeded | None = None
+        self._budget_stopped = False
+        self._n_nodes = 0
+        self._n_blocks = 0
+        self._deadline = None
+        if self.options.deadline_seconds is not None:
+            self._deadline = time.monotonic() + self.options.deadline_seconds
+
+    def _handle_budget_exceeded(
+        self, budget: str, limit: int | float, stop: bool = True
+    ) -> bool:
+        error = ConversionBudgetExceeded(budget, limit)
+        if self.options.on_budget_exceeded == "raise":
+            raise error
+
+        if self.budget_exceeded is None:
+            logging.warning(f"{error}, truncating the output")
+            self.budget_exceeded = error
+
+        # Depth budget only skips the subtree, other budgets stop the conversion
+        if stop:
+            self._budget_stopped = True
+
+        return True
+
+    def _check_node_budget(self, depth: int) -> bool:
+        """
+        Counts an HTML element against the resource budgets.
+        Returns True if the element should be skipped.
+        """
+        if self._budget_stopped:
+            return True
+
+        options = self.options
+        self._n_nodes += 1
+        if options.max_nodes is not None and self._n_nodes > options.max_nodes:
+            return self._handle_budget_exceeded("max_nodes", options.max_nodes)
+
+        if options.max_depth is not None and depth > options.max_depth:
+            return self._handle_budget_exceeded(
+                "max_depth", options.max_depth, stop=False
+            )
+
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return self._handle_budget_exceeded(
+                "deadline_seconds", options.deadline_seconds
+            )
+
+        return False
+
+    def _check_block_budget(self, obj: BlockBase | RichTextBase | None) -> bool:
+        """
+        Counts a converted block against the max_output_blocks budget.
+        Returns True if the block should be dropped.
+        """
+        if not isinstance(obj, BlockBase) or isinstance(obj, PlaceholderBlockBase):
+            return False
+
+        self._n_blocks += 1
+        max_output_blocks = self.options.max_output_blocks
+        if max_output_blocks is not None and self._n_blocks > max_output_blocks:
+            return self._handle_budget_exceeded("max_output_blocks", max_output_blocks)
+
+        return False
+
     def convert(self, html: str | bytes) -> Page | BlockBase | List[BlockBase]:
-        soup = BeautifulSoup(html, "html.parser")
-        return self.convert_soup(soup)
+        with self._stage("parse"):
+            soup = BeautifulSoup(html, "html.parser")
+
+        id_seed = None
+        if self.id_strategy in DEFERRED_ID_STRATEGIES:
+            id_seed = get_content_hash(html)
 
-    def convert_soup(self, soup: BeautifulSoup) -> Page | BlockBase | List[BlockBase]:
-        children = self.process_tag(soup, convert_as_inline=False, children_only=True)
-        children = run_final_block_transformations(children)
+        return self.convert_soup(soup, id_seed=id_seed)
+
+    def convert_soup(
+        self, soup: BeautifulSoup, id_seed: str | None = None
+    ) -> Page | BlockBase | List[BlockBase]:
+        """
+        Converts a parsed HTML document. id_seed identifies the document for the
+        deferred id strategies, and defaults to a hash of the serialized soup.
+        """
+        self._start_conversion(soup)
+        children = self._convert_children(soup)
+        return self._create_output(soup, children, id_seed=id_seed)
+
+    def convert_fragments(
+        self, fragments: List[str | bytes]
+    ) -> List[Page | BlockBase | List[BlockBase]]:
+        """
+        Converts a list of HTML fragments with a single parse. The fragments
+        are wrapped in delimiting containers and each container is converted
+        separately, so the result for each fragment is the same as the result
+        of convert(fragment).
+
+        Fragments given as bytes, and all fragments if any of them breaks out
+        of its container, e.g. with an unclosed comment, are parsed and
+        converted one by one instead.
+        """
+        ret = [None] * len(fragments)
+        batched = [
+            idx for idx, fragment in enumerate(fragments) if isinstance(fragment, str)
+        ]
+
+        # An empty container is appended as a sentinel, so that a fragment which
+        # swallows the delimiters after it, e.g. with an unclosed comment or
+        # <script>, always changes the number of containers
+        container_html = [fragments[idx] for idx in batched] + [""]
+        with self._stage("parse"):
+            soup = BeautifulSoup(
+                "".join(
+                    f"<{FRAGMENT_CONTAINER_TAG}>{html}</{FRAGMENT_CONTAINER_TAG}>"
+                    for html in container_html
+                ),
+                "html.parser",
+            )
+
+        containers = soup.contents
+        if (
+            len(containers) != len(container_html)
+            or any(
+                not isinstance(container, Tag)
+                or container.name != FRAGMENT_CONTAINER_TAG
+                for container in containers
+            )
+            or containers[-1].contents
+        ):
+            logging.warning(
+                "HTML fragments could not be parsed together, converting them one by one"
+            )
+            batched = []
+        else:
+            self._start_conversion(soup)
+
+        for idx, container in zip(batched, containers):
+            # Resource budgets apply to each fragment separately
+            self.reset_budget()
+            id_seed = None
+            if self.id_strategy in DEFERRED_ID_STRATEGIES:
+                id_seed = get_content_hash(fragments[idx])
+
+            children = self._convert_children(container)
+            ret[idx] = self._create_output(container, children, id_seed=id_seed)
+
+        batched = set(batched)
+        for idx, fragment in enumerate(fragments):
+            if idx not in batched:
+                ret[idx] = self.convert(fragment)
+
+        return ret
+
+    def _convert_children(self, node: BeautifulSoup | Tag) -> List[BlockBase]:
+        """
+        Converts the contents of a parsed document or fragment container to blocks
+        """
+        if self.options.annotate_sections:
+            children = []
+            sections = self._iter_sections(node, count_containers=self.has_budget)
+            for idx, (section, depth) in enumerate(sections):
+                children += annotate_section_blocks(
+                    self._convert_section(section, depth),
+                    idx,
+                    get_section_hash(section),
+                )
+            return children
+
+        with self._stage("process_tag"):
+            children = self.process_tag(
+                node, convert_as_inline=False, children_only=True
+            )
+        with self._stage("run_final_block_transformations"):
+            return run_final_block_transformations(children, **self.block_kwargs)
+
+    def _create_output(
+        self,
+        soup: BeautifulSoup,
+        children: List[BlockBase],
+        previous_page: Page | None = None,
+        id_seed: str | None = None,
+    ) -> Page | BlockBase | List[BlockBase]:
         is_page = self._is_soup_page(soup)
 
+        if id_seed is None and self.id_strategy in DEFERRED_ID_STRATEGIES:
+            id_seed = get_content_hash(str(soup))
+
         ret = None
         if is_page or self.options.force_page:
             title = self._get_html_title(soup)
@@ -420,12 +892,23 @@ class HtmlToJsonDocConverter(object):
                 children = [children]
 
             # Create a page and add all the blocks to it
-            ret = create_page(
-                title=title,
-                children=children,
-                typeid=self.options.typeid,
-            )
+            with self._stage("create_page"):
+                ret = create_page(
+                    id=previous_page.id if previous_page else None,
+                    created_time=(
+                        previous_page.created_time
+                        if previous_page
+                        else self.block_kwargs["created_time"]
+                    ),
+                    title=title,
+                    children=children,
+                    id_strategy=self.id_strategy,
+                    id_seed=id_seed or "",
+                )
         else:
+            if self.id_strategy in DEFERRED_ID_STRATEGIES:
+                assign_block_ids(children, self.id_strategy, seed=id_seed)
+
             ret = children
             if isinstance(ret, list):
                 if len(ret) == 1:
@@ -433,14 +916,194 @@ class HtmlToJsonDocConverter(object):
 
         return ret
 
+    def _get_section_wrapper(self, node) -> Tag | None:
+        """
+        Returns the only child element of a node if nothing else in the node
+        is converted and the element doesn't create an object itself, e.g. a
+        <div> or <main> that wraps a whole page, and None otherwise
+        """
+        wrapper = None
+        for el in node.children:
+            if isinstance(el, Comment) or isinstance(el, Doctype):
+                continue
+            elif isinstance(el, NavigableString):
+                if self.process_text(el):
+                    return None
+            elif wrapper is not None:
+                return None
+            else:
+                wrapper = el
+
+        if wrapper is None or (
+            getattr(self, "convert_%s" % wrapper.name, None) is not None
+            and self.should_convert_tag(wrapper.name)
+        ):
+            return None
+        return wrapper
+
+    def _iter_sections(self, node, depth=1, count_containers=False):
+        """
+        Yields the top-level sections of a document in document order, with
+        their depth. Children of <html> and <body>, and of an element that
+        wraps all the content of its parent without a handler, see
+        _get_section_wrapper(), are treated as top-level, because these
+        elements don't create any objects themselves. With count_containers,
+        these elements are counted against the resource budgets like
+        process_tag() counts them.
+        """
+        wrapper = self._get_section_wrapper(node)
+        for el in node.children:
+            if isinstance(el, Tag) and (
+                el.name in SECTION_CONTAINER_TAGS or el is wrapper
+            ):
+                if count_containers and self._check_node_budget(depth):
+                    if self._budget_stopped:
+                        return
+                    continue
+                yield from self._iter_sections(el, depth + 1, count_containers)
+            else:
+                yield el, depth
+
+    def _convert_section(self, section, depth=1) -> List[BlockBase]:
+        """
+        Converts a single top-level section to blocks. Concatenating the
+        results for all sections yields the same blocks as convert_soup().
+        """
+        if self._budget_stopped:
+            return []
+
+        if isinstance(section, Comment) or isinstance(section, Doctype):
+            return []
+        elif isinstance(section, NavigableString):
+            processed_text = self.process_text(section)
+            objects = [processed_text] if processed_text else []
+        else:
+            with self._stage("process_tag"):
+                objects = self.process_tag(
+                    section, convert_as_inline=False, depth=depth
+                )
+
+        with self._stage("run_final_block_transformations"):
+            return run_final_block_transformations(objects, **self.block_kwargs)
+
+    def _get_section_spans(
+        self,
+        blocks: List[BlockBase],
+        sections: list,
+        section_hashes: List[str],
+    ) -> List[List[BlockBase]] | None:
+        """
+        Splits the top-level blocks of a previous conversion into the spans
+        generated by each section. Uses the section metadata if present,
+        otherwise converts the sections again to count their blocks.
+        Returns None if the blocks don't match the sections.
+        """
+        spans = [[] for _ in sections]
+        section_idx_map = {
+            f"{idx}:{hash_}": idx for idx, hash_ in enumerate(section_hashes)
+        }
+        for block in blocks:
+            value = (block.metadata or {}).get(HTML_SECTION_METADATA_KEY)
+            idx = section_idx_map.get(value)
+            if idx is None:
+                break
+            spans[idx].append(block)
+        else:
+            return spans
+
+        # Blocks are not annotated, fall back to counting the blocks per section
+        spans = []
+        start = 0
+        for section in sections:
+            end = start + len(self._convert_section(*section))
+            spans.append(blocks[start:end])
+            start = end
+
+        if start != len(blocks):
+            return None
+
+        return spans
+
+    def reconvert(
+        self,
+        previous_html: str | bytes,
+        previous_jsondoc: Page | BlockBase | List[BlockBase],
+        new_html: str | bytes,
+    ) -> Page | BlockBase | List[BlockBase]:
+        """
+        Converts new_html by reusing the blocks of previous_jsondoc for the
+        top-level sections that did not change since previous_html.
+
+        Sections are diffed by subtree hash, and only the changed ones are
+        converted again, so the block ids of unchanged sections stay stable.
+        The blocks of unchanged sections are deep copies of the previous ones.
+        The returned blocks are annotated with their section in their metadata.
+        If previous_jsondoc was not annotated, e.g. because it was not created
+        with annotate_sections=True, the previous sections need to be converted
+        once more to find out which blocks belong to them.
+        """
+        with self._stage("parse"):
+            previous_soup = BeautifulSoup(previous_html, "html.parser")
+            soup = BeautifulSoup(new_html, "html.parser")
+
+        self._start_conversion(previous_soup, soup)
+
+        previous_sections = list(self._iter_sections(previous_soup))
+        previous_hashes = [get_section_hash(s) for s, _ in previous_sections]
+        sections = list(self._iter_sections(soup))
+        section_hashes = [get_section_hash(s) for s, _ in sections]
+
+        previous_page = None
+        if isinstance(previous_jsondoc, Page):
+            previous_page = previous_jsondoc
+            previous_blocks = previous_jsondoc.children
+        elif isinstance(previous_jsondoc, BlockBase):
+            previous_blocks = [previous_jsondoc]
+        else:
+            previous_blocks = list(previous_jsondoc)
+
+        spans = self._get_section_spans(
+            previous_blocks, previous_sections, previous_hashes
+        )
+        if spans is None:
+            logging.warning(
+                "Previous JSON-DOC does not match the previous HTML, "
+                "converting the new HTML from scratch"
+            )
+            spans = [None] * len(previous_sections)
+
+        children = []
+        matcher = SequenceMatcher(None, previous_hashes, section_hashes, autojunk=False)
+        for tag, i1, _, j1, j2 in matcher.get_opcodes():
+            for offset, idx in enumerate(range(j1, j2)):
+                blocks = spans[i1 + offset] if tag == "equal" else None
+                if blocks is None:
+                    blocks = self._convert_section(*sections[idx])
+                else:
+                    # The previous document keeps its blocks
+                    blocks = [block.model_copy(deep=True) for block in blocks]
+
+                children += annotate_section_blocks(blocks, idx, section_hashes[idx])
+
+        return self._create_output(
+            soup,
+            children,
+            previous_page=previous_page,
+            id_seed=get_content_hash(new_html),
+        )
+
     def process_tag(
-        self, node, convert_as_inline, children_only=False
+        self, node, convert_as_inline, children_only=False, depth=0
     ) -> List[CHILDREN_TYPE]:
         """
         Convert a BeautifulSoup node to JSON-DOC. Recurses through the children
         nodes and converts them to JSON-DOC corresponding current block type
         can have children or not.
         """
+        # The root of a document or fragment isn't an HTML element
+        if self.has_budget and not children_only and self._check_node_budget(depth):
+            return []
+
         objects = []
 
         # Headings or cells can't include block elements (elements w/newlines)
@@ -451,41 +1114,8 @@ class HtmlToJsonDocConverter(object):
         if not children_only and (is_heading or is_cell):
             convert_children_as_inline = True
 
-        # Remove whitespace-only textnodes in purely nested nodes
-        def is_nested_node(el):
-            return el and el.name in [
-                "ol",
-                "ul",
-                "li",
-                "table",
-                "thead",
-                "tbody",
-                "tfoot",
-                "tr",
-                "td",
-                "th",
-            ]
-
-        if is_nested_node(node):
-            for el in node.children:
-                # Only extract (remove) whitespace-only text node if any of the
-                # conditions is true:
-                # - el is the first element in its parent
-                # - el is the last element in its parent
-                # - el is adjacent to an nested node
-                can_extract = (
-                    not el.previous_sibling
-                    or not el.next_sibling
-                    or is_nested_node(el.previous_sibling)
-                    or is_nested_node(el.next_sibling)
-                )
-                if (
-                    isinstance(el, NavigableString)
-                    and str(el).strip() == ""
-                    and can_extract
-                ):
-                    el.extract()
-
+        # Whitespace-only textnodes in purely nested nodes have already been
+        # removed by normalize_whitespace()
         children_objects = []
         # Convert the children first
         for el in node.children:
@@ -497,8 +1127,12 @@ class HtmlToJsonDocConverter(object):
                     children_objects.append(processed_text)
             else:
                 # text += self.process_tag(el, convert_children_as_inline)
-                new_objects = self.process_tag(el, convert_children_as_inline)
+                new_objects = self.process_tag(
+                    el, convert_children_as_inline, depth=depth + 1
+                )
                 children_objects += new_objects
+                if self._budget_stopped:
+                    break
 
         current_level_object = None
         current_level_prev_objects = []
@@ -518,6 +1152,15 @@ class HtmlToJsonDocConverter(object):
                     current_level_prev_objects = convert_output.prev_objects
                     current_level_next_objects = convert_output.next_objects
 
+                if self.has_budget and self._check_block_budget(current_level_object):
+                    # Keep the blocks converted before the budget was exceeded
+                    return [
+                        obj
+                        for obj in children_objects
+                        if isinstance(obj, BlockBase)
+                        and not isinstance(obj, PlaceholderBlockBase)
+                    ]
+
         # print(node, repr(current_level_object))
 
         if current_level_object is None:
@@ -526,7 +1169,8 @@ class HtmlToJsonDocConverter(object):
             objects = reconcile_to_block(
                 current_level_object,
                 children_objects,
-                typeid=self.options.typeid,
+                typeid=self.block_kwargs["typeid"],
+                defer_ids="id" in self.block_kwargs,
             )
         elif isinstance(current_level_object, RichTextBase):
             objects = reconcile_to_rich_text(current_level_object, children_objects)
@@ -578,6 +1222,15 @@ class HtmlToJsonDocConverter(object):
         return True
 
     def process_text(self, el):
+        """
+        Returns the normalized text of a text node, or None if it is empty.
+        Text nodes of prepared soups are looked up from the results of
+        normalize_whitespace().
+        """
+        processed_text = self.processed_texts.get(id(el), MISSING)
+        if processed_text is not MISSING:
+            return processed_text
+
         text = str(el) or ""
 
         # normalize whitespace if we're not inside a preformatted element
@@ -649,7 +1302,7 @@ class HtmlToJsonDocConverter(object):
         # TODO: If text has newlines, split them and add 2, 3, ... lines as children
         return ConvertOutput(
             main_object=create_quote_block(
-                typeid=self.options.typeid,
+                **self.block_kwargs,
             )
         )
 
@@ -659,7 +1312,7 @@ class HtmlToJsonDocConverter(object):
 
         return ConvertOutput(
             main_object=BreakElementPlaceholderBlock(
-                id="", created_time=get_current_time()
+                id="", created_time=self.block_kwargs["created_time"]
             )
         )
 
@@ -688,48 +1341,40 @@ class HtmlToJsonDocConverter(object):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(main_object=create_h1_block(typeid=self.options.typeid))
+        return ConvertOutput(main_object=create_h1_block(**self.block_kwargs))
 
     def convert_h2(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(main_object=create_h2_block(typeid=self.options.typeid))
+        return ConvertOutput(main_object=create_h2_block(**self.block_kwargs))
 
     def convert_h3(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(main_object=create_h3_block(typeid=self.options.typeid))
+        return ConvertOutput(main_object=create_h3_block(**self.block_kwargs))
 
     def convert_h4(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(
-            main_object=create_paragraph_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_paragraph_block(**self.block_kwargs))
 
     def convert_h5(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(
-            main_object=create_paragraph_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_paragraph_block(**self.block_kwargs))
 
     def convert_h6(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(
-            main_object=create_paragraph_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_paragraph_block(**self.block_kwargs))
 
     def convert_hr(self, el, convert_as_inline):
-        return ConvertOutput(
-            main_object=create_divider_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_divider_block(**self.block_kwargs))
 
     convert_i = convert_em
 
@@ -750,7 +1395,7 @@ class HtmlToJsonDocConverter(object):
         return ConvertOutput(
             main_object=create_image_block(
                 url=src,
-                typeid=self.options.typeid,
+                **self.block_kwargs,
                 # alt is not supported in JSON-DOC yet
                 # caption=alt,
             )
@@ -770,20 +1415,18 @@ class HtmlToJsonDocConverter(object):
         parent = el.parent
         if parent is not None and parent.name == "ol":
             return ConvertOutput(
-                main_object=create_numbered_list_item_block(typeid=self.options.typeid)
+                main_object=create_numbered_list_item_block(**self.block_kwargs)
             )
         else:
             return ConvertOutput(
-                main_object=create_bullet_list_item_block(typeid=self.options.typeid)
+                main_object=create_bullet_list_item_block(**self.block_kwargs)
             )
 
     def convert_p(self, el, convert_as_inline):
         if convert_as_inline:
             return ConvertOutput(main_object=create_rich_text())
 
-        return ConvertOutput(
-            main_object=create_paragraph_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_paragraph_block(**self.block_kwargs))
 
     def convert_pre(self, el, convert_as_inline):
         text = el.get_text()
@@ -797,9 +1440,7 @@ class HtmlToJsonDocConverter(object):
             code_language = self.options.code_language_callback(el) or code_language
 
         return ConvertOutput(
-            main_object=create_code_block(
-                language=code_language, typeid=self.options.typeid
-            )
+            main_object=create_code_block(language=code_language, **self.block_kwargs)
         )
 
     def convert_script(self, el, convert_as_inline):
@@ -829,7 +1470,7 @@ class HtmlToJsonDocConverter(object):
         has_column_header = html_table_has_header_row(el)
         return ConvertOutput(
             main_object=create_table_block(
-                has_column_header=has_column_header, typeid=self.options.typeid
+                has_column_header=has_column_header, **self.block_kwargs
             )
         )
 
@@ -837,7 +1478,7 @@ class HtmlToJsonDocConverter(object):
         return ConvertOutput(
             main_object=CaptionPlaceholderBlock(
                 id="",
-                created_time=get_current_time(),
+                created_time=self.block_kwargs["created_time"],
                 type="caption_placeholder",
                 rich_text=[],
             )
@@ -849,7 +1490,7 @@ class HtmlToJsonDocConverter(object):
         return ConvertOutput(
             main_object=FigurePlaceholderBlock(
                 id="",
-                created_time=get_current_time(),
+                created_time=self.block_kwargs["created_time"],
                 type="figure_placeholder",
                 rich_text=[],
             )
@@ -877,10 +1518,17 @@ class HtmlToJsonDocConverter(object):
 
         next_objects = []
         if colspan > 1:
-            next_objects = [create_cell_placeholder_block() for _ in range(colspan - 1)]
+            next_objects = [
+                create_cell_placeholder_block(
+                    created_time=self.block_kwargs["created_time"]
+                )
+                for _ in range(colspan - 1)
+            ]
 
         return ConvertOutput(
-            main_object=create_cell_placeholder_block(),
+            main_object=create_cell_placeholder_block(
+                created_time=self.block_kwargs["created_time"]
+            ),
             next_objects=next_objects,
         )
 
@@ -892,10 +1540,25 @@ class HtmlToJsonDocConverter(object):
         """
         Table row
         """
-        return ConvertOutput(
-            main_object=create_table_row_block(typeid=self.options.typeid)
-        )
+        return ConvertOutput(main_object=create_table_row_block(**self.block_kwargs))
 
 
 def html_to_jsondoc(html: str | bytes, **options) -> Page | BlockBase | List[BlockBase]:
     return HtmlToJsonDocConverter(**options).convert(html)
+
+
+def html_fragments_to_jsondoc(
+    fragments: List[str | bytes], **options
+) -> List[Page | BlockBase | List[BlockBase]]:
+    return HtmlToJsonDocConverter(**options).convert_fragments(fragments)
+
+
+def reconvert(
+    previous_html: str | bytes,
+    previous_jsondoc: Page | BlockBase | List[BlockBase],
+    new_html: str | bytes,
+    **options,
+) -> Page | BlockBase | List[BlockBase]:
+    return HtmlToJsonDocConverter(**options).reconvert(
+        previous_html, previous_jsondoc, new_html
+    )
@@ -0,0 +1,563 @@
+import re
+from functools import partial
+from html import escape
+from io import StringIO
+from typing import Iterator, List, Literal, TextIO
+
+from pydantic import BaseModel, validate_call
+
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.block.types.bulleted_list_item import BulletedListItemBlock
+from jsondoc.models.block.types.code import CodeBlock
+from jsondoc.models.block.types.column_list import ColumnListBlock
+from jsondoc.models.block.types.divider import DividerBlock
+from jsondoc.models.block.types.equation import EquationBlock
+from jsondoc.models.block.types.heading_1 import Heading1Block
+from jsondoc.models.block.types.heading_2 import Heading2Block
+from jsondoc.models.block.types.heading_3 import Heading3Block
+from jsondoc.models.block.types.image import ImageBlock
+from jsondoc.models.block.types.numbered_list_item import NumberedListItemBlock
+from jsondoc.models.block.types.paragraph import ParagraphBlock
+from jsondoc.models.block.types.quote import QuoteBlock
+from jsondoc.models.block.types.rich_text.base import RichTextBase
+from jsondoc.models.block.types.rich_text.equation import RichTextEquation
+from jsondoc.models.block.types.rich_text.text import RichTextText
+from jsondoc.models.block.types.table import TableBlock
+from jsondoc.models.block.types.table_row import TableRowBlock
+from jsondoc.models.block.types.to_do import ToDoBlock
+from jsondoc.models.block.types.toggle import ToggleBlock
+from jsondoc.models.page import Page
+from jsondoc.serialize import load_jsondoc
+
+# Text content only needs &, < and > escaped, attribute values quotes as well
+escape_text = partial(escape, quote=False)
+escape_attribute = escape
+
+# Browsers ignore whitespace and control characters in URL schemes,
+# e.g. "java\tscript:" is a javascript: URL
+url_ignored_chars_re = re.compile(r"[\x00-\x20]+")
+unsafe_url_re = re.compile(r"(?:javascript|vbscript|data):", re.IGNORECASE)
+safe_image_data_url_re = re.compile(r"data:image/", re.IGNORECASE)
+
+TOGGLE_ICON = (
+    '<svg aria-hidden="true" role="graphics-symbol" viewBox="0 0 16 16" '
+    'class="arrowCaretDownFillSmall" style="width:14px;height:14px;'
+    'display:block;flex-shrink:0;transform:rotate(360deg);user-select:none">'
+    '<path d="M2.835 3.25a.8.8 0 0 0-.69 1.203l5.164 8.854a.8.8 0 0 0 '
+    '1.382 0l5.165-8.854a.8.8 0 0 0-.691-1.203z"></path></svg>'
+)
+
+
+def is_safe_url(url: str, image: bool = False) -> bool:
+    """
+    Returns False for URLs that run scripts when followed, e.g. javascript:
+    URLs. Data URLs are only allowed for images.
+    """
+    url = url_ignored_chars_re.sub("", url)
+    if image and safe_image_data_url_re.match(url):
+        return True
+    return unsafe_url_re.match(url) is None
+
+
+def _get_page_num(block: BlockBase) -> int | None:
+    metadata = block.metadata
+    if not metadata:
+        return None
+    origin = metadata.get("origin")
+    return origin.get("page_num") if isinstance(origin, dict) else None
+
+
+class JsonDocToHtmlConverter(object):
+    """
+    Renders JSON-DOC to HTML with the same markup and class names as the
+    TypeScript JsonDocRenderer, so that its stylesheets can be reused.
+    Interactive elements are rendered in their static form, e.g. toggles
+    are open and image captions are expanded.
+    """
+
+    class Options(BaseModel):
+        # Theme of the wrapper of pages, see jsondoc-theme-* in the TS styles
+        theme: Literal["light", "dark"] = "light"
+        # Extra class names of the json-doc-renderer element of pages
+        class_name: str = ""
+        # Render a delimiter after the last block of each source page,
+        # given by metadata.origin.page_num
+        page_delimiters: bool = True
+
+    def __init__(self, **options):
+        self.options = self.Options(**options)
+
+    @validate_call
+    def convert(self, obj: str | dict | BlockBase | List[BlockBase] | Page) -> str:
+        out = StringIO()
+        for chunk in self._iter_html(self._load(obj)):
+            out.write(chunk)
+        return out.getvalue()
+
+    @validate_call
+    def iter_html(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page
+    ) -> Iterator[str]:
+        """
+        Returns an iterator over the HTML of obj, with one chunk per
+        top-level block. Joining the chunks yields the output of convert().
+        """
+        return self._iter_html(self._load(obj))
+
+    def write_html(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page, fp: TextIO
+    ) -> None:
+        """
+        Writes the HTML of obj to a text file-like object, one top-level
+        block at a time, so that the whole output is never held in memory
+        """
+        for chunk in self.iter_html(obj):
+            fp.write(chunk)
+
+    def _load(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page
+    ) -> BlockBase | List[BlockBase] | Page:
+        if isinstance(obj, (str, dict)):
+            return load_jsondoc(obj)
+        return obj
+
+    def _iter_html(self, jsondoc: BlockBase | List[BlockBase] | Page) -> Iterator[str]:
+        if isinstance(jsondoc, Page):
+            yield from self._iter_page(jsondoc)
+        elif isinstance(jsondoc, BlockBase):
+            yield self.convert_block(jsondoc)
+        elif isinstance(jsondoc, list):
+            for block in jsondoc:
+                yield self.convert_block(block)
+        else:
+            raise ValueError(f"Invalid object type: {type(jsondoc)}")
+
+    def _iter_page(self, page: Page) -> Iterator[str]:
+        class_name = "json-doc-renderer"
+        if self.options.class_name:
+            class_name += " " + self.options.class_name
+
+        out = StringIO()
+        out.write(
+            f'<div class="jsondoc-theme-{self.options.theme}">'
+            f'<div class="{escape_attribute(class_name)}">'
+            '<div class="json-doc-page">'
+        )
+        if page.icon is not None:
+            out.write(
+                f'<div class="json-doc-page-icon">{escape_text(page.icon.emoji)}</div>'
+            )
+        title = page.properties.title if page.properties is not None else None
+        if title is not None:
+            text = title.title[0].plain_text if title.title else None
+            out.write(
+                '<h1 class="json-doc-page-title" '
+                f'data-page-id="{escape_attribute(page.id)}" role="heading">'
+                f"{escape_text(text or 'Untitled')}</h1>"
+            )
+        children = page.children or []
+        if children:
+            out.write('<div class="json-doc-page-content">')
+        yield out.getvalue()
+
+        for idx, block in enumerate(children):
+            out = StringIO()
+            self._write_block(block, 0, out)
+
+            page_num = _get_page_num(block) if self.options.page_delimiters else None
+            if page_num and (
+                idx == len(children) - 1 or _get_page_num(children[idx + 1]) != page_num
+            ):
+                out.write(
+                    '<div class="jsondoc-page-delimiter">'
+                    '<div class="jsondoc-page-delimiter-line"></div>'
+                    '<span class="jsondoc-page-number">'
+                    f"Page {escape_text(str(page_num))}</span></div>"
+                )
+            yield out.getvalue()
+
+        yield ("</div>" if children else "") + "</div></div></div>"
+
+    def convert_block(self, block: BlockBase, depth: int = 0) -> str:
+        out = StringIO()
+        self._write_block(block, depth, out)
+        return out.getvalue()
+
+    def _write_block(self, block: BlockBase, depth: int, out: StringIO) -> None:
+        convert_fn = getattr(self, f"convert_{block.type}_block", None)
+        if convert_fn is None:
+            out.write(
+                '<div class="notion-unsupported-block" '
+                f'data-block-type="{escape_attribute(block.type)}" role="alert">'
+                f"<span>Error Unsupported block type: {escape_text(block.type)}"
+                "</span></div>"
+            )
+            return
+
+        convert_fn(block, depth, out)
+
+    def _write_children(
+        self,
+        children: List[BlockBase] | None,
+        depth: int,
+        out: StringIO,
+        margin: int | None = None,
+    ) -> None:
+        if not children:
+            return
+
+        if margin is None:
+            margin = depth * 24
+        out.write(f'<div class="notion-block-children" style="margin-left:{margin}px">')
+        for child in children:
+            self._write_block(child, depth + 1, out)
+        out.write("</div>")
+
+    def _open_block(self, block: BlockBase, class_name: str, out: StringIO) -> None:
+        out.write(
+            f'<div class="notion-selectable {class_name}" '
+            f'data-block-id="{escape_attribute(block.id)}">'
+        )
+
+    def write_rich_text(
+        self, rich_text_list: List[RichTextBase], out: StringIO
+    ) -> None:
+        """
+        Writes rich texts with the same nesting of formatting elements as the
+        TS RichTextRenderer. Code annotations replace the other formatting
+        except the color and the link.
+        """
+        for rich_text in rich_text_list or []:
+            if isinstance(rich_text, RichTextText):
+                text = rich_text.text.content
+                if not text:
+                    continue
+                text = escape_text(text)
+
+                annotations = rich_text.annotations
+                url = rich_text.href or (
+                    rich_text.text.link.url if rich_text.text.link else None
+                )
+
+                if annotations is not None and annotations.code:
+                    prefix = '<code class="notion-inline-code">'
+                    suffix = "</code>"
+                else:
+                    prefix = "<span>"
+                    suffix = "</span>"
+                    if annotations is not None:
+                        if annotations.bold:
+                            prefix = "<strong>" + prefix
+                            suffix += "</strong>"
+                        if annotations.italic:
+                            prefix = "<em>" + prefix
+                            suffix += "</em>"
+                        if annotations.strikethrough:
+                            prefix = "<del>" + prefix
+                            suffix += "</del>"
+                        if annotations.underline:
+                            prefix = "<u>" + prefix
+                            suffix += "</u>"
+
+                if (
+                    annotations is not None
+                    and annotations.color
+                    and annotations.color != "default"
+                ):
+                    prefix = (
+                        '<span class="notion-text-color-'
+                        f'{escape_attribute(annotations.color)}">' + prefix
+                    )
+                    suffix += "</span>"
+
+                if url and is_safe_url(url):
+                    prefix = (
+                        f'<a href="{escape_attribute(url)}" class="notion-link" '
+                        'target="_blank" rel="noopener noreferrer">' + prefix
+                    )
+                    suffix += "</a>"
+
+                out.write(prefix + text + suffix)
+            elif isinstance(rich_text, RichTextEquation):
+                out.write(
+                    '<span class="notion-equation">'
+                    f"{escape_text(rich_text.equation.expression)}</span>"
+                )
+
+    def convert_paragraph_block(
+        self, block: ParagraphBlock, depth: int, out: StringIO
+    ) -> None:
+        self._open_block(block, "notion-text-block", out)
+        rich_text = block.paragraph.rich_text
+        if rich_text:
+            out.write('<div class="notranslate">')
+            self.write_rich_text(rich_text, out)
+            out.write("</div>")
+        self._write_children(block.children, depth, out)
+        out.write("</div>")
+
+    def _convert_heading_block(
+        self,
+        block: Heading1Block | Heading2Block | Heading3Block,
+        tag: str,
+        class_name: str,
+        rich_text: List[RichTextBase],
+        out: StringIO,
+    ) -> None:
+        # Headings are one level lower than in JSON-DOC, as the page title
+        # is the h1 element
+        self._open_block(block, class_name, out)
+        out.write(f'<div><{tag} class="notranslate">')
+        self.write_rich_text(rich_text, out)
+        out.write(f"</{tag}></div></div>")
+
+    def convert_heading_1_block(
+        self, block: Heading1Block, depth: int, out: StringIO
+    ) -> None:
+        self._convert_heading_block(
+            block, "h2", "notion-header-block", block.heading_1.rich_text, out
+        )
+
+    def convert_heading_2_block(
+        self, block: Heading2Block, depth: int, out: StringIO
+    ) -> None:
+        self._convert_heading_block(
+            block, "h3", "notion-sub_header-block", block.heading_2.rich_text, out
+        )
+
+    def convert_heading_3_block(
+        self, block: Heading3Block, depth: int, out: StringIO
+    ) -> None:
+        self._convert_heading_block(
+            block, "h4", "notion-sub_header-block", block.heading_3.rich_text, out
+        )
+
+    def _convert_list_item_block(
+        self,
+        block: BulletedListItemBlock | NumberedListItemBlock,
+        class_name: str,
+        rich_text: List[RichTextBase],
+        depth: int,
+        out: StringIO,
+    ) -> None:
+        # Numbers are added by CSS counters, see lists.css in the TS styles
+        self._open_block(block, class_name, out)
+        if isinstance(block, BulletedListItemBlock):
+            out.write('<div class="notion-list-item-box-left"></div>')
+        out.write('<div class="notion-list-content">')
+        self.write_rich_text(rich_text, out)
+        out.write("</div></div>")
+        # Children follow the item instead of being nested in it. The margin
+        # is the one the TS renderer computes, which is depth + 1 * 24
+        self._write_children(block.children, depth, out, margin=depth + 24)
+
+    def convert_bulleted_list_item_block(
+        self, block: BulletedListItemBlock, depth: int, out: StringIO
+    ) -> None:
+        self._convert_list_item_block(
+            block,
+            "notion-bulleted_list-block",
+            block.bulleted_list_item.rich_text,
+            depth,
+            out,
+        )
+
+    def convert_numbered_list_item_block(
+        self, block: NumberedListItemBlock, depth: int, out: StringIO
+    ) -> None:
+        self._convert_list_item_block(
+            block,
+            "notion-numbered_list-block",
+            block.numbered_list_item.rich_text,
+            depth,
+            out,
+        )
+
+    def convert_code_block(self, block: CodeBlock, depth: int, out: StringIO) -> None:
+        language = block.code.language.value if block.code.language else None
+        self._open_block(block, "notion-code-block", out)
+        out.write(
+            '<div><div role="figure"><div class="notion-code-block-language">'
+            f"{escape_text(language or 'Plain Text')}</div>"
+            '<div><div class="line-numbers notion-code-block-content">'
+            '<div class="notranslate">'
+        )
+        self.write_rich_text(block.code.rich_text, out)
+        out.write("</div></div></div></div></div></div>")
+
+    def convert_image_block(self, block: ImageBlock, depth: int, out: StringIO) -> None:
+        image = block.image
+        file = getattr(image, "external", None) or getattr(image, "file", None)
+        url = file.url if file is not None else None
+        caption = getattr(image, "caption", None)
+
+        self._open_block(block, "notion-image-block", out)
+        out.write(
+            '<div class="notion-selectable-container"><div role="figure">'
+            '<div class="notion-cursor-default">'
+        )
+        if url and is_safe_url(url, image=True):
+            alt = "" if caption else "Image"
+            out.write(
+                '<div class="notion-image-container">'
+                f'<img alt="{alt}" src="{escape_attribute(url)}"></div>'
+            )
+        out.write("</div>")
+        if caption:
+            out.write(
+                '<div class="notranslate"><figcaption class="notion-image-caption">'
+                '<div class="caption-content caption-expanded">'
+            )
+            self.write_rich_text(caption, out)
+            out.write("</div></figcaption></div>")
+        out.write("</div></div></div>")
+
+    def _write_table_row(
+        self, block: TableRowBlock, is_header: bool, out: StringIO
+    ) -> None:
+        tag = "th" if is_header else "td"
+        cell_start = (
+            ('<th scope="col">' if is_header else "<td>")
+            + '<div class="notion-table-cell">'
+            '<div class="notion-table-cell-text notranslate">'
+        )
+        cell_end = f"</div></div></{tag}>"
+
+        out.write(
+            '<tr class="notion-table-row" '
+            f'data-block-id="{escape_attribute(block.id)}">'
+        )
+        for cell in block.table_row.cells or []:
+            out.write(cell_start)
+            self.write_rich_text(cell, out)
+            out.write(cell_end)
+        out.write("</tr>")
+
+    def _write_table(
+        self,
+        block: BlockBase,
+        rows: List[TableRowBlock],
+        has_column_header: bool,
+        out: StringIO,
+    ) -> None:
+        self._open_block(block, "notion-table-block", out)
+        out.write(
+            '<div class="notion-scroller horizontal">'
+            '<div class="notion-table-content"><table><tbody>'
+        )
+        for idx, row in enumerate(rows):
+            if isinstance(row, TableRowBlock):
+                self._write_table_row(row, idx == 0 and has_column_header, out)
+        out.write("</tbody></table></div></div></div>")
+
+    def convert_table_block(self, block: TableBlock, depth: int, out: StringIO) -> None:
+        self._write_table(
+            block, block.children or [], bool(block.table.has_column_header), out
+        )
+
+    def convert_table_row_block(
+        self, block: TableRowBlock, depth: int, out: StringIO
+    ) -> None:
+        # A row outside of a table is rendered as a table with a single row
+        self._write_table(block, [block], False, out)
+
+    def convert_quote_block(self, block: QuoteBlock, depth: int, out: StringIO) -> None:
+        self._open_block(block, "notion-quote-block", out)
+        out.write('<blockquote><div class="notranslate">')
+        self.write_rich_text(block.quote.rich_text, out)
+        out.write("</div></blockquote>")
+        self._write_children(block.children, depth, out)
+        out.write("</div>")
+
+    def convert_divider_block(
+        self, block: DividerBlock, depth: int, out: StringIO
+    ) -> None:
+        self._open_block(block, "notion-divider-block", out)
+        out.write(
+            '<div class="notion-cursor-default"><div role="separator"></div></div>'
+            "</div>"
+        )
+
+    def convert_to_do_block(self, block: ToDoBlock, depth: int, out: StringIO) -> None:
+        checked = block.to_do.checked
+        self._open_block(block, "notion-to_do-block", out)
+        out.write(
+            '<div class="pseudoHover pseudoActive">'
+            '<input class="check" type="checkbox"'
+            f"{' checked' if checked else ''} readonly></div>"
+            f'<div class="notranslate{" checked" if checked else ""}">'
+        )
+        self.write_rich_text(block.to_do.rich_text, out)
+        out.write("</div>")
+        self._write_children(block.children, depth, out)
+        out.write("</div>")
+
+    def convert_toggle_block(
+        self, block: ToggleBlock, depth: int, out: StringIO
+    ) -> None:
+        self._open_block(block, "notion-toggle-block", out)
+        out.write(
+            '<div aria-expanded="true" style="display:flex;align-items:center;'
+            f'gap:4px"><div role="button">{TOGGLE_ICON}</div>'
+            '<div class="notranslate">'
+        )
+        self.write_rich_text(block.toggle.rich_text, out)
+        out.write("</div></div>")
+        if block.children:
+            out.write('<div style="margin-left:18px">')
+            self._write_children(block.children, depth, out)
+            out.write("</div>")
+        out.write("</div>")
+
+    def convert_column_list_block(
+        self, block: ColumnListBlock, depth: int, out: StringIO
+    ) -> None:
+        children = block.children or []
+        self._open_block(block, "notion-column_list-block", out)
+        out.write(
+            '<div class="notion-column-list" '
+            'style="display:flex;gap:44px;flex-wrap:nowrap">'
+        )
+        for child in children:
+            if child.type == "column":
+                out.write('<div class="notion-column" style="flex:1;min-width:0">')
+                for column_child in child.children or []:
+                    self._write_block(column_child, depth + 1, out)
+                out.write("</div>")
+        out.write("</div>")
+        self._write_children(
+            [child for child in children if child.type != "column"], depth, out
+        )
+        out.write("</div>")
+
+    def convert_column_block(self, block: BlockBase, depth: int, out: StringIO) -> None:
+        # Columns are rendered by their column list, this only handles
+        # columns outside of one
+        out.write('<div class="notion-column" style="flex:1;min-width:0">')
+        for child in block.children or []:
+            self._write_block(child, depth + 1, out)
+        out.write("</div>")
+
+    def convert_equation_block(
+        self, block: EquationBlock, depth: int, out: StringIO
+    ) -> None:
+        # The TS renderer typesets equations with KaTeX in the browser and
+        # falls back to the expression as text, which is rendered here
+        self._open_block(block, "notion-equation-block", out)
+        out.write(
+            '<div><div class="notion-equation-display">'
+            '<div class="notion-equation-content">'
+            f"{escape_text(block.equation.expression)}</div></div></div></div>"
+        )
+
+
+def jsondoc_to_html(jsondoc, **options) -> str:
+    return JsonDocToHtmlConverter(**options).convert(jsondoc)
+
+
+def iter_html(jsondoc, **options) -> Iterator[str]:
+    return JsonDocToHtmlConverter(**options).iter_html(jsondoc)
+
+
+def write_html(jsondoc, fp: TextIO, **options) -> None:
+    JsonDocToHtmlConverter(**options).write_html(jsondoc, fp)
@@ -1,8 +1,14 @@
+import inspect
+import json
 import re
-from typing import List, Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from io import StringIO
+from typing import Any, Callable, Dict, Iterator, List, TextIO, Union
 
 from pydantic import validate_call
 
+from jsondoc.convert.budget import RenderBudget
 from jsondoc.convert.utils import get_rich_text_from_block
 from jsondoc.models.block.base import BlockBase
 from jsondoc.models.block.types.code import CodeBlock
@@ -19,7 +25,7 @@ from jsondoc.models.block.types.table import TableBlock
 from jsondoc.models.block.types.table_row import TableRowBlock
 from jsondoc.models.page import Page
 from jsondoc.models.shared_definitions import Annotations
-from jsondoc.serialize import load_jsondoc, load_page
+from jsondoc.serialize import load_block, load_jsondoc, load_page
 
 convert_heading_re = re.compile(r"convert_heading_(\d+)")
 line_beginning_re = re.compile(r"^", re.MULTILINE)
@@ -43,6 +49,54 @@ ASTERISK = "*"
 UNDERSCORE = "_"
 
 
+# Parallel rendering of pages, see JsonDocToMarkdownConverter.convert_page().
+# Loading a block takes several times longer than rendering it, so workers
+# only pay off when they load the blocks from raw dicts and there are enough
+# of them to amortize starting the processes.
+PARALLEL_MIN_BLOCKS = 2000
+PARALLEL_MIN_CHUNK_SIZE = 500
+# Chunks per worker, so that workers that finish early pick up more work
+PARALLEL_CHUNKS_PER_WORKER = 4
+
+
+# Characters that are escaped with the escape_misc option
+MISC_ESCAPED_CHARS = "\\&<`[>~#=+|-"
+
+
+@lru_cache(maxsize=None)
+def get_escaper(
+    escape_misc: bool, escape_asterisks: bool, escape_underscores: bool
+) -> Callable[[str], str]:
+    """
+    Returns a function that escapes markdown, built once for each combination
+    of escape options and shared by all converters. Escaped characters are
+    prefixed with a backslash. With escape_misc, so are "." and ")" after
+    a digit, to prevent text from becoming a list item.
+    """
+    chars = MISC_ESCAPED_CHARS if escape_misc else ""
+    if escape_asterisks:
+        chars += "*"
+    if escape_underscores:
+        chars += "_"
+
+    if escape_misc:
+        # A single pass over the text. Both alternatives start with a character
+        # set, which lets the regex engine skip quickly to possible matches
+        pattern = re.compile("[%s]|[.)](?<=[0-9][.)])" % re.escape(chars))
+        return partial(pattern.sub, r"\\\g<0>")
+
+    # Without context-dependent rules, str.replace() per character is faster
+    # than a regex or str.translate() with multi-character replacements
+    replacements = [(char, "\\" + char) for char in chars]
+
+    def escape(text: str) -> str:
+        for char, escaped in replacements:
+            text = text.replace(char, escaped)
+        return text
+
+    return escape
+
+
 def _todict(obj):
     return dict((k, getattr(obj, k)) for k in dir(obj) if not k.startswith("_"))
 
@@ -73,6 +127,11 @@ class JsonDocToMarkdownConverter(object):
         escape_misc = True
         heading_style = UNDERLINED
         keep_inline_images_in = []
+        # Output budgets, see RenderBudget. Rendering stops before the first
+        # top-level block that doesn't fit, see stopped_at_block_id.
+        length_function = None
+        max_chars = None
+        max_units = None
         newline_style = SPACES
         strip = None
         strong_em_symbol = ASTERISK
@@ -93,14 +152,30 @@ class JsonDocToMarkdownConverter(object):
                 "You may specify either tags to strip or tags to convert, but not both."
             )
 
+        self.budget = RenderBudget(
+            max_chars=self.options["max_chars"],
+            max_units=self.options["max_units"],
+            length_function=self.options["length_function"],
+        )
+
+        self._escape = get_escaper(
+            self.options["escape_misc"],
+            self.options["escape_asterisks"],
+            self.options["escape_underscores"],
+        )
+
     def __getattr__(self, attr):
         # Handle headings
         m = convert_heading_re.match(attr)
         if m:
             n = int(m.group(1))
 
-            def convert_tag(block, convert_as_inline):
-                return self.convert_heading_n_block(n, block, convert_as_inline)
+            def convert_tag(block, convert_as_inline, out):
+                convert_fn = self.convert_heading_n_block
+                if _is_legacy_handler(getattr(convert_fn, "__func__", None), 4):
+                    out.write(convert_fn(n, block, convert_as_inline) or "")
+                else:
+                    convert_fn(n, block, convert_as_inline, out)
 
             convert_tag.__name__ = "convert_heading_%s_block" % n
             setattr(self, convert_tag.__name__, convert_tag)
@@ -108,41 +183,194 @@ class JsonDocToMarkdownConverter(object):
 
         raise AttributeError(attr)
 
+    @property
+    def stopped_at_block_id(self) -> str | None:
+        """
+        The id of the first top-level block that was left out of the last
+        output because of the budget, or None if the output is complete
+        """
+        return self.budget.stopped_at_block_id
+
     @validate_call
     def convert(self, obj: str | dict | BlockBase | List[BlockBase] | Page) -> str:
-        if isinstance(obj, (str, dict)):
-            jsondoc = load_jsondoc(obj)
-        else:
-            jsondoc = obj
+        jsondoc = self._load(obj)
+        if self.budget.is_limited:
+            return "".join(self._iter_markdown(jsondoc))
+
+        out = StringIO()
+        for separator, block in self._iter_top_level_blocks(jsondoc):
+            out.write(separator)
+            self._write_block(block, False, out)
+        return out.getvalue()
 
+    @validate_call
+    def iter_markdown(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page
+    ) -> Iterator[str]:
+        """
+        Returns an iterator over the markdown of obj, with one chunk per
+        top-level block. Joining the chunks yields the output of convert().
+        """
+        jsondoc = self._load(obj)
+        return self._iter_markdown(jsondoc)
+
+    def _iter_markdown(
+        self, jsondoc: BlockBase | List[BlockBase] | Page
+    ) -> Iterator[str]:
+        budget = self.budget
+        budget.reset()
+        for separator, block in self._iter_top_level_blocks(jsondoc):
+            if budget.is_limited and budget.is_exhausted:
+                budget.stop(block.id)
+                return
+
+            out = StringIO()
+            out.write(separator)
+            self._write_block(block, False, out)
+            chunk = out.getvalue()
+            if chunk:
+                if budget.is_limited and not budget.add(chunk, block.id):
+                    return
+                yield chunk
+
+    def write_markdown(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page, fp: TextIO
+    ) -> None:
+        """
+        Writes the markdown of obj to a text file-like object, one top-level
+        block at a time, so that the whole output is never held in memory.
+        Binary streams and sockets can be wrapped, e.g. with io.TextIOWrapper
+        or socket.makefile("w").
+        """
+        for chunk in self.iter_markdown(obj):
+            fp.write(chunk)
+
+    def _load(
+        self, obj: str | dict | BlockBase | List[BlockBase] | Page
+    ) -> BlockBase | List[BlockBase] | Page:
+        if isinstance(obj, (str, dict)):
+            return load_jsondoc(obj)
+        return obj
+
+    def _iter_top_level_blocks(
+        self, jsondoc: BlockBase | List[BlockBase] | Page
+    ) -> Iterator[tuple[str, BlockBase]]:
+        """
+        Yields the top-level blocks of a JSON-DOC object,
+        each with the separator to write before it
+        """
         if isinstance(jsondoc, Page):
-            return self.convert_page(jsondoc)
+            for block in jsondoc.children:
+                yield "", block
         elif isinstance(jsondoc, BlockBase):
-            return self.convert_block(jsondoc, False)
+            yield "", jsondoc
         elif isinstance(jsondoc, list):
-            return "\n\n".join(self.convert_block(block, False) for block in jsondoc)
+            for idx, block in enumerate(jsondoc):
+                yield "\n\n" if idx > 0 else "", block
         else:
             raise ValueError(f"Invalid object type: {type(jsondoc)}")
 
     @validate_call
-    def convert_page(self, page: Page) -> str:
-        ret = ""
-        for block in page.children:
-            block_str = self.convert_block(block, False)
-            ret += block_str
+    def convert_page(self, page: Page | dict | str, workers: int | None = None) -> str:
+        """
+        Converts a page to markdown. Pages given as a dict or a JSON string
+        with at least PARALLEL_MIN_BLOCKS top-level blocks are rendered in
+        chunks by up to workers processes, which receive the raw block dicts
+        and load them. The page without its blocks is validated here first.
+        The output, and the error for invalid pages, is the same as for
+        serial rendering.
+
+        Pages given as Page objects are always rendered serially, as
+        serializing their blocks for the workers takes about as long
+        as rendering them.
+        """
+        if isinstance(page, str):
+            page = json.loads(page)
+
+        if isinstance(page, dict):
+            # Budgets need the blocks in order, so they are rendered serially
+            if not self.budget.is_limited:
+                chunks = self._get_parallel_chunks(page.get("children") or [], workers)
+                if chunks is not None:
+                    try:
+                        load_page({**page, "children": []})
+                        return self._convert_chunks_in_parallel(chunks, workers)
+                    except Exception:
+                        # Rendered serially below, which raises the same
+                        # error as for a smaller page
+                        pass
+            page = load_page(page)
+
+        if self.budget.is_limited:
+            return "".join(self._iter_markdown(page))
+
+        out = StringIO()
+        self._write_page(page, out)
+        return out.getvalue()
+
+    def _get_parallel_chunks(
+        self, blocks: List[Dict[str, Any]], workers: int | None
+    ) -> List[List[Dict[str, Any]]] | None:
+        """
+        Splits the blocks into contiguous chunks for the workers,
+        or returns None if the blocks should be rendered serially
+        """
+        if workers is None or workers < 2 or len(blocks) < PARALLEL_MIN_BLOCKS:
+            return None
+
+        n_chunks = min(
+            workers * PARALLEL_CHUNKS_PER_WORKER,
+            len(blocks) // PARALLEL_MIN_CHUNK_SIZE,
+        )
+        chunk_size = -(-len(blocks) // n_chunks)
+        return [
+            blocks[idx : idx + chunk_size] for idx in range(0, len(blocks), chunk_size)
+        ]
 
-        return ret
+    def _convert_chunks_in_parallel(
+        self, chunks: List[List[Dict[str, Any]]], workers: int
+    ) -> str:
+        # Options are sent to the workers, so they must be picklable
+        converter_class = type(self)
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            results = executor.map(
+                _convert_blocks_chunk,
+                [converter_class] * len(chunks),
+                [self.options] * len(chunks),
+                chunks,
+            )
+            return "".join(results)
+
+    def _write_page(self, page: Page, out: StringIO) -> None:
+        for block in page.children:
+            self._write_block(block, False, out)
 
-    def _get_children_content(self, block: BlockBase, convert_as_inline: bool) -> str:
-        children_content = ""
+    def _write_children(
+        self, block: BlockBase, convert_as_inline: bool, out: StringIO
+    ) -> None:
         if hasattr(block, "children") and block.children:
             for child in block.children:
-                children_content += self.convert_block(child, convert_as_inline)
-
-        return children_content
+                self._write_block(child, convert_as_inline, out)
 
     @validate_call
     def convert_block(self, block: BlockBase, convert_as_inline: bool) -> str:
+        out = StringIO()
+        self._write_block(block, convert_as_inline, out)
+        return out.getvalue()
+
+    def _write_block(
+        self, block: BlockBase, convert_as_inline: bool, out: StringIO
+    ) -> None:
+        """
+        Writes the markdown of a block to out. Nested blocks are written by
+        the block handlers through this method, which unlike convert_block()
+        does not validate its arguments.
+
+        Handlers overridden in subclasses with the former signature
+        convert_<type>_block(block, convert_as_inline), which returns the
+        markdown of the block, are still supported, and their output is
+        written to out.
+        """
         type_ = block.type
         convert_fn = getattr(self, f"convert_{type_}_block", None)
 
@@ -151,20 +379,10 @@ class JsonDocToMarkdownConverter(object):
             # TODO: Change this back
             # raise ValueError(f"Unsupported block type: {type_}")
 
-        block_content = convert_fn(block, convert_as_inline)
-
-        # rich_text = get_rich_text_from_block(block)
-        # if rich_text is None:
-        #     return ""
-
-        # # Code blocks are kept verbatim
-        # escape = isinstance(block, CodeBlock)
-
-        # block_content = self.convert_rich_text_list_to_markdown(
-        #     rich_text, escape=escape
-        # )
-
-        return block_content
+        if _is_legacy_handler(getattr(convert_fn, "__func__", None), 3):
+            out.write(convert_fn(block, convert_as_inline) or "")
+        else:
+            convert_fn(block, convert_as_inline, out)
 
     def _get_prefix_and_suffix_from_annotations(
         self, annotations: Annotations
@@ -193,14 +411,7 @@ class JsonDocToMarkdownConverter(object):
     def escape(self, text):
         if not text:
             return ""
-        if self.options["escape_misc"]:
-            text = re.sub(r"([\\&<`[>~#=+|-])", r"\\\1", text)
-            text = re.sub(r"([0-9])([.)])", r"\1\\\2", text)
-        if self.options["escape_asterisks"]:
-            text = text.replace("*", r"\*")
-        if self.options["escape_underscores"]:
-            text = text.replace("_", r"\_")
-        return text
+        return self._escape(text)
 
     def indent(self, text, level):
         return line_beginning_re.sub("\t" * level, text) if text else ""
@@ -214,7 +425,26 @@ class JsonDocToMarkdownConverter(object):
         rich_text_list: List[Union[RichTextText, RichTextEquation]],
         escape: bool = True,
     ) -> str:
-        ret = ""
+        out = StringIO()
+        self.write_rich_text_list_to_markdown(rich_text_list, out, escape=escape)
+        return out.getvalue()
+
+    def write_rich_text_list_to_markdown(
+        self,
+        rich_text_list: List[Union[RichTextText, RichTextEquation]],
+        out: StringIO,
+        escape: bool = True,
+    ) -> None:
+        out.writelines(self._iter_rich_text_markdown(rich_text_list, escape))
+
+    def _iter_rich_text_markdown(
+        self,
+        rich_text_list: List[Union[RichTextText, RichTextEquation]],
+        escape: bool,
+    ) -> Iterator[str]:
+        """
+        Yields the markdown of each rich text item
+        """
         for rich_text in rich_text_list:
             if isinstance(rich_text, RichTextText):
                 text_ = rich_text.text.content
@@ -230,52 +460,61 @@ class JsonDocToMarkdownConverter(object):
                 prefix, suffix = self._get_prefix_and_suffix_from_annotations(
                     rich_text.annotations
                 )
-                ret += prefix_ + prefix + text_ + suffix + suffix_
+                yield prefix_ + prefix + text_ + suffix + suffix_
             elif isinstance(rich_text, RichTextEquation):
                 text_ = rich_text.equation.expression
                 if escape:
                     text_ = self.escape(text_)
-                prefix, suffix = ["$$", "$$"]
-                ret += prefix + text_ + suffix
+                yield "$$" + text_ + "$$"
             else:
                 raise ValueError(f"Unsupported rich text type: {type(rich_text)}")
 
-        return ret
+    def _render_content(
+        self, block: BlockBase, rich_text: List[RichTextBase], convert_as_inline: bool
+    ) -> str:
+        """
+        Renders the rich text and the children of a block into a separate buffer,
+        for blocks that need to post-process their content as a whole
+        """
+        buffer = StringIO()
+        self.write_rich_text_list_to_markdown(rich_text, buffer, escape=True)
+        self._write_children(block, convert_as_inline, buffer)
+        return buffer.getvalue()
 
     def convert_paragraph_block(
-        self, block: ParagraphBlock, convert_as_inline: bool
-    ) -> str:
+        self, block: ParagraphBlock, convert_as_inline: bool, out: StringIO
+    ) -> None:
         try:
             rich_text = get_rich_text_from_block(block)
         except ValueError:
-            return ""
+            return
 
         # Code blocks are kept verbatim
         # escape = isinstance(block, CodeBlock)
 
-        text = self.convert_rich_text_list_to_markdown(rich_text, escape=True)
-
-        text += self._get_children_content(block, convert_as_inline)
-
-        if convert_as_inline:
-            return text
+        start = out.tell()
+        self.write_rich_text_list_to_markdown(rich_text, out, escape=True)
+        self._write_children(block, convert_as_inline, out)
 
-        # return "\n\n" + block_content
-        return "%s\n\n" % text if text else ""
+        # Only non-empty paragraphs are terminated
+        if not convert_as_inline and out.tell() != start:
+            out.write("\n\n")
 
     def convert_divider_block(
-        self, block: DividerBlock, convert_as_inline: bool
-    ) -> str:
+        self, block: DividerBlock, convert_as_inline: bool, out: StringIO
+    ) -> None:
         if convert_as_inline:
-            return ""
+            return
 
-        return "\n\n---\n\n"
+        out.write("\n\n---\n\n")
 
-    def convert_code_block(self, block: CodeBlock, convert_as_inline: bool) -> str:
+    def convert_code_block(
+        self, block: CodeBlock, convert_as_inline: bool, out: StringIO
+    ) -> None:
         try:
             rich_text = get_rich_text_from_block(block)
         except ValueError:
-            return ""
+            return
 
         try:
             language = block.code.language.value
@@ -288,111 +527,169 @@ class JsonDocToMarkdownConverter(object):
         # if language:
         #     language = f" {language}"
 
-        code = self.convert_rich_text_list_to_markdown(rich_text, escape=True)
-        code += self._get_children_content(block, convert_as_inline)
+        if not convert_as_inline:
+            out.write(f"```{language}\n")
 
-        if convert_as_inline:
-            return f"{code}"
+        self.write_rich_text_list_to_markdown(rich_text, out, escape=True)
+        self._write_children(block, convert_as_inline, out)
 
-        return f"```{language}\n{code}\n```\n\n"
+        if not convert_as_inline:
+            out.write("\n```\n\n")
 
     def convert_heading_n_block(
         self,
         n: int,
         block: Heading1Block | Heading2Block | Heading3Block,
         convert_as_inline: bool,
-    ):
+        out: StringIO,
+    ) -> None:
         try:
             rich_text = get_rich_text_from_block(block)
         except ValueError:
-            return ""
-        # if rich_text is None:
-        #     return ""
-
-        text = self.convert_rich_text_list_to_markdown(rich_text, escape=True)
-        text += self._get_children_content(block, convert_as_inline)
+            return
 
         if convert_as_inline:
-            return text
+            self.write_rich_text_list_to_markdown(rich_text, out, escape=True)
+            self._write_children(block, convert_as_inline, out)
+            return
 
         style = self.options["heading_style"].lower()
 
         if style == UNDERLINED and n <= 2:
             line = "=" if n == 1 else "-"
-            return self.underline(text, line)
+            text = self._render_content(block, rich_text, convert_as_inline)
+            out.write(self.underline(text, line))
+            return
 
         hashes = "#" * n
-        if style == ATX_CLOSED:
-            return "%s %s %s\n\n" % (hashes, text, hashes)
+        out.write(hashes + " ")
+        self.write_rich_text_list_to_markdown(rich_text, out, escape=True)
+        self._write_children(block, convert_as_inline, out)
 
-        return "%s %s\n\n" % (hashes, text)
+        if style == ATX_CLOSED:
+            out.write(" " + hashes + "\n\n")
+        else:
+            out.write("\n\n")
 
-    def convert_quote_block(self, block: QuoteBlock, convert_as_inline: bool) -> str:
+    def convert_quote_block(
+        self, block: QuoteBlock, convert_as_inline: bool, out: StringIO
+    ) -> None:
         try:
             rich_text = get_rich_text_from_block(block)
         except ValueError:
-            return ""
-
-        # Code blocks are kept verbatim
-        # escape = isinstance(block, CodeBlock)
-
-        text = self.convert_rich_text_list_to_markdown(rich_text, escape=True)
-        text += self._get_children_content(block, convert_as_inline)
+            return
 
         if convert_as_inline:
-            return text
-        return (
-            "\n" + (line_beginning_re.sub("> ", text.strip()) + "\n\n") if text else ""
-        )
+            self.write_rich_text_list_to_markdown(rich_text, out, escape=True)
+            self._write_children(block, convert_as_inline, out)
+            return
 
-    def _convert_table_row_block(
-        self, block: TableRowBlock, convert_as_inline: bool, is_headrow: bool
-    ) -> str:
-        # cells = block.table_row.cells
+        # Every line of the content is prefixed
+        text = self._render_content(block, rich_text, convert_as_inline)
+        if text:
+            out.write("\n" + line_beginning_re.sub("> ", text.strip()) + "\n\n")
 
-        # cells = el.find_all(["td", "th"])
+    def _write_table_row_block(
+        self,
+        block: TableRowBlock,
+        convert_as_inline: bool,
+        is_headrow: bool,
+        out: StringIO,
+    ) -> None:
         cells = block.table_row.cells
 
-        overline = ""
-        underline = ""
-        if is_headrow:
-            # first row and is headline: print headline underline
-            full_colspan = 0
-            for cell in cells:
-                # if "colspan" in cell.attrs and cell["colspan"].isdigit():
-                #     full_colspan += int(cell["colspan"])
-                # else:
-                full_colspan += 1
-            underline += "| " + " | ".join(["---"] * full_colspan) + " |" + "\n"
-        # else:
-        #     # first row, not headline, and:
-        #     # - the parent is table or
-        #     # - the parent is tbody at the beginning of a table.
-        #     # print empty headline above this row
-        #     overline += "| " + " | ".join([""] * len(cells)) + " |" + "\n"
-        #     overline += "| " + " | ".join(["---"] * len(cells)) + " |" + "\n"
-
-        text = ""
+        out.write("|")
         for cell in cells:
-            cell_text = self.convert_rich_text_list_to_markdown(cell, escape=True)
-            text += " " + cell_text.strip().replace("\n", " ") + " |"
+            out.write(" ")
+            self._write_table_cell(cell, out)
+            out.write(" |")
+        out.write("\n")
 
-        return overline + "|" + text + "\n" + underline
+        if is_headrow:
+            # first row and is headline: print headline underline
+            out.write("| " + " | ".join(["---"] * len(cells)) + " |" + "\n")
 
-    def convert_table_block(self, block: TableBlock, convert_as_inline: bool) -> str:
-        text = ""
+    def _write_table_cell(
+        self,
+        cell: List[Union[RichTextText, RichTextEquation]],
+        out: StringIO,
+    ) -> None:
+        """
+        Writes the markdown of a cell stripped and on one line. Whitespace
+        is held back until text follows it, so the cell is written item by
+        item without rendering it into a separate buffer first.
+        """
+        # None until the first text is written
+        pending = None
+        for text in self._iter_rich_text_markdown(cell, escape=True):
+            text = text.replace("\n", " ")
+            stripped = text.rstrip()
+            if pending is None:
+                stripped = stripped.lstrip()
+                if not stripped:
+                    continue
+                pending = ""
+            elif not stripped:
+                pending += text
+                continue
+            out.write(pending + stripped)
+            pending = text[len(text.rstrip()) :]
+
+    def convert_table_block(
+        self, block: TableBlock, convert_as_inline: bool, out: StringIO
+    ) -> None:
+        out.write("\n\n")
 
         for n, row in enumerate(block.children):
             is_headrow = block.table.has_column_header and n == 0
-
-            text += self._convert_table_row_block(
+            self._write_table_row_block(
                 row,
                 convert_as_inline,
                 is_headrow=is_headrow,
+                out=out,
             )
 
-        return "\n\n" + text + "\n"
+        out.write("\n")
+
+
+@lru_cache(maxsize=None)
+def _is_legacy_handler(fn: Callable | None, n_args: int) -> bool:
+    """
+    Whether a handler function takes n_args arguments, including self, which
+    is the number of arguments of the former handlers that return markdown
+    instead of writing it to a buffer
+    """
+    if fn is None:
+        return False
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    if any(p.kind in (p.VAR_POSITIONAL, p.VAR_KEYWORD) for p in parameters):
+        return False
+    return len(parameters) == n_args
+
+
+def _convert_blocks_chunk(
+    converter_class: type, options: dict, blocks: List[Dict[str, Any]]
+) -> str:
+    """
+    Loads and renders a chunk of top-level blocks in a worker process
+    """
+    converter = converter_class(**options)
+    out = StringIO()
+    for block in blocks:
+        converter._write_block(load_block(block), False, out)
+    return out.getvalue()
 
 
 def jsondoc_to_markdown(jsondoc, **options):
     return JsonDocToMarkdownConverter(**options).convert(jsondoc)
+
+
+def iter_markdown(jsondoc, **options) -> Iterator[str]:
+    return JsonDocToMarkdownConverter(**options).iter_markdown(jsondoc)
+
+
+def write_markdown(jsondoc, fp: TextIO, **options) -> None:
+    JsonDocToMarkdownConverter(**options).write_markdown(jsondoc, fp)
@@ -0,0 +1,458 @@
+import re
+from datetime import datetime
+from typing import List, Literal
+
+from bs4 import BeautifulSoup, ParserRejectedMarkup
+from markdown_it import MarkdownIt
+from markdown_it.token import Token
+from pydantic import BaseModel
+
+from jsondoc.convert.html import HtmlToJsonDocConverter, reconcile_to_block
+from jsondoc.convert.placeholder import BreakElementPlaceholderBlock
+from jsondoc.convert.utils import (
+    assign_block_ids,
+    create_bullet_list_item_block,
+    create_code_block,
+    create_divider_block,
+    create_h1_block,
+    create_h2_block,
+    create_h3_block,
+    create_image_block,
+    create_numbered_list_item_block,
+    create_page,
+    create_paragraph_block,
+    create_quote_block,
+    create_rich_text,
+    create_table_block,
+    create_table_row_block,
+    run_final_block_transformations,
+)
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.block.types.code import Language
+from jsondoc.models.block.types.rich_text.base import RichTextBase
+from jsondoc.models.page import Page
+from jsondoc.utils import DEFERRED_ID_STRATEGIES, get_content_hash, get_current_time
+
+whitespace_re = re.compile(r"[\t ]+")
+br_tag_re = re.compile(r"<br\s*/?>", re.IGNORECASE)
+
+LANGUAGES = frozenset(language.value for language in Language)
+
+# Markdown source formats that are converted without pandoc, mapped to the
+# converter options that match the pandoc extensions enabled by the format
+MARKDOWN_FORMAT_OPTIONS = {
+    "markdown": {"smart": True, "implicit_figures": True},
+    "commonmark": {},
+    "gfm": {},
+    "markdown_github": {},
+}
+
+# Inline tokens that are converted to annotations, mapped to their index in
+# the style tuples of MarkdownToJsonDocConverter._convert_inline()
+ANNOTATION_TAGS = {"strong": 1, "em": 2, "s": 3}
+
+
+def create_markdown_parser(smart: bool = False) -> MarkdownIt:
+    """
+    Returns a CommonMark parser with GFM tables and strikethrough
+    """
+    md = MarkdownIt("commonmark", {"typographer": smart})
+    md.enable(["table", "strikethrough"])
+    if smart:
+        md.enable(["replacements", "smartquotes"])
+    return md
+
+
+class MarkdownToJsonDocConverter(object):
+    """
+    Converts CommonMark/GFM markdown to JSON-DOC without going through HTML.
+    Markdown is parsed with markdown-it-py and blocks are created from its
+    token stream.
+
+    Blocks are created with the same rules as HtmlToJsonDocConverter applies
+    to the HTML that pandoc generates from markdown, e.g. h4-h6 headings become
+    paragraphs, hard line breaks split blocks, and items of loose lists contain
+    paragraphs. Raw HTML blocks are converted with HtmlToJsonDocConverter.
+    """
+
+    class Options(BaseModel):
+        force_page: bool = False
+        typeid: bool = False
+        # One of jsondoc.utils.ID_STRATEGIES, defaults to typeid or uuid4
+        # depending on the typeid option
+        id_strategy: Literal["uuid4", "typeid", "counter", "content"] | None = None
+        # Created time of all blocks, defaults to the time of the conversion
+        created_time: datetime | None = None
+        # Language of code blocks without a supported info string
+        code_language: str | None = None
+        # Pandoc markdown extensions, see MARKDOWN_FORMAT_OPTIONS.
+        # smart converts quotes, dashes and ellipses to typographic characters,
+        # implicit_figures converts images that are alone in a paragraph to
+        # image blocks with the alt text as caption
+        smart: bool = False
+        implicit_figures: bool = False
+
+    def __init__(self, **options):
+        self.options = self.Options(**options)
+        self.id_strategy = self.options.id_strategy or (
+            "typeid" if self.options.typeid else "uuid4"
+        )
+        self.markdown_parser = create_markdown_parser(smart=self.options.smart)
+        self.reset_block_kwargs()
+
+    def reset_block_kwargs(self):
+        """
+        Sets the keyword arguments for creating blocks in the current conversion,
+        see HtmlToJsonDocConverter.reset_block_kwargs()
+        """
+        self.block_kwargs = {
+            "created_time": self.options.created_time or get_current_time(),
+            "typeid": self.id_strategy == "typeid",
+        }
+        if self.id_strategy in DEFERRED_ID_STRATEGIES:
+            self.block_kwargs["id"] = ""
+
+    def convert(self, markdown: str) -> Page | BlockBase | List[BlockBase]:
+        self.reset_block_kwargs()
+
+        tokens = self.markdown_parser.parse(markdown)
+        children = run_final_block_transformations(
+            self._build_blocks(tokens, 0, len(tokens)), **self.block_kwargs
+        )
+
+        id_seed = ""
+        if self.id_strategy in DEFERRED_ID_STRATEGIES:
+            id_seed = get_content_hash(markdown)
+
+        if self.options.force_page:
+            return create_page(
+                created_time=self.block_kwargs["created_time"],
+                title=self._get_title(tokens),
+                children=children,
+                id_strategy=self.id_strategy,
+                id_seed=id_seed,
+            )
+
+        if self.id_strategy in DEFERRED_ID_STRATEGIES:
+            assign_block_ids(children, self.id_strategy, seed=id_seed)
+
+        if len(children) == 1:
+            return children[0]
+        return children
+
+    def _get_title(self, tokens: List[Token]) -> str | None:
+        """
+        Returns the text of the first level 1 heading as the page title
+        """
+        for idx, token in enumerate(tokens):
+            if token.type == "heading_open" and token.tag == "h1":
+                rich_text = self._convert_inline(tokens[idx + 1].children, inline=True)
+                return "".join(rt.plain_text for rt in rich_text)
+        return None
+
+    # Blocks
+    #
+    # Block tokens are flat, containers are open and close tokens of the same
+    # level. Their nesting is limited by the maxNesting option of markdown-it.
+
+    @staticmethod
+    def _find_close(tokens: List[Token], idx: int) -> int:
+        """
+        Returns the index of the token that closes the token at idx
+        """
+        if tokens[idx].nesting != 1:
+            return idx
+        level = tokens[idx].level
+        for close_idx in range(idx + 1, len(tokens)):
+            token = tokens[close_idx]
+            if token.nesting == -1 and token.level == level:
+                return close_idx
+        raise ValueError(f"Unclosed token: {tokens[idx].type}")
+
+    def _build_blocks(self, tokens: List[Token], start: int, end: int) -> list:
+        blocks = []
+        html_blocks = []
+        idx = start
+        while idx < end:
+            token = tokens[idx]
+            # Consecutive HTML blocks are converted together, so that elements
+            # can span blank lines
+            if token.type == "html_block":
+                html_blocks.append(token.content)
+                idx += 1
+                continue
+            if html_blocks:
+                blocks += self._build_html("\n".join(html_blocks))
+                html_blocks = []
+
+            close_idx = self._find_close(tokens, idx)
+            blocks += self._build_block(tokens, idx, close_idx)
+            idx = close_idx + 1
+
+        if html_blocks:
+            blocks += self._build_html("\n".join(html_blocks))
+        return blocks
+
+    def _build_block(self, tokens: List[Token], idx: int, close_idx: int) -> list:
+        token = tokens[idx]
+        token_type = token.type
+        if token_type == "paragraph_open":
+            inline_tokens = tokens[idx + 1].children or []
+            # The paragraphs of tight list items are not wrapped in paragraph blocks
+            if token.hidden:
+                return self._convert_inline(inline_tokens, inline=False)
+            if self.options.implicit_figures:
+                figure = self._build_figure(inline_tokens)
+                if figure is not None:
+                    return [figure]
+            return self._reconcile(
+                create_paragraph_block(**self.block_kwargs),
+                self._convert_inline(inline_tokens, inline=False),
+            )
+        elif token_type == "heading_open":
+            if token.tag == "h1":
+                block = create_h1_block(**self.block_kwargs)
+            elif token.tag == "h2":
+                block = create_h2_block(**self.block_kwargs)
+            elif token.tag == "h3":
+                block = create_h3_block(**self.block_kwargs)
+            else:
+                # Same as h4-h6 elements in HTML
+                block = create_paragraph_block(**self.block_kwargs)
+            return self._reconcile(
+                block, self._convert_inline(tokens[idx + 1].children, inline=True)
+            )
+        elif token_type == "hr":
+            return [create_divider_block(**self.block_kwargs)]
+        elif token_type in ("fence", "code_block"):
+            return self._build_code_block(token.info, token.content)
+        elif token_type == "blockquote_open":
+            return self._reconcile(
+                create_quote_block(**self.block_kwargs),
+                self._build_blocks(tokens, idx + 1, close_idx),
+            )
+        elif token_type in ("bullet_list_open", "ordered_list_open"):
+            return self._build_list(tokens, idx, close_idx)
+        elif token_type == "table_open":
+            return [self._build_table(tokens, idx, close_idx)]
+
+        raise ValueError(f"Unsupported token type: {token_type}")
+
+    def _reconcile(self, block: BlockBase, children: list) -> List[BlockBase]:
+        return reconcile_to_block(
+            block,
+            children,
+            typeid=self.block_kwargs["typeid"],
+            defer_ids="id" in self.block_kwargs,
+        )
+
+    def _build_figure(self, inline_tokens: List[Token]) -> BlockBase | None:
+        """
+        Converts a paragraph that only has an image with alt text to an image
+        block that has the alt text as its caption
+        """
+        tokens = [
+            token
+            for token in inline_tokens
+            if not (token.type == "text" and not token.content.strip())
+        ]
+        if len(tokens) != 1 or tokens[0].type != "image":
+            return None
+        url = tokens[0].attrGet("src")
+        if not url:
+            return None
+
+        caption = self._convert_inline(tokens[0].children, inline=True)
+        if not caption:
+            return None
+
+        block = create_image_block(url=url, **self.block_kwargs)
+        block.image.caption = caption
+        return block
+
+    def _build_code_block(self, info: str, code: str) -> List[BlockBase]:
+        if not code:
+            return []
+        # Like whitespace-only <pre> elements, whitespace-only code has no text
+        code = code.strip("\n").rstrip() or None
+
+        language = info.split(maxsplit=1)[0].lower() if info else ""
+        if language not in LANGUAGES:
+            language = self.options.code_language
+
+        return [create_code_block(code=code, language=language, **self.block_kwargs)]
+
+    def _build_list(self, tokens: List[Token], idx: int, close_idx: int) -> list:
+        ordered = tokens[idx].type == "ordered_list_open"
+        blocks = []
+        item_idx = idx + 1
+        while item_idx < close_idx:
+            item_close_idx = self._find_close(tokens, item_idx)
+            if ordered:
+                block = create_numbered_list_item_block(**self.block_kwargs)
+            else:
+                block = create_bullet_list_item_block(**self.block_kwargs)
+            blocks += self._reconcile(
+                block, self._build_blocks(tokens, item_idx + 1, item_close_idx)
+            )
+            item_idx = item_close_idx + 1
+        return blocks
+
+    def _build_table(self, tokens: List[Token], idx: int, close_idx: int) -> BlockBase:
+        rows = []
+        for token in tokens[idx + 1 : close_idx]:
+            if token.type == "tr_open":
+                rows.append([])
+            elif token.type == "inline":
+                rows[-1].append(self._convert_inline(token.children, inline=True))
+
+        table = create_table_block(has_column_header=True, **self.block_kwargs)
+        table.children = [
+            create_table_row_block(cells=cells, **self.block_kwargs) for cells in rows
+        ]
+        return table
+
+    def _build_html(self, html_block: str) -> List[BlockBase]:
+        converter = HtmlToJsonDocConverter(
+            typeid=self.options.typeid,
+            id_strategy=self.options.id_strategy,
+            created_time=self.block_kwargs["created_time"],
+        )
+        try:
+            soup = BeautifulSoup(html_block, "html.parser")
+        except ParserRejectedMarkup:
+            # Keep HTML that can't be parsed as text
+            return self._reconcile(
+                create_paragraph_block(**self.block_kwargs),
+                [create_rich_text(text=html_block.strip())],
+            )
+        converter._start_conversion(soup)
+        return converter._convert_children(soup)
+
+    # Inline content
+
+    def _convert_inline(
+        self, tokens: List[Token] | None, inline: bool
+    ) -> List[RichTextBase | BlockBase]:
+        """
+        Converts the children of an inline token to rich texts. If inline is
+        False, images are converted to image blocks and hard line breaks to
+        break placeholders, which split the block in reconcile_to_block().
+        Otherwise images are replaced with their alt text and hard line breaks
+        with spaces. Inline HTML is dropped, except for line breaks.
+
+        Like text nodes in HTML, whitespace is collapsed and text is stripped
+        at the start and the end of the block and around line breaks.
+        Emphasis, strikethrough and links are open and close tokens in the
+        flat list of children, so they are converted in a single pass however
+        deep they are nested.
+        """
+        # Runs of text as [text, style] in order, where style is a tuple of
+        # (url, bold, italic, strikethrough), and the other converted objects
+        parts = []
+        depths = dict.fromkeys(ANNOTATION_TAGS, 0)
+        urls = []
+        style = (None, None, None, None)
+        for token in tokens or []:
+            token_type = token.type
+            text = None
+            if token_type == "text":
+                text = token.content
+            elif token_type == "softbreak":
+                text = " "
+            elif token_type == "hardbreak" or (
+                token_type == "html_inline" and br_tag_re.fullmatch(token.content)
+            ):
+                if inline:
+                    text = " "
+                else:
+                    parts.append(
+                        BreakElementPlaceholderBlock(
+                            id="", created_time=self.block_kwargs["created_time"]
+                        )
+                    )
+            elif token_type == "code_inline":
+                code = whitespace_re.sub(" ", token.content).strip()
+                if code:
+                    url, bold, italic, strikethrough = style
+                    parts.append(
+                        create_rich_text(
+                            text=code,
+                            url=url,
+                            bold=bold,
+                            italic=italic,
+                            strikethrough=strikethrough,
+                            code=True,
+                        )
+                    )
+            elif token_type == "image":
+                if inline:
+                    text = self._get_plain_text(token.children)
+                elif url := token.attrGet("src"):
+                    parts.append(create_image_block(url=url, **self.block_kwargs))
+            elif token_type in ("link_open", "link_close"):
+                if token.nesting == 1:
+                    urls.append(token.attrGet("href") or style[0])
+                else:
+                    urls.pop()
+                style = (urls[-1] if urls else None,) + style[1:]
+            elif token.tag in ANNOTATION_TAGS and token.nesting != 0:
+                depths[token.tag] += token.nesting
+                index = ANNOTATION_TAGS[token.tag]
+                annotation = depths[token.tag] > 0 or None
+                style = style[:index] + (annotation,) + style[index + 1 :]
+
+            if text is None:
+                continue
+            if parts and isinstance(parts[-1], list) and parts[-1][1] == style:
+                parts[-1][0] += text
+            else:
+                parts.append([text, style])
+
+        ret = []
+        for idx, part in enumerate(parts):
+            if not isinstance(part, list):
+                ret.append(part)
+                continue
+
+            text = whitespace_re.sub(" ", part[0])
+            if idx == 0 or isinstance(parts[idx - 1], BreakElementPlaceholderBlock):
+                text = text.lstrip()
+            if idx == len(parts) - 1 or isinstance(
+                parts[idx + 1], BreakElementPlaceholderBlock
+            ):
+                text = text.rstrip()
+            if text:
+                url, bold, italic, strikethrough = part[1]
+                ret.append(
+                    create_rich_text(
+                        text=text,
+                        url=url,
+                        bold=bold,
+                        italic=italic,
+                        strikethrough=strikethrough,
+                    )
+                )
+        return ret
+
+    @staticmethod
+    def _get_plain_text(tokens: List[Token] | None) -> str:
+        texts = []
+        stack = [iter(tokens or [])]
+        while stack:
+            token = next(stack[-1], None)
+            if token is None:
+                stack.pop()
+                continue
+
+            if token.type in ("text", "code_inline"):
+                texts.append(token.content)
+            elif token.type in ("softbreak", "hardbreak"):
+                texts.append(" ")
+            elif token.type == "image":
+                stack.append(iter(token.children or []))
+        return "".join(texts)
+
+
+def markdown_to_jsondoc(markdown: str, **options) -> Page | BlockBase | List[BlockBase]:
+    return MarkdownToJsonDocConverter(**options).convert(markdown)
@@ -0,0 +1,421 @@
+import base64
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import cycle
+from typing import List, Tuple
+
+import pypandoc
+
+# Input formats that pandoc reads as binary files. The pandoc server
+# expects these base64-encoded.
+PANDOC_BINARY_FORMATS = {"docx", "epub", "odt"}
+
+PANDOC_SERVER_DEFAULT_TIMEOUT = 30.0
+PANDOC_SERVER_STARTUP_TIMEOUT = 10.0
+# Maximum number of documents in a batch request to a pandoc server
+PANDOC_DEFAULT_BATCH_SIZE = 8
+PANDOC_EXTRA_ARGS = ["--wrap=none"]
+
+
+class PandocTimeoutError(RuntimeError):
+    pass
+
+
+class PandocServerError(RuntimeError):
+    pass
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_server_command() -> List[str]:
+    """
+    Returns the command that starts a pandoc server: pandoc-server if it is
+    installed, otherwise the server subcommand of pandoc 3
+    """
+    pandoc_server = shutil.which("pandoc-server")
+    if pandoc_server is not None:
+        return [pandoc_server]
+    try:
+        return [pypandoc.get_pandoc_path(), "server"]
+    except OSError as e:
+        raise PandocServerError(f"Pandoc is not installed: {e}")
+
+
+class PandocPool:
+    """
+    Pool of long-lived pandoc servers on localhost, so that converting a
+    document doesn't start a new pandoc process. Pandoc converts concurrent
+    requests to a server in parallel, so a single server is usually enough.
+
+    Use as a context manager, or call start() and close(). The urls of the
+    servers can be passed to PandocClient in other processes. The servers
+    give up on requests after timeout seconds per document, for batches of
+    up to batch_size documents.
+    """
+
+    def __init__(
+        self,
+        n_servers: int = 1,
+        timeout: float = PANDOC_SERVER_DEFAULT_TIMEOUT,
+        batch_size: int = PANDOC_DEFAULT_BATCH_SIZE,
+    ):
+        if n_servers < 1:
+            raise ValueError("The number of pandoc servers must be at least 1")
+        if batch_size < 1:
+            raise ValueError("The pandoc batch size must be at least 1")
+        self.n_servers = n_servers
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.urls: List[str] = []
+        self._processes: List[subprocess.Popen] = []
+
+    def start(self) -> "PandocPool":
+        command = _get_server_command()
+        try:
+            for _ in range(self.n_servers):
+                port = _get_free_port()
+                process = subprocess.Popen(
+                    [
+                        *command,
+                        "--port",
+                        str(port),
+                        "--timeout",
+                        str(math.ceil(self.timeout * self.batch_size)),
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                )
+                self._processes.append(process)
+                self._wait_for_server(process, port)
+                self.urls.append(f"http://127.0.0.1:{port}")
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def _wait_for_server(self, process: subprocess.Popen, port: int) -> None:
+        deadline = time.monotonic() + PANDOC_SERVER_STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise PandocServerError(
+                    f"Pandoc server exited with code {process.returncode}, "
+                    "pandoc 3 or pandoc-server is required"
+                )
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.1):
+                    return
+            except OSError:
+                time.sleep(0.05)
+        raise PandocServerError("Pandoc server did not start in time")
+
+    def close(self) -> None:
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._processes = []
+        self.urls = []
+
+    def client(self) -> "PandocClient":
+        return PandocClient(self.urls, timeout=self.timeout, batch_size=self.batch_size)
+
+    def __enter__(self) -> "PandocPool":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class PandocClient:
+    """
+    Converts documents to HTML with the pandoc servers at urls, taking turns.
+    Conversions that take longer than timeout seconds per document raise
+    PandocTimeoutError. convert_many() sends at most batch_size documents
+    per request.
+
+    If a server can't be reached, or there are no servers, documents are
+    converted by running pandoc as a subprocess instead.
+    """
+
+    def __init__(
+        self,
+        urls: List[str] | None = None,
+        timeout: float = PANDOC_SERVER_DEFAULT_TIMEOUT,
+        batch_size: int = PANDOC_DEFAULT_BATCH_SIZE,
+    ):
+        if batch_size < 1:
+            raise ValueError("The pandoc batch size must be at least 1")
+        self.urls = list(urls or [])
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._next_url = cycle(self.urls) if self.urls else None
+
+    def convert_file(self, input_file: str, format: str | None) -> str:
+        """
+        Converts a file to HTML. Without a format, pandoc infers it from the
+        file extension, which is only supported by the subprocess path.
+        """
+        if self._next_url is None or format is None:
+            return _convert_with_subprocess(input_file, format, timeout=self.timeout)
+
+        mode = "rb" if format in PANDOC_BINARY_FORMATS else "r"
+        with open(input_file, mode) as file:
+            content = file.read()
+        return self.convert_text(content, format, input_file=input_file)
+
+    def convert_text(
+        self, content: str | bytes, format: str, input_file: str | None = None
+    ) -> str:
+        if self._next_url is None:
+            return _convert_with_subprocess(
+                input_file, format, content=content, timeout=self.timeout
+            )
+
+        request = _make_request(content, format)
+        try:
+            result = self._post(next(self._next_url), request, self.timeout)
+        except (ConnectionError, urllib.error.URLError) as e:
+            logging.warning(
+                f"Pandoc server is unavailable, converting with a subprocess: {e}"
+            )
+            return _convert_with_subprocess(
+                input_file, format, content=content, timeout=self.timeout
+            )
+        return _get_output(result)
+
+    def convert_many(
+        self, documents: List[Tuple[str | bytes, str]]
+    ) -> List[str | Exception]:
+        """
+        Converts a list of (content, format) pairs in batch requests of at
+        most batch_size documents, sent to the servers in turn and converted
+        concurrently. Returns the HTML of each document, or the exception
+        raised while converting it, in the order of the documents.
+        """
+        if not documents:
+            return []
+        if self._next_url is None:
+            return [
+                _try(
+                    _convert_with_subprocess,
+                    None,
+                    format,
+                    content=content,
+                    timeout=self.timeout,
+                )
+                for content, format in documents
+            ]
+
+        batches: List[List[int]] = [
+            list(range(start, min(start + self.batch_size, len(documents))))
+            for start in range(0, len(documents), self.batch_size)
+        ]
+        urls = [next(self._next_url) for _ in batches]
+        results: List[str | Exception] = [None] * len(documents)
+
+        def convert_batch(url: str, indices: List[int]) -> None:
+            requests = [_make_request(*documents[i]) for i in indices]
+            try:
+                # Pandoc converts the documents of a batch one after another
+                outputs = self._post(
+                    f"{url}/batch", requests, self.timeout * len(indices)
+                )
+            except (ConnectionError, urllib.error.URLError) as e:
+                logging.warning(
+                    f"Pandoc server is unavailable, converting with a subprocess: {e}"
+                )
+                for i in indices:
+                    content, format = documents[i]
+                    results[i] = _try(
+                        _convert_with_subprocess,
+                        None,
+                        format,
+                        content=content,
+                        timeout=self.timeout,
+                    )
+                return
+            except RuntimeError as e:
+                for i in indices:
+                    results[i] = e
+                return
+            for i, output in zip(indices, outputs):
+                results[i] = _try(_get_output, output)
+
+        with ThreadPoolExecutor(
+            max_workers=min(len(self.urls), len(batches))
+        ) as executor:
+            for _ in executor.map(convert_batch, urls, batches):
+                pass
+        return results
+
+    def _post(self, url: str, data: dict | list, timeout: float) -> dict | list:
+        """
+        Raises ConnectionError or URLError if the server can't be reached
+        """
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(data).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            message = e.read().decode("utf-8", errors="replace")
+            raise PandocServerError(f"Pandoc server error: {message}")
+        except (TimeoutError, socket.timeout):
+            raise PandocTimeoutError(f"Pandoc did not finish converting in {timeout}s")
+        except urllib.error.URLError as e:
+            if isinstance(e.reason, (TimeoutError, socket.timeout)):
+                raise PandocTimeoutError(
+                    f"Pandoc did not finish converting in {timeout}s"
+                )
+            raise
+
+
+def _make_request(content: str | bytes, format: str) -> dict:
+    if isinstance(content, bytes):
+        if format in PANDOC_BINARY_FORMATS:
+            content = base64.b64encode(content).decode("ascii")
+        else:
+            content = content.decode("utf-8")
+    return {"text": content, "from": format, "to": "html", "wrap": "none"}
+
+
+def _get_output(result: dict | str) -> str:
+    # Failed conversions return an error message instead of a result
+    if isinstance(result, str):
+        raise PandocServerError(f"Pandoc server error: {result}")
+    if "error" in result:
+        raise PandocServerError(f"Pandoc server error: {result['error']}")
+    output = result["output"]
+    if result.get("base64"):
+        output = base64.b64decode(output).decode("utf-8")
+    return output
+
+
+def _try(fn, *args, **kwargs) -> str | Exception:
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        return e
+
+
+@lru_cache(maxsize=None)
+def _get_input_formats() -> frozenset:
+    return frozenset(pypandoc.get_pandoc_formats()[0])
+
+
+def _convert_with_subprocess(
+    input_file: str | None,
+    format: str | None,
+    content: str | bytes | None = None,
+    timeout: float | None = PANDOC_SERVER_DEFAULT_TIMEOUT,
+) -> str:
+    """
+    Runs pandoc on a file, or on content if given, and kills it after timeout
+    seconds. Formats are checked like pypandoc checks them, and without a
+    format, pandoc infers it from the file extension.
+    """
+    if format is None and input_file is not None:
+        format = os.path.splitext(input_file)[1].strip(".")
+    if not format:
+        raise RuntimeError("Missing format!")
+    format = pypandoc.normalize_format(format)
+    base_format = re.split(r"[+-]", format)[0]
+    input_formats = _get_input_formats()
+    if base_format not in input_formats:
+        raise RuntimeError(
+            f'Invalid input format! Got "{base_format}" but expected one of '
+            f"these: {', '.join(sorted(input_formats))}"
+        )
+
+    command = [
+        pypandoc.get_pandoc_path(),
+        f"--from={format}",
+        "--to=html",
+        *PANDOC_EXTRA_ARGS,
+    ]
+    if content is None:
+        command.append(input_file)
+    elif isinstance(content, str):
+        content = content.encode("utf-8")
+    try:
+        result = subprocess.run(
+            command, input=content, capture_output=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise PandocTimeoutError(f"Pandoc did not finish converting in {timeout}s")
+    if result.returncode != 0:
+        stderr = result.stderr.decode("utf-8", errors="replace")
+        raise RuntimeError(
+            f'Pandoc died with exitcode "{result.returncode}" during conversion: '
+            f"{stderr}"
+        )
+    return result.stdout.decode("utf-8", errors="replace")
+
+
+# Client used by convert_to_html(). Without servers, it runs pandoc as a
+# subprocess for each document.
+_default_client = PandocClient()
+
+
+def set_pandoc_servers(
+    urls: List[str] | None,
+    timeout: float = PANDOC_SERVER_DEFAULT_TIMEOUT,
+    batch_size: int = PANDOC_DEFAULT_BATCH_SIZE,
+) -> None:
+    """
+    Makes convert_to_html() and convert_many_to_html() use the pandoc servers
+    at urls, e.g. the urls of a PandocPool. None goes back to running pandoc
+    as a subprocess.
+    """
+    global _default_client
+    _default_client = PandocClient(urls, timeout=timeout, batch_size=batch_size)
+
+
+def convert_to_html(
+    input_file: str | None,
+    format: str | None,
+    content: str | bytes | None = None,
+) -> str:
+    """
+    Converts a file, or its content if given, to HTML with pandoc
+    """
+    if content is None:
+        return _default_client.convert_file(input_file, format)
+    if format is None:
+        raise ValueError("The format is required to convert content with pandoc")
+    return _default_client.convert_text(content, format, input_file=input_file)
+
+
+def convert_many_to_html(
+    documents: List[Tuple[str | bytes, str]],
+) -> List[str | Exception]:
+    """
+    Converts (content, format) pairs to HTML with pandoc, in batches if
+    pandoc servers are set. Returns the HTML of each document, or the
+    exception raised while converting it.
+    """
+    return _default_client.convert_many(documents)
@@ -0,0 +1,245 @@
+from io import StringIO
+from operator import attrgetter
+from typing import Callable, Dict, Iterator, List, Literal, TextIO, Type
+
+from jsondoc.accessors import BLOCK_TEXT_ACCESSORS
+from jsondoc.convert.budget import RenderBudget
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.page import Page
+from jsondoc.serialize import load_jsondoc
+
+TableMode = Literal["rows", "tsv", "cells", "skip"]
+
+# Separators of the cells of a row for each table mode. With "cells", each
+# cell is a separate text. With "skip", tables are left out.
+CELL_SEPARATORS = {"rows": " | ", "tsv": "\t"}
+
+_TextGetters = tuple[Callable | None, Callable | None, Callable | None]
+
+# Getters of the rich text, caption and cells of each block class. Unlike
+# BlockTextAccessors.get_rich_text, these never modify the block.
+_TEXT_GETTERS: Dict[Type[BlockBase], _TextGetters] = {
+    block_class: tuple(
+        attrgetter(path[1:]) if path is not None else None
+        for path in (
+            accessors.rich_text_path,
+            accessors.caption_path,
+            accessors.cells_path,
+        )
+    )
+    for block_class, accessors in BLOCK_TEXT_ACCESSORS.items()
+}
+_NO_TEXT_GETTERS: _TextGetters = (None, None, None)
+
+
+def _load(
+    obj: str | dict | BlockBase | List[BlockBase] | Page,
+) -> BlockBase | List[BlockBase] | Page:
+    if isinstance(obj, (str, dict)):
+        return load_jsondoc(obj)
+    return obj
+
+
+def _write_block_texts(
+    block: BlockBase,
+    out: List[str],
+    include_captions: bool,
+    table_mode: TableMode,
+    budget: RenderBudget | None = None,
+    separator: str = "",
+    has_output: bool = False,
+) -> bool:
+    """
+    Appends the texts of a block and its descendants to out in document
+    order, skipping empty texts. With a budget, stops at the first block
+    whose texts don't fit and returns True. has_output tells whether texts
+    were written before out, which are then preceded by the separator.
+    """
+    stack = [block]
+    while stack:
+        block = stack.pop()
+        if budget is not None:
+            if budget.is_exhausted:
+                budget.stop(block.id)
+                return True
+            start = len(out)
+
+        get_rich_text, get_caption, get_cells = _TEXT_GETTERS.get(
+            type(block), _NO_TEXT_GETTERS
+        )
+
+        if get_rich_text is not None:
+            rich_text = get_rich_text(block)
+            if rich_text:
+                text = "".join([item.plain_text for item in rich_text])
+                if text:
+                    out.append(text)
+
+        if include_captions and get_caption is not None:
+            caption = get_caption(block)
+            if caption:
+                text = "".join([item.plain_text for item in caption])
+                if text:
+                    out.append(text)
+
+        # Rows are skipped like tables, also when they are given on their own
+        if get_cells is not None and table_mode != "skip":
+            cells = get_cells(block)
+            if cells:
+                cell_texts = [
+                    "".join([item.plain_text for item in cell]) for cell in cells
+                ]
+                if table_mode == "cells":
+                    out.extend([text for text in cell_texts if text])
+                elif any(cell_texts):
+                    out.append(CELL_SEPARATORS[table_mode].join(cell_texts))
+
+        if budget is not None and len(out) > start:
+            text = separator.join(out[start:])
+            if start > 0 or has_output:
+                text = separator + text
+            if not budget.add(text, block.id):
+                del out[start:]
+                return True
+
+        children = getattr(block, "children", None)
+        if children:
+            if table_mode == "skip" and block.type == "table":
+                continue
+            stack.extend(reversed(children))
+
+    return False
+
+
+def iter_text(
+    jsondoc: str | dict | BlockBase | List[BlockBase] | Page,
+    *,
+    separator: str = "\n\n",
+    include_captions: bool = True,
+    table_mode: TableMode = "rows",
+    max_chars: int | None = None,
+    max_units: int | None = None,
+    length_function: Callable[[str], int] | None = None,
+    budget: RenderBudget | None = None,
+) -> Iterator[str]:
+    """
+    Returns an iterator over the plain text of a JSON-DOC object, with one
+    chunk per top-level block. Joining the chunks yields the output of
+    jsondoc_to_text().
+    """
+    if table_mode not in ("rows", "tsv", "cells", "skip"):
+        raise ValueError(f"Invalid table mode: {table_mode}")
+
+    if budget is None and (max_chars is not None or max_units is not None):
+        budget = RenderBudget(max_chars, max_units, length_function)
+    if budget is not None:
+        budget.reset()
+
+    jsondoc = _load(jsondoc)
+    if isinstance(jsondoc, Page):
+        title = jsondoc.properties.title if jsondoc.properties is not None else None
+        texts = []
+        if title is not None and title.title:
+            text = "".join([item.plain_text for item in title.title])
+            if text:
+                if budget is not None and not budget.add(text, jsondoc.id):
+                    return
+                texts.append(text)
+        blocks = jsondoc.children or []
+    elif isinstance(jsondoc, BlockBase):
+        texts = []
+        blocks = [jsondoc]
+    elif isinstance(jsondoc, list):
+        texts = []
+        blocks = jsondoc
+    else:
+        raise ValueError(f"Invalid object type: {type(jsondoc)}")
+
+    # The separator is written before each text but the first
+    is_first = True
+    for block in blocks:
+        stopped = _write_block_texts(
+            block,
+            texts,
+            include_captions,
+            table_mode,
+            budget=budget,
+            separator=separator,
+            has_output=not is_first,
+        )
+        if texts:
+            chunk = separator.join(texts)
+            yield chunk if is_first else separator + chunk
+            is_first = False
+            texts = []
+        if stopped:
+            return
+
+
+def jsondoc_to_text(
+    jsondoc: str | dict | BlockBase | List[BlockBase] | Page,
+    *,
+    separator: str = "\n\n",
+    include_captions: bool = True,
+    table_mode: TableMode = "rows",
+    max_chars: int | None = None,
+    max_units: int | None = None,
+    length_function: Callable[[str], int] | None = None,
+    budget: RenderBudget | None = None,
+) -> str:
+    """
+    Returns the plain text of a JSON-DOC object: the page title, followed
+    by the texts of all blocks in document order, joined with separator.
+    Annotations and links are left out.
+
+    table_mode controls the text of tables: "rows" joins the cells of each
+    row with " | " and "tsv" with tabs, "cells" makes each cell a separate
+    text and "skip" leaves tables out.
+
+    max_chars, max_units and length_function limit the length of the text,
+    see RenderBudget. The text then ends before the first block that doesn't
+    fit. To get the id of that block, pass a RenderBudget as budget instead
+    and read its stopped_at_block_id.
+    """
+    out = StringIO()
+    write_text(
+        jsondoc,
+        out,
+        separator=separator,
+        include_captions=include_captions,
+        table_mode=table_mode,
+        max_chars=max_chars,
+        max_units=max_units,
+        length_function=length_function,
+        budget=budget,
+    )
+    return out.getvalue()
+
+
+def write_text(
+    jsondoc: str | dict | BlockBase | List[BlockBase] | Page,
+    fp: TextIO,
+    *,
+    separator: str = "\n\n",
+    include_captions: bool = True,
+    table_mode: TableMode = "rows",
+    max_chars: int | None = None,
+    max_units: int | None = None,
+    length_function: Callable[[str], int] | None = None,
+    budget: RenderBudget | None = None,
+) -> None:
+    """
+    Writes the plain text of a JSON-DOC object to a text file-like object,
+    one top-level block at a time
+    """
+    for chunk in iter_text(
+        jsondoc,
+        separator=separator,
+        include_captions=include_captions,
+        table_mode=table_mode,
+        max_chars=max_chars,
+        max_units=max_units,
+        length_function=length_function,
+        budget=budget,
+    ):
+        fp.write(chunk)
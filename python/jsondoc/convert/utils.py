@@ -6,6 +6,11 @@ from typing import List, Literal, Optional, Type
 from bs4 import Tag
 from pydantic import validate_call
 
+from jsondoc.accessors import (
+    BLOCKS_WITH_RICH_TEXT,
+    PLACEHOLDER_BLOCKS_WITH_RICH_TEXT,
+    get_block_text_accessors,
+)
 from jsondoc.convert.placeholder import (
     CaptionPlaceholderBlock,
     CellPlaceholderBlock,
@@ -45,30 +50,19 @@ from jsondoc.models.file.external import External
 from jsondoc.models.page import CreatedBy, LastEditedBy, Page, Parent, Properties, Title
 from jsondoc.models.shared_definitions import Annotations
 from jsondoc.rules import is_block_child_allowed
-from jsondoc.utils import generate_block_id, generate_page_id, get_current_time
+from jsondoc.utils import (
+    DEFERRED_ID_STRATEGIES,
+    ID_STRATEGIES,
+    format_hex_as_uuid,
+    generate_block_id,
+    generate_page_id,
+    get_content_hash,
+    get_current_time,
+)
 
 all_whitespace_re = re.compile(r"[\s]+")
 
 
-BLOCKS_WITH_RICH_TEXT: List[Type[BlockBase]] = [
-    ParagraphBlock,
-    CodeBlock,
-    Heading1Block,
-    Heading2Block,
-    Heading3Block,
-    QuoteBlock,
-    BulletedListItemBlock,
-    NumberedListItemBlock,
-    ToDoBlock,
-    ToggleBlock,
-]
-
-PLACEHOLDER_BLOCKS_WITH_RICH_TEXT: List[Type[PlaceholderBlockBase]] = [
-    CaptionPlaceholderBlock,
-    CellPlaceholderBlock,
-]
-
-
 def create_rich_text(
     text: str | None = None,
     url: str | None = None,
@@ -219,10 +213,11 @@ def create_code_block(
         created_time = get_current_time()
 
     language_ = None
-    try:
-        language_ = Language(language)
-    except ValueError:
-        logging.warning(f"Unsupported language: {language}")
+    if language:
+        try:
+            language_ = Language(language)
+        except ValueError:
+            logging.warning(f"Unsupported language: {language}")
 
     rich_text = []
     if code is not None:
@@ -443,14 +438,29 @@ def create_page(
     archived: bool | None = None,
     in_trash: bool | None = None,
     typeid: bool = False,
+    id_strategy: str | None = None,
+    id_seed: str = "",
     # parent: str | None = None,
     # icon # TBD
 ) -> Page:
     """
     Creates a page with the given blocks
+
+    If id_strategy is one of DEFERRED_ID_STRATEGIES, the blocks without ids
+    are assigned ids with assign_block_ids(), and the page id is derived from
+    id_seed, which should identify the source document.
     """
+    if id_strategy is None:
+        id_strategy = "typeid" if typeid else "uuid4"
+
+    if id_strategy in DEFERRED_ID_STRATEGIES:
+        assign_block_ids(children, id_strategy, seed=id_seed)
+
     if id is None:
-        id = generate_page_id(typeid=typeid)
+        if id_strategy in DEFERRED_ID_STRATEGIES:
+            id = format_hex_as_uuid(get_content_hash(f"page:{id_seed}"))
+        else:
+            id = generate_page_id(typeid=id_strategy == "typeid")
 
     if created_time is None:
         created_time = get_current_time()
@@ -494,10 +504,58 @@ def create_page(
     )
 
 
-def create_cell_placeholder_block():
+def assign_block_ids(
+    blocks: List[BlockBase], id_strategy: str, seed: str = ""
+) -> List[BlockBase]:
+    """
+    Assigns ids to the blocks with empty ids and to their children,
+    in document order.
+
+    - counter: the first 20 hex characters of the seed followed by
+      the index of the block in document order, formatted as a UUID
+    - content: hash of the position path and the content of the block
+      (excluding its children), formatted as a UUID
+    - uuid4, typeid: randomly generated ids
+    """
+    if id_strategy not in ID_STRATEGIES:
+        raise ValueError(f"Unsupported id strategy: {id_strategy}")
+
+    seed = seed[:20].ljust(20, "0")
+    counter = 0
+    stack = [(block, str(idx)) for idx, block in enumerate(blocks)][::-1]
+    while stack:
+        block, path = stack.pop()
+        counter += 1
+
+        if not block.id:
+            if id_strategy == "counter":
+                block.id = format_hex_as_uuid(f"{seed}{counter:012x}")
+            elif id_strategy == "content":
+                content = block.model_dump_json(
+                    serialize_as_any=True,
+                    exclude={"id", "created_time", "children"},
+                )
+                block.id = format_hex_as_uuid(get_content_hash(f"{path}:{content}"))
+            else:
+                block.id = generate_block_id(typeid=id_strategy == "typeid")
+
+        children = getattr(block, "children", None)
+        if children:
+            stack.extend(
+                (child, f"{path}.{idx}")
+                for idx, child in reversed(list(enumerate(children)))
+            )
+
+    return blocks
+
+
+def create_cell_placeholder_block(created_time=None):
+    if created_time is None:
+        created_time = get_current_time()
+
     return CellPlaceholderBlock(
         id="",
-        created_time=get_current_time(),
+        created_time=created_time,
         type="cell_placeholder",
         rich_text=[],
     )
@@ -509,82 +567,19 @@ def get_rich_text_from_block(block: BlockBase) -> List[RichTextBase]:
     it will raise a ValueError. If the rich text is not initialized, it will
     initialize it to an empty list and return that.
     """
-    if not block_supports_rich_text(block):
+    get_rich_text = get_block_text_accessors(block).get_rich_text
+    if get_rich_text is None:
         raise ValueError(f"Block of type {type(block)} does not support rich text")
 
-    ret = None
-    if isinstance(block, ParagraphBlock):
-        if block.paragraph.rich_text is None:
-            block.paragraph.rich_text = []
-        ret = block.paragraph.rich_text
-    elif isinstance(block, CodeBlock):
-        if block.code.rich_text is None:
-            block.code.rich_text = []
-        ret = block.code.rich_text
-    elif isinstance(block, Heading1Block):
-        if block.heading_1.rich_text is None:
-            block.heading_1.rich_text = []
-        ret = block.heading_1.rich_text
-    elif isinstance(block, Heading2Block):
-        if block.heading_2.rich_text is None:
-            block.heading_2.rich_text = []
-        ret = block.heading_2.rich_text
-    elif isinstance(block, Heading3Block):
-        if block.heading_3.rich_text is None:
-            block.heading_3.rich_text = []
-        ret = block.heading_3.rich_text
-    elif isinstance(block, QuoteBlock):
-        if block.quote.rich_text is None:
-            block.quote.rich_text = []
-        ret = block.quote.rich_text
-    elif isinstance(block, BulletedListItemBlock):
-        if block.bulleted_list_item.rich_text is None:
-            block.bulleted_list_item.rich_text = []
-        ret = block.bulleted_list_item.rich_text
-    elif isinstance(block, NumberedListItemBlock):
-        if block.numbered_list_item.rich_text is None:
-            block.numbered_list_item.rich_text = []
-        ret = block.numbered_list_item.rich_text
-    elif isinstance(block, ToDoBlock):
-        if block.to_do.rich_text is None:
-            block.to_do.rich_text = []
-        ret = block.to_do.rich_text
-    elif isinstance(block, ToggleBlock):
-        if block.toggle.rich_text is None:
-            block.toggle.rich_text = []
-        ret = block.toggle.rich_text
-    # Placeholder blocks with rich text
-    elif isinstance(block, CaptionPlaceholderBlock):
-        if block.rich_text is None:
-            block.rich_text = []
-        ret = block.rich_text
-    elif isinstance(block, CellPlaceholderBlock):
-        if block.rich_text is None:
-            block.rich_text = []
-        ret = block.rich_text
-    else:
-        raise Exception(
-            f"Unsupported block type: {type(block)}. "
-            "This should not happen as long as this function implements all block types."
-        )
-    # else:
-    #     raise ValueError(f"Unsupported block type: {type(block)}")
-
-    return ret
+    return get_rich_text(block)
 
 
 def append_rich_text_to_block(block: BlockBase, rich_text: RichTextBase):
-    # if not isinstance(block, BlockBase) or not isinstance(rich_text, RichTextBase):
-    #     return False
-    if not block_supports_rich_text(block):
-        raise ValueError(f"Block of type {type(block)} does not support rich text")
-
-    rich_text_list = get_rich_text_from_block(block)
-    rich_text_list.append(rich_text)
+    get_rich_text_from_block(block).append(rich_text)
 
 
 def block_supports_rich_text(block: BlockBase) -> bool:
-    return type(block) in BLOCKS_WITH_RICH_TEXT + PLACEHOLDER_BLOCKS_WITH_RICH_TEXT
+    return get_block_text_accessors(block).get_rich_text is not None
 
 
 @validate_call
@@ -643,7 +638,7 @@ def ensure_table_cell_count(table: TableBlock):
     Ensures that the table has the same number of cells in each row.
     """
     # Get the maximum number of cells in all rows
-    max_cells = max(len(row.table_row.cells) for row in table.children)
+    max_cells = max((len(row.table_row.cells) for row in table.children), default=0)
     for row in table.children:
         n_diff = max_cells - len(row.table_row.cells)
         # Append empty cells to the row
@@ -651,11 +646,11 @@ def ensure_table_cell_count(table: TableBlock):
             row.table_row.cells.append([])
 
 
-def _final_block_transformation(obj: BlockBase | str | RichTextBase):
+def _final_block_transformation(obj: BlockBase | str | RichTextBase, **block_kwargs):
     if isinstance(obj, CaptionPlaceholderBlock):
         # Convert caption to a paragraph block
 
-        ret = create_paragraph_block()
+        ret = create_paragraph_block(**block_kwargs)
         ret.paragraph.rich_text = obj.rich_text
         return ret
     elif isinstance(obj, TableBlock):
@@ -665,12 +660,12 @@ def _final_block_transformation(obj: BlockBase | str | RichTextBase):
         if not text_.strip():
             # Skip empty strings
             return None
-        return create_paragraph_block(text=text_)
+        return create_paragraph_block(text=text_, **block_kwargs)
     elif isinstance(obj, RichTextBase):
         # if not obj.plain_text.strip():
         #     # Skip empty rich text objects
         #     return None
-        new_obj_ = create_paragraph_block()
+        new_obj_ = create_paragraph_block(**block_kwargs)
         new_obj_.paragraph.rich_text = [obj]
         return new_obj_
     elif isinstance(obj, PlaceholderBlockBase):
@@ -687,19 +682,22 @@ def _final_block_transformation(obj: BlockBase | str | RichTextBase):
     return obj
 
 
-def run_final_block_transformations(blocks: List[BlockBase]):
+def run_final_block_transformations(blocks: List[BlockBase], **block_kwargs):
     """
     Runs final checks on blocks after the main conversion is complete.
 
     E.g. Handles residual placeholder blocks after the main conversion is complete.
     This is needed because some placeholder blocks need to be handled in a special way.
+    block_kwargs are passed to the functions that create new blocks.
     """
     ret = []
     for block in blocks:
         if isinstance(getattr(block, "children", None), list):
-            block.children = run_final_block_transformations(block.children)
+            block.children = run_final_block_transformations(
+                block.children, **block_kwargs
+            )
 
-        handled_block = _final_block_transformation(block)
+        handled_block = _final_block_transformation(block, **block_kwargs)
         if handled_block is not None:
             ret.append(handled_block)
 
@@ -4,6 +4,7 @@ from typing import Any, Dict, List, Type, Union
 
 from pydantic import BaseModel, validate_call
 
+from jsondoc.accessors import BLOCK_TEXT_ACCESSORS
 from jsondoc.models.block import Type as BlockType
 from jsondoc.models.block.base import BlockBase
 from jsondoc.models.block.types.bulleted_list_item import BulletedListItemBlock
@@ -32,7 +33,7 @@ from jsondoc.models.block.types.toggle import ToggleBlock
 from jsondoc.models.file import Type as FileType
 from jsondoc.models.file.base import FileBase
 from jsondoc.models.page import Page
-from jsondoc.utils import get_nested_value, set_nested_value
+from jsondoc.utils import compile_path
 
 # Resolve block types
 
@@ -67,17 +68,26 @@ IMAGE_FILE_TYPES = {
     FileType.external: ExternalImage,
 }
 
+# Rich text fields other than rich_text, derived from the shared accessor registry,
+# e.g. {BlockType.code: [".code.caption"], BlockType.image: [".image.caption"]},
+# compiled for the dicts that blocks are loaded from
 OTHER_RICH_TEXT_FIELDS = {
-    BlockType.code: [".code.caption"],
-    BlockType.image: [".image.caption"],
+    block_type: [compile_path(BLOCK_TEXT_ACCESSORS[block_class].caption_path, "dict")]
+    for block_type, block_class in BLOCK_TYPES.items()
+    if BLOCK_TEXT_ACCESSORS[block_class].caption_path is not None
 }
 
 
-# Cell fields are nested lists of rich texts
+# Cell fields are nested lists of rich texts,
+# e.g. {BlockType.table_row: [".table_row.cells"]}
 NESTED_RICH_TEXT_FIELDS = {
-    BlockType.table_row: [".table_row.cells"],
+    block_type: [compile_path(BLOCK_TEXT_ACCESSORS[block_class].cells_path, "dict")]
+    for block_type, block_class in BLOCK_TYPES.items()
+    if BLOCK_TEXT_ACCESSORS[block_class].cells_path is not None
 }
 
+IMAGE_FIELD = compile_path(".image", "dict")
+
 
 def load_rich_text(obj: Union[str, Dict[str, Any]]) -> Type[RichTextBase]:
     obj = deepcopy(obj)
@@ -189,38 +199,37 @@ def load_block(obj: Union[str, Dict[str, Any]]) -> Type[BlockBase]:
     if current_type in OTHER_RICH_TEXT_FIELDS:
         rt_fields = OTHER_RICH_TEXT_FIELDS[current_type]
         for rt_field in rt_fields:
-            val_ = get_nested_value(mutable_obj, rt_field)
+            val_ = rt_field.get(mutable_obj)
 
             if val_ is None:
                 continue
 
             if not isinstance(val_, list):
-                raise ValueError(f"Field {rt_field} must be a list: {val_}")
+                raise ValueError(f"Field {rt_field.path} must be a list: {val_}")
 
             new_val = [load_rich_text(rich_text) for rich_text in val_]
-            set_nested_value(mutable_obj, rt_field, new_val)
+            rt_field.set(mutable_obj, new_val)
 
     # Process cell field
     if current_type in NESTED_RICH_TEXT_FIELDS:
         rt_fields = NESTED_RICH_TEXT_FIELDS[current_type]
         for rt_field in rt_fields:
-            val_ = get_nested_value(mutable_obj, rt_field)
+            val_ = rt_field.get(mutable_obj)
 
             if not isinstance(val_, list):
-                raise ValueError(f"Field {rt_field} must be a list: {val_}")
+                raise ValueError(f"Field {rt_field.path} must be a list: {val_}")
 
             new_val = []
             for row in val_:
                 new_row = [load_rich_text(rich_text) for rich_text in row]
                 new_val.append(new_row)
-            set_nested_value(mutable_obj, rt_field, new_val)
+            rt_field.set(mutable_obj, new_val)
 
     # Process image field
     if current_type == BlockType.image:
-        file_field = ".image"
-        val_ = get_nested_value(mutable_obj, file_field)
+        val_ = IMAGE_FIELD.get(mutable_obj)
         new_val = load_image(val_)
-        set_nested_value(mutable_obj, file_field, new_val)
+        IMAGE_FIELD.set(mutable_obj, new_val)
 
     # Create the block with all properties, including processed children
     block = block_instantiator(**mutable_obj)
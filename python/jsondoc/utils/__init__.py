@@ -1,14 +1,21 @@
 import difflib
+import hashlib
 import json
 import logging
 import time
 import uuid
 from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import lru_cache
+from operator import attrgetter
+from typing import Callable, Literal
 
 from typeid import TypeID
 
-from jsondoc.models.block.base import CreatedBy
+from jsondoc.models.block.base import BlockBase, CreatedBy
+from jsondoc.models.page import Page
+from jsondoc.utils.profiling import get_active_profile
+from jsondoc.utils.visitor import transform, walk
 
 ARBITRARY_JSON_SCHEMA_OBJECT = {
     "type": "object",
@@ -19,6 +26,15 @@ ARBITRARY_JSON_SCHEMA_OBJECT = {
 TYPEID_BLOCK_ID_PREFIX = "bk"
 TYPEID_PAGE_ID_PREFIX = "pg"
 
+# Strategies for generating block and page ids
+# - uuid4: random UUIDs
+# - typeid: random TypeIDs
+# - counter: UUID-formatted document seed followed by a counter
+# - content: UUID-formatted hash of the position and content of a block
+ID_STRATEGIES = ["uuid4", "typeid", "counter", "content"]
+# Ids of these strategies are assigned after all blocks are created
+DEFERRED_ID_STRATEGIES = ["counter", "content"]
+
 
 def generate_block_id(typeid: bool = False) -> str:
     if typeid:
@@ -36,6 +52,19 @@ def get_current_time() -> datetime:
     return datetime.now(tz=timezone.utc)
 
 
+def get_content_hash(content: str | bytes) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha1(content).hexdigest()
+
+
+def format_hex_as_uuid(hex_: str) -> str:
+    """
+    Formats the first 32 characters of a hex string like a UUID
+    """
+    return f"{hex_[:8]}-{hex_[8:12]}-{hex_[12:16]}-{hex_[16:20]}-{hex_[20:32]}"
+
+
 def replace_refs_with_arbitrary_object(data):
     if isinstance(data, dict):
         if "$ref" in data:
@@ -61,39 +90,153 @@ def load_json_file(file_path, deserialize=True) -> dict | str:
             return content
 
 
-def get_nested_value(obj: dict | object, coordinates: str) -> any:
-    keys = coordinates.strip(".").split(".")
-    current = obj
-    for key in keys:
+PathTarget = Literal["dict", "model"]
+
+
+class FieldPath:
+    """
+    Getter and setter of a dotted field path, e.g. ".image.caption", parsed
+    once by compile_path(). With target "dict", the path is looked up with
+    dict keys, and with "model" with attributes. Without a target, each step
+    uses keys for dicts and attributes otherwise, like get_nested_value.
+
+    get raises ValueError if an intermediate value doesn't have the next
+    field, and returns None if a dict doesn't have the last key. set creates
+    missing intermediate dicts.
+    """
+
+    __slots__ = ["path", "keys", "target", "get", "set"]
+
+    def __init__(self, path: str, target: PathTarget | None = None):
+        if target not in (None, "dict", "model"):
+            raise ValueError(f"Invalid path target: {target}")
+        keys = tuple(path.strip(".").split("."))
+        if not all(keys):
+            raise ValueError(f"Invalid field path: {path}")
+
+        self.path = path
+        self.keys = keys
+        self.target = target
+        if target == "dict":
+            self.get, self.set = _make_dict_accessors(keys)
+        elif target == "model":
+            self.get, self.set = _make_model_accessors(keys)
+        else:
+            self.get, self.set = _make_generic_accessors(keys)
+
+    def __repr__(self) -> str:
+        return f"FieldPath({self.path!r}, target={self.target!r})"
+
+
+def _make_dict_accessors(keys: tuple) -> tuple[Callable, Callable]:
+    *parent_keys, last_key = keys
+
+    def get(obj: dict) -> any:
+        current = obj
+        for key in keys:
+            try:
+                current = current.get(key)
+            except AttributeError:
+                raise ValueError(f"Cannot get '{key}' from object: {current}")
+        return current
+
+    def set(obj: dict, value: any) -> None:
+        current = obj
+        for key in parent_keys:
+            try:
+                current = current.setdefault(key, {})
+            except AttributeError:
+                raise ValueError(f"Cannot set '{key}' on object: {current}")
+        current[last_key] = value
+
+    return get, set
+
+
+def _make_model_accessors(keys: tuple) -> tuple[Callable, Callable]:
+    path = ".".join(keys)
+    parent_path = ".".join(keys[:-1])
+    get_field = attrgetter(path)
+    get_parent = attrgetter(parent_path) if parent_path else None
+    last_key = keys[-1]
+
+    def get(obj: object) -> any:
+        try:
+            return get_field(obj)
+        except AttributeError:
+            raise ValueError(f"Cannot get '{path}' from object: {obj}")
+
+    def set(obj: object, value: any) -> None:
+        if get_parent is not None:
+            try:
+                obj = get_parent(obj)
+            except AttributeError:
+                raise ValueError(f"Cannot set '{parent_path}' on object: {obj}")
+        setattr(obj, last_key, value)
+
+    return get, set
+
+
+def _make_generic_accessors(keys: tuple) -> tuple[Callable, Callable]:
+    *parent_keys, last_key = keys
+
+    def get(obj: dict | object) -> any:
+        current = obj
+        for key in keys:
+            if isinstance(current, dict):
+                current = current.get(key)
+            elif hasattr(current, key):
+                current = getattr(current, key)
+            else:
+                raise ValueError(f"Cannot get '{key}' from object: {current}")
+        return current
+
+    def set(obj: dict | object, value: any) -> None:
+        current = obj
+        for key in parent_keys:
+            if isinstance(current, dict):
+                current = current.setdefault(key, {})
+            elif hasattr(current, key):
+                current = getattr(current, key)
+            else:
+                raise ValueError(f"Cannot set '{key}' on object: {current}")
         if isinstance(current, dict):
-            current = current.get(key)
-        elif hasattr(current, key):
-            current = getattr(current, key)
+            current[last_key] = value
         else:
-            raise ValueError(f"Cannot get '{key}' from object: {current}")
-    return current
+            setattr(current, last_key, value)
+
+    return get, set
+
+
+@lru_cache(maxsize=None)
+def compile_path(path: str, target: PathTarget | None = None) -> FieldPath:
+    """
+    Returns the getter and setter of a dotted field path, e.g.
+    compile_path(".image.caption", "dict").get(block_dict). Compiled paths
+    are cached, so compiling the same path again is a dict lookup.
+    """
+    return FieldPath(path, target)
+
+
+def get_nested_value(obj: dict | object, coordinates: str) -> any:
+    return compile_path(coordinates).get(obj)
 
 
 def set_nested_value(obj: dict | object, coordinates: str, value: any) -> None:
-    keys = coordinates.strip(".").split(".")
-    current = obj
-    for key in keys[:-1]:
-        if isinstance(current, dict):
-            if key not in current:
-                current[key] = {}
-            current = current[key]
-        elif hasattr(current, key):
-            current = getattr(current, key)
-        else:
-            raise ValueError(f"Cannot set '{key}' on object: {current}")
-    if isinstance(current, dict):
-        current[keys[-1]] = value
-    else:
-        setattr(current, keys[-1], value)
+    compile_path(coordinates).set(obj, value)
 
 
 @contextmanager
 def timer(name, unit="s"):
+    """
+    Records the block as a stage of the active profile, see collect_profile().
+    Without an active profile, prints the elapsed time.
+    """
+    profile = get_active_profile()
+    if profile is not None:
+        with profile.stage(name):
+            yield
+        return
+
     start_time = time.time()
     yield
     end_time = time.time()
@@ -159,48 +302,19 @@ def set_dict_recursive(d: dict | list, key: str, value: str):
 def set_field_recursive(obj: any, field_name: str, value: any) -> None:
     """
     Recursively sets all fields with name 'field_name' to 'value' in the given object.
-    Works with dictionaries, lists, Pydantic models, and other objects with attributes.
+    Works with dictionaries, lists and Pydantic models. Each model is visited once,
+    and only the fields of a model that can hold a model with the field are traversed.
 
     Args:
-        obj: The object to traverse (dict, list, Pydantic model, or other object)
+        obj: The object to traverse (dict, list or Pydantic model)
         field_name: The name of the field to set
         value: The value to set the field to
     """
-    from pydantic import BaseModel
-
-    # Handle dictionary
-    if isinstance(obj, dict):
-        for k, v in list(obj.items()):
-            if k == field_name:
-                obj[k] = value
-            else:
-                set_field_recursive(v, field_name, value)
-
-    # Handle list
-    elif isinstance(obj, list):
-        for item in obj:
-            set_field_recursive(item, field_name, value)
-
-    # Handle Pydantic models
-    elif isinstance(obj, BaseModel):
-        # Get the model fields as a dict and process them
-        data = obj.model_dump()
-        for k, v in data.items():
-            if k == field_name:
-                setattr(obj, k, value)
-            else:
-                model_value = getattr(obj, k)
-                set_field_recursive(model_value, field_name, value)
-
-    # # Handle other objects with attributes (non-primitive types)
-    # elif hasattr(obj, "__dict__") and not isinstance(
-    #     obj, (str, int, float, bool, type(None))
-    # ):
-    #     for k, v in list(obj.__dict__.items()):
-    #         if k == field_name:
-    #             setattr(obj, k, value)
-    #         else:
-    #             set_field_recursive(v, field_name, value)
+    for node in walk(obj, field_name):
+        if isinstance(node, dict):
+            node[field_name] = value
+        else:
+            setattr(node, field_name, value)
 
 
 def set_created_by(obj: any, created_by: str | CreatedBy) -> None:
@@ -213,3 +327,25 @@ def set_created_by(obj: any, created_by: str | CreatedBy) -> None:
         created_by = CreatedBy(id=created_by, object="user")
 
     set_field_recursive(obj, "created_by", created_by)
+
+
+def regenerate_ids(obj: any, typeid: bool = False, copy: bool = False) -> any:
+    """
+    Gives new random ids to the pages and blocks in the given object, e.g. to
+    insert a copy of blocks into a page. With copy, the object isn't modified
+    and a copy with the new ids is returned. Otherwise, returns the object.
+    """
+
+    def regenerate_block_id(block: BlockBase) -> BlockBase:
+        if copy:
+            return block.model_copy(update={"id": generate_block_id(typeid)})
+        block.id = generate_block_id(typeid)
+
+    def regenerate_page_id(page: Page) -> Page:
+        if copy:
+            return page.model_copy(update={"id": generate_page_id(typeid)})
+        page.id = generate_page_id(typeid)
+
+    return transform(
+        obj, {BlockBase: regenerate_block_id, Page: regenerate_page_id}, copy=copy
+    )
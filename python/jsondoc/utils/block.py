@@ -1,7 +1,9 @@
-from typing import OrderedDict
+from typing import Iterator, List, OrderedDict
 
 from jsondoc.models.block.base import BlockBase
 from jsondoc.models.page import Page
+from jsondoc.rules import is_block_child_allowed
+from jsondoc.utils.visitor import walk
 
 
 def extract_blocks(
@@ -16,48 +18,311 @@ def extract_blocks(
     Returns:
         A dictionary mapping block IDs (strings) to their corresponding Block objects
     """
-    block_map: dict[str, BlockBase] = OrderedDict()
+    return OrderedDict((block.id, block) for block in walk(input_obj, BlockBase))
 
-    # Handle Page input
-    if isinstance(input_obj, Page):
-        # Process all blocks in the page
-        for block in input_obj.children:
-            _process_block_and_children(block, block_map)
 
-    # Handle single Block input
-    elif isinstance(input_obj, BlockBase):
-        _process_block_and_children(input_obj, block_map)
+class BlockIndex:
+    """
+    Index of the blocks of a page, a block or a list of blocks, built once
+    and kept up to date by insert(), move() and delete(). Maps block ids to
+    blocks, parents, depths and positions among their siblings, and block
+    types to block ids. Parents, siblings and depths are looked up in O(1),
+    and ancestors in O(depth).
 
-    # Handle list of Blocks input
-    elif isinstance(input_obj, list):
-        for block in input_obj:
-            if isinstance(block, BlockBase):
-                _process_block_and_children(block, block_map)
+    Top-level blocks have no parent and depth 0. The index edits the
+    children lists of the indexed object, so changes made through it are
+    visible in the object. Changes made to the object directly require
+    building a new index.
+    """
 
-    return block_map
+    def __init__(self, input_obj: Page | BlockBase | List[BlockBase]):
+        if isinstance(input_obj, Page):
+            if input_obj.children is None:
+                input_obj.children = []
+            self.roots = input_obj.children
+        elif isinstance(input_obj, BlockBase):
+            self.roots = [input_obj]
+        elif isinstance(input_obj, list):
+            self.roots = input_obj
+        else:
+            raise ValueError(f"Invalid object type: {type(input_obj)}")
 
+        self._blocks: dict[str, BlockBase] = {}
+        self._parents: dict[str, BlockBase | None] = {}
+        self._depths: dict[str, int] = {}
+        self._positions: dict[str, int] = {}
+        # Index from which the positions of the children of a parent, or of
+        # the top-level blocks for None, are out of date. They are updated
+        # when next needed, so that edits don't renumber the siblings.
+        self._stale_positions: dict[str | None, int] = {}
+        # Ids by block type, in the order they were indexed
+        self._types: dict[str, dict[str, None]] = {}
 
-def _process_block_and_children(
-    block: BlockBase, block_map: dict[str, BlockBase]
-) -> None:
-    """
-    Helper function to process a block and its children recursively, adding them to the block map.
+        for position, block in enumerate(self.roots):
+            self._add(block, None, position)
 
-    Args:
-        block: The block to process
-        block_map: The dictionary mapping block IDs to Block objects
-    """
-    # Add the current block to the map
-    block_map[block.id] = block
+    def _add(self, block: BlockBase, parent: BlockBase | None, position: int) -> None:
+        """
+        Indexes a block and its descendants
+        """
+        depth = 0 if parent is None else self._depths[parent.id] + 1
+        blocks = self._blocks
+        parents = self._parents
+        depths = self._depths
+        positions = self._positions
+        types = self._types
+
+        added = []
+        stack = [(block, parent, depth, position)]
+        while stack:
+            block, parent, depth, position = stack.pop()
+            block_id = block.id
+            if block_id in blocks:
+                # Leave the index as it was before
+                for added_block in added:
+                    self._remove_one(added_block)
+                raise ValueError(f"Duplicate block id: {block_id}")
+
+            blocks[block_id] = block
+            parents[block_id] = parent
+            depths[block_id] = depth
+            positions[block_id] = position
+            ids = types.get(block.type)
+            if ids is None:
+                ids = types[block.type] = {}
+            ids[block_id] = None
+            added.append(block)
+
+            children = getattr(block, "children", None)
+            if children:
+                depth += 1
+                for child_position in range(len(children) - 1, -1, -1):
+                    stack.append(
+                        (children[child_position], block, depth, child_position)
+                    )
+
+    def _remove_one(self, block: BlockBase) -> None:
+        del self._blocks[block.id]
+        del self._parents[block.id]
+        del self._depths[block.id]
+        del self._positions[block.id]
+        del self._types[block.type][block.id]
+        self._stale_positions.pop(block.id, None)
+
+    def _remove(self, block: BlockBase) -> None:
+        """
+        Removes a block and its descendants from the index
+        """
+        stack = [block]
+        while stack:
+            block = stack.pop()
+            self._remove_one(block)
+
+            children = getattr(block, "children", None)
+            if children:
+                stack.extend(children)
+
+    def _get_siblings(self, parent: BlockBase | None) -> List[BlockBase]:
+        if parent is None:
+            return self.roots
+        if parent.children is None:
+            parent.children = []
+        return parent.children
+
+    def _invalidate_positions(self, parent: BlockBase | None, start: int) -> None:
+        key = None if parent is None else parent.id
+        stale_start = self._stale_positions.get(key)
+        if stale_start is None or start < stale_start:
+            self._stale_positions[key] = start
+
+    def _get_position(self, block_id: str) -> int:
+        position = self._positions[block_id]
+        parent = self._parents[block_id]
+        key = None if parent is None else parent.id
+        start = self._stale_positions.get(key)
+        if start is not None and position >= start:
+            siblings = self._get_siblings(parent)
+            for idx in range(start, len(siblings)):
+                self._positions[siblings[idx].id] = idx
+            del self._stale_positions[key]
+            position = self._positions[block_id]
+        return position
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def __contains__(self, block_id: str) -> bool:
+        return block_id in self._blocks
+
+    def __getitem__(self, block_id: str) -> BlockBase:
+        try:
+            return self._blocks[block_id]
+        except KeyError:
+            raise ValueError(f"Block not found: {block_id}")
+
+    def get(self, block_id: str) -> BlockBase | None:
+        return self._blocks.get(block_id)
+
+    def __iter__(self) -> Iterator[BlockBase]:
+        """
+        Iterates over the blocks in document order
+        """
+        stack = list(reversed(self.roots))
+        while stack:
+            block = stack.pop()
+            yield block
+            children = getattr(block, "children", None)
+            if children:
+                stack.extend(reversed(children))
 
-    # Process children recursively if they exist
-    if hasattr(block, "children") and block.children:
-        for child in block.children:
-            _process_block_and_children(child, block_map)
+    def get_parent(self, block_id: str) -> BlockBase | None:
+        self[block_id]
+        return self._parents[block_id]
+
+    def get_depth(self, block_id: str) -> int:
+        self[block_id]
+        return self._depths[block_id]
+
+    def get_position(self, block_id: str) -> int:
+        """
+        Returns the index of a block in the children of its parent
+        """
+        self[block_id]
+        return self._get_position(block_id)
+
+    def get_ids_by_type(self, block_type: str) -> List[str]:
+        return list(self._types.get(block_type, ()))
+
+    def get_blocks_by_type(self, block_type: str) -> List[BlockBase]:
+        return [self._blocks[id_] for id_ in self._types.get(block_type, ())]
+
+    def get_siblings(self, block_id: str) -> List[BlockBase]:
+        """
+        Returns the children of the parent of a block, including the block
+        """
+        return self._get_siblings(self.get_parent(block_id))
+
+    def get_previous_sibling(self, block_id: str) -> BlockBase | None:
+        position = self.get_position(block_id)
+        if position == 0:
+            return None
+        return self.get_siblings(block_id)[position - 1]
+
+    def get_next_sibling(self, block_id: str) -> BlockBase | None:
+        siblings = self.get_siblings(block_id)
+        position = self._get_position(block_id)
+        if position + 1 >= len(siblings):
+            return None
+        return siblings[position + 1]
+
+    def get_ancestors(self, block_id: str) -> List[BlockBase]:
+        """
+        Returns the ancestors of a block, from its parent to the top level
+        """
+        ancestors = []
+        parent = self.get_parent(block_id)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self._parents[parent.id]
+        return ancestors
+
+    def is_ancestor(self, ancestor_id: str, block_id: str) -> bool:
+        """
+        True if ancestor_id is a proper ancestor of block_id. Only the
+        difference in depth is walked up.
+        """
+        depth = self.get_depth(ancestor_id)
+        block = self[block_id]
+        for _ in range(self._depths[block_id] - depth):
+            block = self._parents[block.id]
+        return block.id == ancestor_id and block_id != ancestor_id
+
+    def insert(
+        self,
+        block: BlockBase,
+        parent_id: str | None = None,
+        position: int | None = None,
+    ) -> None:
+        """
+        Inserts a block and its descendants into the children of a parent,
+        or at the top level if parent_id is None. The block is appended if
+        position is None.
+        """
+        parent = None if parent_id is None else self[parent_id]
+        if parent is not None:
+            if not hasattr(parent, "children"):
+                raise ValueError(f"Block of type {parent.type} cannot have children")
+            if not is_block_child_allowed(parent, block):
+                raise ValueError(
+                    f"Block of type {parent.type} does not allow "
+                    f"children of type {block.type}"
+                )
+
+        siblings = self._get_siblings(parent)
+        if position is None:
+            position = len(siblings)
+        elif not 0 <= position <= len(siblings):
+            raise ValueError(f"Invalid position: {position}")
+
+        self._add(block, parent, position)
+        siblings.insert(position, block)
+        if position + 1 < len(siblings):
+            self._invalidate_positions(parent, position)
+        if parent is not None:
+            parent.has_children = True
+
+    def delete(self, block_id: str) -> BlockBase:
+        """
+        Removes a block and its descendants and returns the block
+        """
+        block = self[block_id]
+        parent = self._parents[block_id]
+        siblings = self._get_siblings(parent)
+        position = self._get_position(block_id)
+
+        del siblings[position]
+        if position < len(siblings):
+            self._invalidate_positions(parent, position)
+        self._remove(block)
+        if parent is not None and not siblings:
+            parent.has_children = False
+        return block
+
+    def move(
+        self,
+        block_id: str,
+        parent_id: str | None = None,
+        position: int | None = None,
+    ) -> None:
+        """
+        Moves a block and its descendants to the children of another parent,
+        or to the top level if parent_id is None. position is the index in
+        the new siblings after the block is removed from the old ones.
+        """
+        if parent_id is not None and (
+            parent_id == block_id or self.is_ancestor(block_id, parent_id)
+        ):
+            raise ValueError("Cannot move a block into itself or its descendants")
+
+        parent = None if parent_id is None else self[parent_id]
+        block = self[block_id]
+        if parent is not None and not is_block_child_allowed(parent, block):
+            raise ValueError(
+                f"Block of type {parent.type} does not allow "
+                f"children of type {block.type}"
+            )
+
+        siblings = self._get_siblings(parent)
+        n_siblings = len(siblings) - (self._parents[block_id] is parent)
+        if position is not None and not 0 <= position <= n_siblings:
+            raise ValueError(f"Invalid position: {position}")
+
+        self.delete(block_id)
+        self.insert(block, parent_id, position)
 
 
 def replace_urls(
-    input_obj: Page | BlockBase | list[BlockBase],
+    input_obj: Page | BlockBase | list[BlockBase] | BlockIndex,
     url_replace_map: dict[str, str],
 ) -> None:
     """
@@ -65,14 +330,19 @@ def replace_urls(
     that are found in the url_replace_map with their corresponding values.
 
     Args:
-        input_obj: Can be either a Page object, a single Block object, or a list of Block objects
+        input_obj: Can be either a Page object, a single Block object, a list of Block objects
+            or a BlockIndex of them. With an index, only image and file blocks are visited.
         url_replace_map: A dictionary mapping original URLs to their replacement URLs
     """
-    # Extract all blocks
-    blocks = extract_blocks(input_obj)
+    if isinstance(input_obj, BlockIndex):
+        blocks = [
+            *input_obj.get_blocks_by_type("image"),
+            *input_obj.get_blocks_by_type("file"),
+        ]
+    else:
+        blocks = walk(input_obj, BlockBase)
 
-    # Process each block
-    for block_id, block in blocks.items():
+    for block in blocks:
         _replace_url_in_block(block, url_replace_map)
 
 
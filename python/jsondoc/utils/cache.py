@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+from importlib.metadata import PackageNotFoundError, version
+
+try:
+    JSONDOC_VERSION = version("python-jsondoc")
+except PackageNotFoundError:
+    JSONDOC_VERSION = "unknown"
+
+CACHE_ENTRY_SUFFIX = ".out"
+
+
+@lru_cache(maxsize=None)
+def get_converter_fingerprint() -> str:
+    """
+    Returns a hash of the source files of the jsondoc package. The version
+    stays the same between development builds, so outputs of other builds
+    are told apart by this hash.
+    """
+    package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(package_dir):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(dirpath, filename)
+            digest.update(os.path.relpath(path, package_dir).encode("utf-8"))
+            with open(path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    On-disk cache of conversion outputs. Keys are hashes of the input
+    content, the conversion parameters, e.g. formats and options, the jsondoc
+    version and the converter fingerprint, so entries of other versions and
+    builds are never used.
+
+    Entries are written atomically, so concurrent processes can share a cache
+    directory. If max_size is given, the least recently used entries are
+    removed when the total size of the entries goes over max_size bytes.
+    Reading an entry marks it as used by updating its modification time.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int | None = None):
+        if max_size is not None and max_size < 0:
+            raise ValueError("The cache size must not be negative")
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        # Total size of the entries, computed when first needed
+        self._size: int | None = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, content: str | bytes, **params) -> str:
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        key = hashlib.sha256(content)
+        key.update(
+            json.dumps(
+                {
+                    "params": params,
+                    "version": JSONDOC_VERSION,
+                    "converter": get_converter_fingerprint(),
+                },
+                sort_keys=True,
+            ).encode("utf-8")
+        )
+        return key.hexdigest()
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + CACHE_ENTRY_SUFFIX)
+
+    def get(self, key: str) -> str | None:
+        path = self._get_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                output = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # Entries can be evicted by other processes at any time
+            self.misses += 1
+            return None
+        self.hits += 1
+        return output
+
+    def put(self, key: str, output: str) -> None:
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(output)
+            # Size of the entry that is overwritten, if any
+            try:
+                old_size = os.path.getsize(path)
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.writes += 1
+
+        if self.max_size is not None:
+            if self._size is None:
+                self._size = self._get_size()
+            else:
+                self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_size:
+                self.prune()
+
+    def _iter_entries(self):
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith(CACHE_ENTRY_SUFFIX):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def _get_size(self) -> int:
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def prune(self) -> int:
+        """
+        Removes the least recently used entries until the cache fits in
+        max_size. Returns the number of removed entries.
+        """
+        entries = sorted(self._iter_entries(), key=lambda entry: entry[2])
+        size = sum(size for _, size, _ in entries)
+        n_evicted = 0
+        if self.max_size is not None:
+            for path, entry_size, _ in entries:
+                if size <= self.max_size:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+                n_evicted += 1
+        self._size = size
+        self.evictions += n_evicted
+        return n_evicted
+
+    def get_stats(self) -> dict:
+        entries = list(self._iter_entries())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+            "max_size": self.max_size,
+        }
+
+    def format_stats(self) -> str:
+        stats = self.get_stats()
+        n_lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / n_lookups if n_lookups else 0.0
+        max_size = "unlimited" if self.max_size is None else f"{self.max_size} bytes"
+        return (
+            f"Cache {self.cache_dir}: {stats['hits']} hits, {stats['misses']} "
+            f"misses ({hit_rate:.1%} hit rate), {stats['writes']} writes, "
+            f"{stats['evictions']} evictions, {stats['entries']} entries, "
+            f"{stats['size']} bytes of {max_size}"
+        )
@@ -0,0 +1,290 @@
+import json
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.page import Page
+from jsondoc.utils import get_content_hash
+from jsondoc.utils.block import BlockIndex
+from jsondoc.utils.patch import (
+    DeleteOp,
+    InsertOp,
+    MoveOp,
+    PatchOp,
+    UpdatePropsOp,
+    UpdateRichTextOp,
+)
+
+
+def get_block_content_hash(block: BlockBase) -> str:
+    """
+    Returns a hash of the type and type specific data of a block, e.g. its
+    rich text and color, but not its id, times or children
+    """
+    data = block.model_dump(
+        include={"type", block.type},
+        mode="json",
+        serialize_as_any=True,
+        exclude_none=True,
+    )
+    return get_content_hash(json.dumps(data, sort_keys=True))
+
+
+def _is_same_kind(old_block: BlockBase, new_block: BlockBase) -> bool:
+    return type(old_block) is type(new_block) and type(
+        getattr(old_block, old_block.type, None)
+    ) is type(getattr(new_block, new_block.type, None))
+
+
+def _get_longest_increasing_subsequence(values: List[int]) -> List[int]:
+    """
+    Returns the indices of a longest strictly increasing subsequence
+    """
+    tails: List[int] = []
+    tail_indices: List[int] = []
+    previous: List[int] = [-1] * len(values)
+    for idx, value in enumerate(values):
+        position = bisect_left(tails, value)
+        if position > 0:
+            previous[idx] = tail_indices[position - 1]
+        if position == len(tails):
+            tails.append(value)
+            tail_indices.append(idx)
+        else:
+            tails[position] = value
+            tail_indices[position] = idx
+
+    result = []
+    idx = tail_indices[-1] if tail_indices else -1
+    while idx != -1:
+        result.append(idx)
+        idx = previous[idx]
+    return result[::-1]
+
+
+def _diff_data(old_block: BlockBase, new_block: BlockBase, ops: List[PatchOp]) -> None:
+    """
+    Appends the ops that update the type specific data of a matched block
+    """
+    old_data = getattr(old_block, old_block.type, None)
+    new_data = getattr(new_block, new_block.type, None)
+    if old_data == new_data:
+        return
+
+    if isinstance(new_data, BaseModel):
+        props = {}
+        for name in type(new_data).model_fields:
+            value = getattr(new_data, name)
+            if getattr(old_data, name) == value:
+                continue
+            if name == "rich_text":
+                ops.append(UpdateRichTextOp(block_id=old_block.id, rich_text=value))
+            else:
+                props[name] = value
+    elif isinstance(new_data, dict):
+        props = {
+            key: value
+            for key, value in new_data.items()
+            if key not in old_data or old_data[key] != value
+        }
+    else:
+        props = {}
+    if props:
+        ops.append(UpdatePropsOp(block_id=old_block.id, props=props))
+
+
+class _Tree:
+    """
+    Children lists of block ids, edited along with the emitted ops so that
+    the positions of the ops are those of the page at that point
+    """
+
+    def __init__(self, index: BlockIndex):
+        self.children: Dict[str | None, List[str]] = {
+            None: [block.id for block in index.roots]
+        }
+        self.parents: Dict[str, str | None] = {}
+        for block in index:
+            parent = index.get_parent(block.id)
+            self.parents[block.id] = None if parent is None else parent.id
+            self.children[block.id] = [
+                child.id for child in getattr(block, "children", None) or []
+            ]
+
+    def remove(self, block_id: str) -> None:
+        self.children[self.parents[block_id]].remove(block_id)
+
+    def insert(
+        self, block_id: str, parent_id: str | None, anchor_id: str | None
+    ) -> int:
+        """
+        Inserts a block after anchor_id, or first if it is None, and returns
+        its position
+        """
+        siblings = self.children.setdefault(parent_id, [])
+        position = 0 if anchor_id is None else siblings.index(anchor_id) + 1
+        siblings.insert(position, block_id)
+        self.parents[block_id] = parent_id
+        self.children.setdefault(block_id, [])
+        return position
+
+
+def diff_pages(old: Page, new: Page) -> List[PatchOp]:
+    """
+    Returns the ops that turn the blocks of old into those of new, in the
+    order they have to be applied. Blocks are matched by id, and blocks
+    without a match by the hash of their content, so unchanged blocks of
+    pages converted twice with random ids are matched too. Matched blocks
+    keep their old ids. Only blocks are compared, not page properties.
+
+    Runs in time linear in the size of the pages, plus the length of the
+    children lists that blocks are inserted into or moved in. Inserted
+    blocks are the blocks of new, not copies.
+    """
+    old_index = BlockIndex(old)
+    new_index = BlockIndex(new)
+
+    # Match blocks by id, then the remaining ones by content
+    matches: Dict[str, str] = {}
+    unmatched_new: List[BlockBase] = []
+    for new_block in new_index:
+        old_block = old_index.get(new_block.id)
+        if old_block is not None and _is_same_kind(old_block, new_block):
+            matches[new_block.id] = old_block.id
+        else:
+            unmatched_new.append(new_block)
+    matched_old = set(matches.values())
+
+    old_by_hash: Dict[str, deque] = {}
+    for old_block in old_index:
+        if old_block.id not in matched_old and old_block.id not in new_index:
+            old_by_hash.setdefault(get_block_content_hash(old_block), deque()).append(
+                old_block.id
+            )
+    if old_by_hash:
+        for new_block in unmatched_new:
+            candidates = old_by_hash.get(get_block_content_hash(new_block))
+            if candidates:
+                old_id = candidates.popleft()
+                matches[new_block.id] = old_id
+                matched_old.add(old_id)
+
+    # Blocks whose subtree contains a matched block, which can't be
+    # inserted or deleted with their subtree
+    has_matched_new = _get_blocks_with_matches(new_index, set(matches))
+    has_matched_old = _get_blocks_with_matches(old_index, matched_old)
+
+    tree = _Tree(old_index)
+    ops: List[PatchOp] = []
+
+    # Delete the unmatched subtrees without matched blocks, and the blocks
+    # whose ids are reused by unmatched new blocks, after moving their
+    # children to the end of the page
+    replaced = []
+    for old_block in old_index:
+        block_id = old_block.id
+        if block_id in matched_old:
+            continue
+        if block_id in has_matched_old:
+            if block_id in new_index:
+                replaced.append(block_id)
+            continue
+        parent_id = tree.parents[block_id]
+        if (
+            parent_id is None
+            or parent_id in matched_old
+            or parent_id in has_matched_old
+        ):
+            tree.remove(block_id)
+            ops.append(DeleteOp(block_id=block_id))
+    for block_id in replaced:
+        for child_id in list(tree.children[block_id]):
+            tree.remove(child_id)
+            position = len(tree.children[None])
+            tree.children[None].append(child_id)
+            tree.parents[child_id] = None
+            ops.append(MoveOp(block_id=child_id, parent_id=None, position=position))
+        tree.remove(block_id)
+        ops.append(DeleteOp(block_id=block_id))
+    replaced = set(replaced)
+
+    # Place the children of each parent of new in order, after the previous
+    # child. Matched children that are in order in the longest increasing
+    # subsequence of their old positions stay where they are.
+    stack = [(None, new.children or [])]
+    while stack:
+        parent_id, children = stack.pop()
+        siblings = tree.children.setdefault(parent_id, [])
+        old_positions = {block_id: idx for idx, block_id in enumerate(siblings)}
+        candidates = [
+            idx
+            for idx, child in enumerate(children)
+            if matches.get(child.id) in old_positions
+        ]
+        in_order = {
+            candidates[idx]
+            for idx in _get_longest_increasing_subsequence(
+                [old_positions[matches[children[idx].id]] for idx in candidates]
+            )
+        }
+
+        anchor_id = None
+        parents = []
+        for idx, child in enumerate(children):
+            block_id = matches.get(child.id)
+            if block_id is not None:
+                if idx not in in_order:
+                    tree.remove(block_id)
+                    position = tree.insert(block_id, parent_id, anchor_id)
+                    ops.append(
+                        MoveOp(
+                            block_id=block_id, parent_id=parent_id, position=position
+                        )
+                    )
+                _diff_data(old_index[block_id], child, ops)
+            else:
+                block_id = child.id
+                block = child
+                if block_id in has_matched_new:
+                    block = child.model_copy(
+                        update={"children": [], "has_children": False}
+                    )
+                position = tree.insert(block_id, parent_id, anchor_id)
+                ops.append(
+                    InsertOp(block=block, parent_id=parent_id, position=position)
+                )
+
+            if getattr(child, "children", None) and (
+                block_id in matched_old or child.id in has_matched_new
+            ):
+                parents.append((block_id, child.children))
+            anchor_id = block_id
+        stack.extend(reversed(parents))
+
+    # Delete the unmatched blocks that had matched descendants, which were
+    # moved out of them
+    remaining = has_matched_old.difference(matched_old, replaced)
+    for old_block in old_index:
+        block_id = old_block.id
+        if block_id in remaining and tree.parents[block_id] not in remaining:
+            ops.append(DeleteOp(block_id=block_id))
+
+    return ops
+
+
+def _get_blocks_with_matches(index: BlockIndex, matched: set) -> set:
+    """
+    Returns the ids of the blocks that have a matched descendant
+    """
+    result = set()
+    for block_id in matched:
+        if block_id not in index:
+            continue
+        for ancestor in index.get_ancestors(block_id):
+            if ancestor.id in result:
+                break
+            result.add(ancestor.id)
+    return result
@@ -0,0 +1,321 @@
+from contextlib import contextmanager
+from typing import Annotated, Any, Callable, Dict, Iterator, List, Literal, Union
+
+from pydantic import (
+    BaseModel,
+    Field,
+    FieldSerializationInfo,
+    TypeAdapter,
+    ValidationError,
+    field_serializer,
+    field_validator,
+)
+
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.block.types.rich_text.base import RichTextBase
+from jsondoc.models.page import Page
+from jsondoc.rules import is_block_child_allowed
+from jsondoc.serialize import load_block, load_rich_text
+from jsondoc.utils.block import BlockIndex
+
+# Dumps the values of props, which can hold models, by their runtime types
+_PROPS_ADAPTER = TypeAdapter(Dict[str, Any])
+
+
+class _BlockOpBase(BaseModel):
+    """
+    Base of the ops that carry a block. The block is dumped with the fields
+    of its subclass and loaded with load_block(), so that ops keep their
+    content through JSON.
+    """
+
+    @field_validator("block", mode="before", check_fields=False)
+    @classmethod
+    def _load_block(cls, value: Any) -> Any:
+        if isinstance(value, (str, dict)):
+            return load_block(value)
+        return value
+
+    @field_serializer("block", check_fields=False)
+    def _dump_block(self, block: BlockBase, info: FieldSerializationInfo) -> Any:
+        return block.model_dump(
+            mode=info.mode, serialize_as_any=True, exclude_none=True
+        )
+
+
+class InsertOp(_BlockOpBase):
+    """
+    Inserts a block and its descendants into the children of a parent, or at
+    the top level of the page if parent_id is None
+    """
+
+    op: Literal["insert"] = "insert"
+    block: BlockBase
+    parent_id: str | None = None
+    position: int
+
+
+class DeleteOp(BaseModel):
+    """
+    Removes a block and its descendants
+    """
+
+    op: Literal["delete"] = "delete"
+    block_id: str
+
+
+class MoveOp(BaseModel):
+    """
+    Moves a block and its descendants. position is the index in the new
+    siblings after the block is removed from the old ones.
+    """
+
+    op: Literal["move"] = "move"
+    block_id: str
+    parent_id: str | None = None
+    position: int
+
+
+class ReplaceOp(_BlockOpBase):
+    """
+    Replaces a block and its descendants with another block and its
+    descendants, at the same position
+    """
+
+    op: Literal["replace"] = "replace"
+    block_id: str
+    block: BlockBase
+
+
+class UpdateRichTextOp(BaseModel):
+    """
+    Replaces the rich text of a block
+    """
+
+    op: Literal["update_rich_text"] = "update_rich_text"
+    block_id: str
+    rich_text: List[RichTextBase]
+
+    @field_validator("rich_text", mode="before")
+    @classmethod
+    def _load_rich_text(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            return [
+                load_rich_text(item) if isinstance(item, (str, dict)) else item
+                for item in value
+            ]
+        return value
+
+    @field_serializer("rich_text")
+    def _dump_rich_text(
+        self, rich_text: List[RichTextBase], info: FieldSerializationInfo
+    ) -> Any:
+        return [
+            item.model_dump(mode=info.mode, serialize_as_any=True, exclude_none=True)
+            for item in rich_text
+        ]
+
+
+class UpdatePropsOp(BaseModel):
+    """
+    Sets fields of the type specific data of a block other than its rich
+    text, e.g. {"checked": True} for a to_do block. The data is validated
+    with the props set before it's changed.
+    """
+
+    op: Literal["update_props"] = "update_props"
+    block_id: str
+    props: Dict[str, Any]
+
+
+PatchOp = Annotated[
+    Union[InsertOp, DeleteOp, MoveOp, ReplaceOp, UpdateRichTextOp, UpdatePropsOp],
+    Field(discriminator="op"),
+]
+
+
+def _validate_subtree(block: BlockBase) -> None:
+    """
+    Checks that the descendants of a block are allowed as children of their
+    parents, see jsondoc.rules.ALLOWED_CHILDREN_BLOCK_TYPES
+    """
+    stack = [block]
+    while stack:
+        parent = stack.pop()
+        for child in getattr(parent, "children", None) or ():
+            if not is_block_child_allowed(parent, child):
+                raise ValueError(
+                    f"Block of type {parent.type} does not allow "
+                    f"children of type {child.type}"
+                )
+            stack.append(child)
+
+
+def _get_data(block: BlockBase) -> Any:
+    return getattr(block, block.type)
+
+
+def _validate_props(block: BlockBase, props: Dict[str, Any]) -> Any:
+    """
+    Returns the type specific data of a block with props set, validated
+    like the data of a loaded block. The block isn't modified.
+    """
+    obj = block.model_dump(
+        mode="json", serialize_as_any=True, exclude_none=True, exclude={"children"}
+    )
+    obj[block.type].update(_PROPS_ADAPTER.dump_python(props, mode="json"))
+    try:
+        return _get_data(load_block(obj))
+    except ValidationError as exc:
+        raise ValueError(f"Invalid props of block {block.id}: {exc}") from exc
+
+
+class PagePatcher:
+    """
+    Applies ops to a page through a BlockIndex that is kept attached to it,
+    so that each op only looks up and validates the blocks it touches. The
+    index is built once, or can be passed if it was built for the page.
+
+    apply() applies ops as a transaction: if an op fails, the ops applied
+    before it are undone and the error is raised. transaction() groups
+    several calls to apply() into one transaction. Inserted and replacing
+    blocks are added to the page as is, not copied.
+    """
+
+    def __init__(self, page: Page, index: BlockIndex | None = None):
+        if index is None:
+            index = BlockIndex(page)
+        elif index.roots is not page.children:
+            raise ValueError("The index was not built for this page")
+        self.page = page
+        self.index = index
+        # Functions that undo the ops of the open transactions, in order
+        self._undo_log: List[Callable[[], None]] | None = None
+
+    @contextmanager
+    def transaction(self) -> Iterator["PagePatcher"]:
+        """
+        Undoes the ops applied in the block if it raises. Transactions can be
+        nested, and an inner transaction only undoes its own ops, so the
+        outer one can handle the error and go on.
+        """
+        is_outermost = self._undo_log is None
+        if is_outermost:
+            self._undo_log = []
+        start = len(self._undo_log)
+        try:
+            yield self
+        except BaseException:
+            while len(self._undo_log) > start:
+                self._undo_log.pop()()
+            raise
+        finally:
+            if is_outermost:
+                self._undo_log = None
+
+    def apply(self, ops: List[PatchOp]) -> None:
+        with self.transaction():
+            for op in ops:
+                self._undo_log.append(self._apply_op(op))
+
+    def _apply_op(self, op: PatchOp) -> Callable[[], None]:
+        """
+        Applies an op and returns a function that undoes it
+        """
+        index = self.index
+        if isinstance(op, InsertOp):
+            _validate_subtree(op.block)
+            index.insert(op.block, op.parent_id, op.position)
+            return lambda: index.delete(op.block.id)
+
+        if isinstance(op, DeleteOp):
+            parent = index.get_parent(op.block_id)
+            parent_id = None if parent is None else parent.id
+            position = index.get_position(op.block_id)
+            block = index.delete(op.block_id)
+            return lambda: index.insert(block, parent_id, position)
+
+        if isinstance(op, MoveOp):
+            parent = index.get_parent(op.block_id)
+            parent_id = None if parent is None else parent.id
+            position = index.get_position(op.block_id)
+            index.move(op.block_id, op.parent_id, op.position)
+            return lambda: index.move(op.block_id, parent_id, position)
+
+        if isinstance(op, ReplaceOp):
+            parent = index.get_parent(op.block_id)
+            parent_id = None if parent is None else parent.id
+            position = index.get_position(op.block_id)
+            if parent is not None and not is_block_child_allowed(parent, op.block):
+                raise ValueError(
+                    f"Block of type {parent.type} does not allow "
+                    f"children of type {op.block.type}"
+                )
+            _validate_subtree(op.block)
+            block = index.delete(op.block_id)
+            try:
+                index.insert(op.block, parent_id, position)
+            except ValueError:
+                index.insert(block, parent_id, position)
+                raise
+
+            def undo_replace():
+                index.delete(op.block.id)
+                index.insert(block, parent_id, position)
+
+            return undo_replace
+
+        if isinstance(op, UpdateRichTextOp):
+            data = _get_data(index[op.block_id])
+            if not hasattr(data, "rich_text"):
+                raise ValueError(f"Block {op.block_id} does not have rich text")
+            rich_text = data.rich_text
+            data.rich_text = op.rich_text
+            return lambda: setattr(data, "rich_text", rich_text)
+
+        if isinstance(op, UpdatePropsOp):
+            block = index[op.block_id]
+            data = _get_data(block)
+            if not isinstance(data, dict):
+                for name in op.props:
+                    if name not in type(data).model_fields or name == "rich_text":
+                        raise ValueError(
+                            f"Invalid field of block {op.block_id}: {name}"
+                        )
+            new_data = _validate_props(block, op.props)
+
+            if isinstance(data, dict):
+                old_data = dict(data)
+                data.update((name, new_data[name]) for name in op.props)
+
+                def undo_update_dict():
+                    data.clear()
+                    data.update(old_data)
+
+                return undo_update_dict
+
+            old_props = {name: getattr(data, name) for name in op.props}
+            for name in op.props:
+                setattr(data, name, getattr(new_data, name))
+
+            def undo_update_props():
+                for name, value in old_props.items():
+                    setattr(data, name, value)
+
+            return undo_update_props
+
+        raise ValueError(f"Unsupported patch op: {op}")
+
+
+def apply_patch(
+    page: Page, ops: List[PatchOp], index: BlockIndex | None = None
+) -> BlockIndex:
+    """
+    Applies ops to a page in place, e.g. the ops returned by diff_pages().
+    Either all ops are applied, or none if one of them fails. Returns the
+    index of the page, which can be passed to the next call instead of
+    building a new one. See PagePatcher for transactions of several calls.
+    """
+    patcher = PagePatcher(page, index=index)
+    patcher.apply(ops)
+    return patcher.index
@@ -0,0 +1,257 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+
+class ProfileEntry:
+    """
+    Accumulated statistics of a profiled stage, tag or handler. Stages also
+    measure CPU time, the net number of allocated memory blocks and, if
+    memory tracing is enabled, the peak traced memory above the memory in
+    use when the stage started.
+    """
+
+    __slots__ = [
+        "count",
+        "cumulative_time",
+        "self_time",
+        "objects_created",
+        "cpu_time",
+        "peak_memory",
+        "allocations",
+    ]
+
+    def __init__(self):
+        self.count = 0
+        self.cumulative_time = 0.0
+        self.self_time = 0.0
+        self.objects_created = 0
+        self.cpu_time = 0.0
+        self.peak_memory = 0
+        self.allocations = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "cumulative_time": self.cumulative_time,
+            "self_time": self.self_time,
+            "objects_created": self.objects_created,
+            "cpu_time": self.cpu_time,
+            "peak_memory": self.peak_memory,
+            "allocations": self.allocations,
+        }
+
+
+class ConversionProfile:
+    """
+    Collects call counts, cumulative and self times and created object counts
+    during a conversion. Entries are grouped, e.g. into stages, tags and handlers.
+
+    Calls can be nested. Self time excludes the time spent in nested calls, and
+    cumulative time counts recursive calls of the same entry only once.
+    Statistics accumulate over conversions until reset() is called.
+
+    With trace_memory, stages also record their peak memory with tracemalloc,
+    which is started if needed and slows down the conversion.
+    """
+
+    GROUPS = ["stages", "tags", "handlers"]
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.reset()
+
+    def reset(self):
+        self.groups: dict[str, dict[str, ProfileEntry]] = {
+            group: {} for group in self.GROUPS
+        }
+        # Time spent in nested calls, for each active call
+        self._child_time_stack = [0.0]
+        # Number of active calls per entry, to handle recursion
+        self._active_calls: dict[tuple[str, str], int] = {}
+        # Traced memory at the start and peak so far, for each active stage
+        self._memory_stack: list[list[int]] = []
+
+    def enter(self, group: str, name: str) -> float:
+        """
+        Marks the start of a call. Returns the start time to be passed to exit().
+        """
+        key = (group, name)
+        self._active_calls[key] = self._active_calls.get(key, 0) + 1
+        self._child_time_stack.append(0.0)
+        return time.perf_counter()
+
+    def exit(
+        self,
+        group: str,
+        name: str,
+        start: float,
+        objects_created: int = 0,
+        cpu_time: float = 0.0,
+        peak_memory: int = 0,
+        allocations: int = 0,
+    ):
+        """
+        Marks the end of a call that was started with enter()
+        """
+        elapsed = time.perf_counter() - start
+        child_time = self._child_time_stack.pop()
+        self._child_time_stack[-1] += elapsed
+
+        key = (group, name)
+        self._active_calls[key] -= 1
+
+        entries = self.groups.setdefault(group, {})
+        entry = entries.get(name)
+        if entry is None:
+            entry = entries[name] = ProfileEntry()
+
+        entry.count += 1
+        entry.self_time += elapsed - child_time
+        entry.objects_created += objects_created
+        entry.allocations += allocations
+        entry.peak_memory = max(entry.peak_memory, peak_memory)
+        if self._active_calls[key] == 0:
+            entry.cumulative_time += elapsed
+            entry.cpu_time += cpu_time
+
+    @contextmanager
+    def stage(self, name: str):
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            self._enter_memory_stage()
+
+        allocated_blocks = sys.getallocatedblocks()
+        cpu_start = time.process_time()
+        start = self.enter("stages", name)
+        try:
+            yield
+        finally:
+            cpu_time = time.process_time() - cpu_start
+            allocations = sys.getallocatedblocks() - allocated_blocks
+            peak_memory = self._exit_memory_stage() if self.trace_memory else 0
+            self.exit(
+                "stages",
+                name,
+                start,
+                cpu_time=cpu_time,
+                peak_memory=peak_memory,
+                allocations=allocations,
+            )
+            if started_tracing:
+                tracemalloc.stop()
+
+    def _enter_memory_stage(self):
+        # tracemalloc has a single peak, so the peak of the enclosing stage
+        # is saved before it's reset for this stage
+        current, peak = tracemalloc.get_traced_memory()
+        if self._memory_stack:
+            self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        self._memory_stack.append([current, current])
+
+    def _exit_memory_stage(self) -> int:
+        start_memory, peak = self._memory_stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        if self._memory_stack:
+            self._memory_stack[-1][1] = max(self._memory_stack[-1][1], peak)
+        return peak - start_memory
+
+    def to_dict(self) -> dict:
+        return {
+            group: {name: entry.to_dict() for name, entry in entries.items()}
+            for group, entries in self.groups.items()
+        }
+
+    def format_table(self, limit: int | None = None) -> str:
+        """
+        Formats the statistics as a table per group,
+        sorted by cumulative time in descending order
+        """
+        lines = []
+        for group, entries in self.groups.items():
+            if not entries:
+                continue
+
+            # Only stages measure CPU time, memory and allocations
+            is_stage = group == "stages"
+            header = (
+                f"{'':<36} {'Calls':>10} {'Cumulative (ms)':>16} "
+                f"{'Self (ms)':>12} {'Objects':>10}"
+            )
+            if is_stage:
+                header += f" {'CPU (ms)':>10} {'Peak (KiB)':>11} {'Allocs':>10}"
+
+            sorted_entries = sorted(
+                entries.items(), key=lambda item: -item[1].cumulative_time
+            )
+            if limit is not None:
+                sorted_entries = sorted_entries[:limit]
+
+            lines.append(group.capitalize() + header[len(group) :])
+            lines.append("-" * len(header))
+            for name, entry in sorted_entries:
+                line = (
+                    f"{name:<36} {entry.count:>10} "
+                    f"{entry.cumulative_time * 1000:>16.3f} "
+                    f"{entry.self_time * 1000:>12.3f} {entry.objects_created:>10}"
+                )
+                if is_stage:
+                    line += (
+                        f" {entry.cpu_time * 1000:>10.3f} "
+                        f"{entry.peak_memory / 1024:>11.1f} {entry.allocations:>10}"
+                    )
+                lines.append(line)
+            lines.append("")
+
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.format_table()
+
+
+# Profile that collects the stages of the conversions in the current context
+_active_profile: ContextVar[ConversionProfile | None] = ContextVar(
+    "active_profile", default=None
+)
+
+
+def get_active_profile() -> ConversionProfile | None:
+    return _active_profile.get()
+
+
+@contextmanager
+def collect_profile(
+    trace_memory: bool = True, profile: ConversionProfile | None = None
+):
+    """
+    Collects the stages of all conversions in the block, e.g.
+
+        with collect_profile() as profile:
+            convert_content(html, "html")
+        print(profile.format_table())
+
+    A given profile is reused, so that statistics accumulate over blocks.
+    """
+    if profile is None:
+        profile = ConversionProfile(trace_memory=trace_memory)
+    token = _active_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _active_profile.reset(token)
+
+
+def profile_stage(name: str):
+    """
+    Profiles a block as a stage of the active profile, if any
+    """
+    profile = _active_profile.get()
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name)
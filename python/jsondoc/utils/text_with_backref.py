@@ -2,7 +2,7 @@ from typing import Dict, List, Union
 
 from pydantic import BaseModel
 
-from jsondoc.convert.utils import block_supports_rich_text, get_rich_text_from_block
+from jsondoc.accessors import get_block_text_accessors
 from jsondoc.models.block.base import BlockBase
 from jsondoc.models.block.types.rich_text.base import RichTextBase
 from jsondoc.models.page import Page
@@ -153,31 +153,23 @@ def _extract_text_from_single_block(block: BlockBase) -> str:
         The text content of the block
     """
     result = []
+    accessors = get_block_text_accessors(block)
 
     # Extract rich text if the block supports it
-    if block_supports_rich_text(block):
-        try:
-            rich_text_list = get_rich_text_from_block(block)
-            for rich_text in rich_text_list:
-                result.append(rich_text.plain_text)
-        except ValueError:
-            pass
+    if accessors.get_rich_text is not None:
+        for rich_text in accessors.get_rich_text(block):
+            result.append(rich_text.plain_text)
 
     # Extract captions from blocks that support them
-    if block.type == "image" and hasattr(block.image, "caption"):
-        for caption_text in block.image.caption:
-            result.append(caption_text.plain_text)
-    elif block.type == "code" and hasattr(block.code, "caption"):
-        for caption_text in block.code.caption:
+    if accessors.get_caption is not None:
+        for caption_text in accessors.get_caption(block) or []:
             result.append(caption_text.plain_text)
 
     # Handle special blocks like tables
-    if block.type == "table_row" and hasattr(block.table_row, "cells"):
-        for cell in block.table_row.cells:
-            if isinstance(cell, list):
-                for item in cell:
-                    if hasattr(item, "plain_text"):
-                        result.append(item.plain_text)
+    if accessors.get_cells is not None:
+        for cell in accessors.get_cells(block):
+            for item in cell:
+                result.append(item.plain_text)
 
     return " ".join(result)
 
@@ -0,0 +1,324 @@
+from typing import (
+    Annotated,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Literal,
+    Tuple,
+    Type,
+    get_args,
+    get_origin,
+)
+
+from pydantic import BaseModel
+
+# Fields of each model class that can hold models: (name, model classes in
+# the annotation, whether the annotation allows values of unknown types)
+_ModelFields = Tuple[Tuple[str, Tuple[Type[BaseModel], ...], bool], ...]
+_model_fields: Dict[Type[BaseModel], _ModelFields] = {}
+# Whether a model class is a target
+_is_target: Dict[tuple, Dict[Type[BaseModel], bool]] = {}
+# Fields of each model class that can lead to a target, with the number of
+# direct subclasses of the classes that were found to hold no targets. Classes
+# defined later can hold targets, so an entry is valid while these numbers are
+# unchanged.
+_fields_to_targets: Dict[
+    tuple,
+    Dict[Type[BaseModel], Tuple[Tuple[str, ...], Tuple[Tuple[type, int], ...]]],
+] = {}
+
+Handlers = Dict[Type[BaseModel], Callable[[BaseModel], Any]]
+
+
+def _get_annotation_models(annotation: Any) -> Tuple[Tuple[Type[BaseModel], ...], bool]:
+    models = []
+    is_unknown = False
+    stack = [annotation]
+    while stack:
+        annotation = stack.pop()
+        if annotation is Any or annotation is object:
+            is_unknown = True
+            continue
+
+        origin = get_origin(annotation)
+        if origin is Literal:
+            continue
+        if origin is Annotated:
+            stack.append(get_args(annotation)[0])
+        elif origin is not None:
+            stack.extend(get_args(annotation))
+        elif isinstance(annotation, type):
+            if issubclass(annotation, BaseModel):
+                models.append(annotation)
+            elif annotation in (dict, list, tuple, set, frozenset):
+                is_unknown = True
+        elif not isinstance(annotation, type(None)):
+            # E.g. unresolved forward references
+            is_unknown = True
+    return tuple(models), is_unknown
+
+
+def get_model_fields(model_class: Type[BaseModel]) -> _ModelFields:
+    """
+    Returns the fields of a model class that can hold models, with the model
+    classes of their annotations. Fields of other types are never traversed.
+    """
+    fields = _model_fields.get(model_class)
+    if fields is None:
+        fields = []
+        for name, field in model_class.model_fields.items():
+            models, is_unknown = _get_annotation_models(field.annotation)
+            if models or is_unknown:
+                fields.append((name, models, is_unknown))
+        fields = _model_fields[model_class] = tuple(fields)
+    return fields
+
+
+def _can_reach(
+    models: Tuple[Type[BaseModel], ...],
+    is_target: Callable[[type], bool],
+    deps: Dict[type, int],
+) -> bool:
+    """
+    Returns whether instances of models, or of their subclasses, are or can
+    hold a target. If not, the classes that were searched are recorded in
+    deps with their number of direct subclasses.
+    """
+    searched: Dict[type, int] = {}
+    stack = list(models)
+    while stack:
+        cls = stack.pop()
+        if cls in searched or cls in deps:
+            continue
+        if is_target(cls):
+            return True
+        subclasses = cls.__subclasses__()
+        searched[cls] = len(subclasses)
+        for _, field_models, is_unknown in get_model_fields(cls):
+            if is_unknown:
+                return True
+            stack.extend(field_models)
+        stack.extend(subclasses)
+    deps.update(searched)
+    return False
+
+
+def _get_fields_to_targets(
+    model_class: Type[BaseModel], key: tuple, is_target: Callable[[type], bool]
+) -> Tuple[str, ...]:
+    """
+    Returns the fields of a model class that can lead to a target. The cached
+    fields are checked against the classes defined since, so this is called
+    once per class and call of walk() or transform().
+    """
+    fields_to_targets = _fields_to_targets.setdefault(key, {})
+    entry = fields_to_targets.get(model_class)
+    if entry is not None:
+        fields, deps = entry
+        if all(len(cls.__subclasses__()) == n for cls, n in deps):
+            return fields
+
+    # Classes without targets that were already searched for another field
+    # are skipped, since they can't lead to a target from this one either
+    deps: Dict[type, int] = {}
+    fields = tuple(
+        name
+        for name, models, is_unknown in get_model_fields(model_class)
+        if is_unknown or _can_reach(models, is_target, deps)
+    )
+    fields_to_targets[model_class] = (fields, tuple(deps.items()))
+    return fields
+
+
+def _make_target(
+    target: type | Tuple[type, ...] | str,
+) -> Tuple[tuple, Callable[[type], bool]]:
+    if isinstance(target, str):
+        return ("field", target), lambda cls: target in cls.model_fields
+    if isinstance(target, type):
+        target = (target,)
+    return ("types", target), lambda cls: issubclass(cls, target)
+
+
+def walk(
+    obj: Any, target: type | Tuple[type, ...] | str = BaseModel
+) -> Iterator[BaseModel | dict]:
+    """
+    Yields the models in a tree of models, lists and dicts that are
+    instances of target, depth first in document order. If target is a
+    field name, yields the models that have the field and the dicts that
+    have the key instead.
+
+    Each model is yielded once, even if it's referenced more than once.
+    Only fields whose annotations can hold targets are traversed, and they
+    are read after a model is yielded, so changes to them are traversed.
+    """
+    key, is_target = _make_target(target)
+    field_name = target if isinstance(target, str) else None
+    is_target_cache = _is_target.setdefault(key, {})
+    fields_cache: Dict[type, Tuple[str, ...]] = {}
+
+    seen = set()
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, BaseModel):
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+
+            cls = type(node)
+            is_node_target = is_target_cache.get(cls)
+            if is_node_target is None:
+                is_node_target = is_target_cache[cls] = is_target(cls)
+            if is_node_target:
+                yield node
+
+            fields = fields_cache.get(cls)
+            if fields is None:
+                fields = fields_cache[cls] = _get_fields_to_targets(cls, key, is_target)
+            for name in reversed(fields):
+                value = getattr(node, name)
+                if value is not None:
+                    stack.append(value)
+        elif isinstance(node, (list, tuple)):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            if field_name is not None and field_name in node:
+                yield node
+            stack.extend(reversed(list(node.values())))
+
+
+def _get_handler(cls: type, handlers: Handlers, cache: dict) -> Callable | None:
+    handler = cache.get(cls, False)
+    if handler is False:
+        handler = next(
+            (handlers[base] for base in cls.__mro__ if base in handlers), None
+        )
+        cache[cls] = handler
+    return handler
+
+
+def visit(obj: Any, handlers: Handlers) -> None:
+    """
+    Calls the handler of each model in a tree, in document order. The
+    handler of a model is the one of the closest class in its MRO, e.g.
+    {BlockBase: fn} handles all blocks. Handlers can edit models in place.
+    """
+    cache = {}
+    for model in walk(obj, tuple(handlers)):
+        handler = _get_handler(type(model), handlers, cache)
+        if handler is not None:
+            handler(model)
+
+
+def transform(obj: Any, handlers: Handlers, copy: bool = False) -> Any:
+    """
+    Like visit(), but the value returned by a handler replaces the model in
+    the tree, unless it's None. The children of the replacement are then
+    transformed. Returns the transformed tree.
+
+    With copy, the tree isn't modified: handlers must return edited copies
+    instead of editing models in place, and the models and lists on the
+    path to a replaced model are copied. Unchanged subtrees are shared
+    between both trees.
+    """
+    key, is_target = _make_target(tuple(handlers))
+    cache = {}
+    fields_cache: Dict[type, Tuple[str, ...]] = {}
+    # Results of the models that were transformed, so each is done once
+    results: Dict[int, Any] = {}
+
+    def transform_model(model: BaseModel):
+        handler = _get_handler(type(model), handlers, cache)
+        if handler is not None:
+            replacement = handler(model)
+            if replacement is not None:
+                model = replacement
+
+        cls = type(model)
+        fields = fields_cache.get(cls)
+        if fields is None:
+            fields = fields_cache[cls] = _get_fields_to_targets(cls, key, is_target)
+
+        updates = {}
+        for name in fields:
+            value = getattr(model, name)
+            if value is None:
+                continue
+            new_value = yield value
+            if new_value is not value:
+                updates[name] = new_value
+
+        if updates:
+            if copy:
+                model = model.model_copy(update=updates)
+            else:
+                for name, value in updates.items():
+                    setattr(model, name, value)
+        return model
+
+    def transform_container(container: list | tuple | dict):
+        items = (
+            container.items() if isinstance(container, dict) else enumerate(container)
+        )
+        updates = {}
+        for idx, value in list(items):
+            new_value = yield value
+            if new_value is not value:
+                updates[idx] = new_value
+
+        if not updates:
+            return container
+        if copy or isinstance(container, tuple):
+            new_container = (
+                dict(container) if isinstance(container, dict) else list(container)
+            )
+            for idx, value in updates.items():
+                new_container[idx] = value
+            if isinstance(container, tuple):
+                return tuple(new_container)
+            return new_container
+        for idx, value in updates.items():
+            container[idx] = value
+        return container
+
+    def start(value: Any):
+        """
+        Returns a generator that transforms value, or the value itself if it
+        needs no transformation
+        """
+        if isinstance(value, BaseModel):
+            if id(value) in results:
+                return results[id(value)]
+            return transform_model(value)
+        if isinstance(value, (list, tuple, dict)):
+            return transform_container(value)
+        return value
+
+    # The generators of the nodes on the current path, and their inputs
+    root = start(obj)
+    if not hasattr(root, "send") or isinstance(obj, (str, bytes)):
+        return root
+    stack = [(root, obj)]
+    result = None
+    while stack:
+        generator, node = stack[-1]
+        try:
+            child = generator.send(result)
+        except StopIteration as stop:
+            stack.pop()
+            result = stop.value
+            if isinstance(node, BaseModel):
+                results[id(node)] = result
+            continue
+
+        child_generator = start(child)
+        if child_generator is child or not hasattr(child_generator, "send"):
+            result = child_generator
+        else:
+            stack.append((child_generator, child))
+            result = None
+
+    return result
@@ -0,0 +1,79 @@
+import pytest
+
+from jsondoc.accessors import BLOCK_TEXT_ACCESSORS, get_block_text_accessors
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import (
+    BLOCKS_WITH_RICH_TEXT,
+    block_supports_rich_text,
+    create_image_block,
+    create_paragraph_block,
+    get_rich_text_from_block,
+)
+from jsondoc.models.block.types.paragraph import ParagraphBlock
+from jsondoc.rules import ALL_BLOCK_TYPES
+from jsondoc.utils import compile_path
+from jsondoc.utils.text_with_backref import extract_text_with_backref_from_page
+
+
+def test_registry_covers_all_block_types():
+    for block_class in ALL_BLOCK_TYPES:
+        accessors = BLOCK_TEXT_ACCESSORS[block_class]
+        assert (accessors.get_rich_text is not None) == (
+            block_class in BLOCKS_WITH_RICH_TEXT
+        )
+
+
+def test_get_rich_text_initializes_empty_rich_text():
+    block = create_paragraph_block()
+    block.paragraph.rich_text = None
+
+    assert block_supports_rich_text(block)
+    assert get_rich_text_from_block(block) == []
+    assert block.paragraph.rich_text == []
+
+    image = create_image_block(url="https://example.com/image.png")
+    assert not block_supports_rich_text(image)
+    assert get_block_text_accessors(image).get_caption(image) is None
+    assert get_block_text_accessors(image).caption_path == ".image.caption"
+    assert BLOCK_TEXT_ACCESSORS[ParagraphBlock].rich_text_path == (
+        ".paragraph.rich_text"
+    )
+
+
+def test_compile_path():
+    image = create_image_block("https://example.com/a.png")
+    caption_path = get_block_text_accessors(image).caption_path
+    assert compile_path(caption_path, "dict") is compile_path(caption_path, "dict")
+
+    obj = {"image": {"caption": None}}
+    compile_path(caption_path, "dict").set(obj, ["Caption"])
+    compile_path(".image.file.url", "dict").set(obj, "https://example.com/a.png")
+    assert obj == {
+        "image": {"caption": ["Caption"], "file": {"url": "https://example.com/a.png"}}
+    }
+    assert compile_path(caption_path, "dict").get(obj) == ["Caption"]
+    with pytest.raises(ValueError):
+        compile_path(".image.caption.text", "dict").get(obj)
+
+    block = create_paragraph_block(text="Text")
+    rich_text_path = compile_path(".paragraph.rich_text", "model")
+    assert rich_text_path.get(block) is block.paragraph.rich_text
+    rich_text_path.set(block, [])
+    assert block.paragraph.rich_text == []
+    with pytest.raises(ValueError):
+        compile_path(".paragraph.caption", "model").get(block)
+
+
+def test_backref_extraction_of_captions_and_cells():
+    page = html_to_jsondoc(
+        "<p>Intro</p>"
+        '<img src="https://example.com/a.png">'
+        "<figure><img src='https://example.com/b.png'>"
+        "<figcaption>Caption</figcaption></figure>"
+        "<table><tr><td>A</td><td>B</td></tr></table>",
+        force_page=True,
+    )
+
+    ret = extract_text_with_backref_from_page(page)
+
+    assert ret.text == "Intro Caption A B"
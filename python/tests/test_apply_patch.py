@@ -0,0 +1,126 @@
+import json
+
+import pytest
+from pydantic import TypeAdapter
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import (
+    create_bullet_list_item_block,
+    create_divider_block,
+    create_paragraph_block,
+    create_rich_text,
+)
+from jsondoc.serialize import jsondoc_dump_json
+from jsondoc.utils.block import BlockIndex
+from jsondoc.utils.patch import (
+    DeleteOp,
+    InsertOp,
+    MoveOp,
+    PagePatcher,
+    PatchOp,
+    ReplaceOp,
+    UpdatePropsOp,
+    UpdateRichTextOp,
+    apply_patch,
+)
+
+HTML = (
+    "<p>First</p>"
+    "<ul><li>Item<ul><li>Nested 1</li><li>Nested 2</li></ul></li></ul>"
+    "<p>Last</p>"
+)
+
+
+def _assert_index_is_fresh(index, page):
+    fresh_index = BlockIndex(page)
+    assert [block.id for block in index] == [block.id for block in fresh_index]
+    for block in fresh_index:
+        assert index.get_parent(block.id) is fresh_index.get_parent(block.id)
+        assert index.get_position(block.id) == fresh_index.get_position(block.id)
+
+
+@pytest.mark.parametrize("through_json", [False, True])
+def test_apply_patch(through_json):
+    page = html_to_jsondoc(HTML, force_page=True)
+    first, item, last = page.children
+    nested_1, nested_2 = item.children
+    new_block = create_paragraph_block(text="New")
+    divider = create_divider_block()
+
+    ops = [
+        InsertOp(block=new_block, parent_id=item.id, position=1),
+        MoveOp(block_id=last.id, position=0),
+        DeleteOp(block_id=nested_1.id),
+        ReplaceOp(block_id=first.id, block=divider),
+        UpdateRichTextOp(block_id=nested_2.id, rich_text=[create_rich_text("2")]),
+        UpdatePropsOp(block_id=item.id, props={"color": "red"}),
+    ]
+    if through_json:
+        # E.g. ops sent by the clients of a collaborative editor
+        adapter = TypeAdapter(PatchOp)
+        ops = [adapter.validate_python(json.loads(op.model_dump_json())) for op in ops]
+        new_block, divider = ops[0].block, ops[3].block
+
+    index = apply_patch(page, ops)
+    assert page.children == [last, divider, item]
+    assert item.children == [new_block, nested_2]
+    assert new_block.paragraph.rich_text[0].text.content == "New"
+    assert divider.type == "divider"
+    assert nested_2.bulleted_list_item.rich_text[0].plain_text == "2"
+    assert item.bulleted_list_item.color.value == "red"
+    _assert_index_is_fresh(index, page)
+
+    # Only the touched blocks are validated against the allowed children
+    with pytest.raises(ValueError):
+        apply_patch(page, [InsertOp(block=new_block, parent_id=divider.id, position=0)])
+    with pytest.raises(ValueError):
+        apply_patch(page, [UpdateRichTextOp(block_id=divider.id, rich_text=[])])
+    # Props are validated like the data of a loaded block
+    with pytest.raises(ValueError):
+        apply_patch(page, [UpdatePropsOp(block_id=item.id, props={"color": "x"})])
+    assert item.bulleted_list_item.color.value == "red"
+
+
+def test_patch_transactions():
+    page = html_to_jsondoc(HTML, force_page=True)
+    first, item, last = page.children
+    before = jsondoc_dump_json(page)
+    patcher = PagePatcher(page)
+
+    # A failing op undoes the ops applied before it
+    with pytest.raises(ValueError):
+        patcher.apply(
+            [
+                DeleteOp(block_id=first.id),
+                MoveOp(block_id=last.id, parent_id=item.id, position=0),
+                UpdatePropsOp(block_id=item.id, props={"color": "red"}),
+                MoveOp(block_id=item.id, parent_id=item.children[0].id),
+            ]
+        )
+    assert jsondoc_dump_json(page) == before
+    _assert_index_is_fresh(patcher.index, page)
+
+    # An error in a transaction undoes all its ops, but an inner transaction
+    # that fails only undoes its own
+    with pytest.raises(RuntimeError):
+        with patcher.transaction():
+            patcher.apply([DeleteOp(block_id=first.id)])
+            with pytest.raises(ValueError):
+                with patcher.transaction():
+                    patcher.apply([MoveOp(block_id=last.id, position=0)])
+                    patcher.apply([DeleteOp(block_id=first.id)])
+            assert page.children == [item, last]
+            raise RuntimeError()
+    assert jsondoc_dump_json(page) == before
+
+    with patcher.transaction():
+        patcher.apply(
+            [InsertOp(block=create_bullet_list_item_block("New"), position=3)]
+        )
+        patcher.apply([DeleteOp(block_id=first.id)])
+    assert [block.type for block in page.children] == [
+        "bulleted_list_item",
+        "paragraph",
+        "bulleted_list_item",
+    ]
+    _assert_index_is_fresh(patcher.index, page)
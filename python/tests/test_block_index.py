@@ -0,0 +1,93 @@
+import pytest
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import create_page, create_paragraph_block
+from jsondoc.utils.block import BlockIndex, extract_blocks, replace_urls
+
+HTML = (
+    "<p>First</p>"
+    "<ul><li>Item<ul><li>Nested 1</li><li>Nested 2</li></ul></li></ul>"
+    "<img src='https://example.com/a.png'>"
+    "<p>Last</p>"
+)
+
+
+def _create_page():
+    return create_page(title="Title", children=html_to_jsondoc(HTML))
+
+
+def _assert_index_is_consistent(index, page):
+    # An index built from scratch must match the incrementally updated one
+    fresh_index = BlockIndex(page)
+    assert [block.id for block in index] == [block.id for block in fresh_index]
+    for block in fresh_index:
+        assert index.get_parent(block.id) is fresh_index.get_parent(block.id)
+        assert index.get_depth(block.id) == fresh_index.get_depth(block.id)
+        assert index.get_position(block.id) == fresh_index.get_position(block.id)
+    for block_type in ["paragraph", "bulleted_list_item", "image"]:
+        assert set(index.get_ids_by_type(block_type)) == set(
+            fresh_index.get_ids_by_type(block_type)
+        )
+
+
+def test_block_index():
+    page = _create_page()
+    index = BlockIndex(page)
+    paragraph, item, image, last = page.children
+    nested_1, nested_2 = item.children
+
+    assert list(index) == list(extract_blocks(page).values())
+    assert len(index) == 6
+    assert index.get_parent(nested_2.id) is item
+    assert index.get_parent(item.id) is None
+    assert (index.get_depth(nested_2.id), index.get_position(nested_2.id)) == (1, 1)
+    assert index.get_previous_sibling(nested_2.id) is nested_1
+    assert index.get_next_sibling(nested_2.id) is None
+    assert index.get_next_sibling(item.id) is image
+    assert index.get_ancestors(nested_1.id) == [item]
+    assert index.is_ancestor(item.id, nested_1.id)
+    assert not index.is_ancestor(nested_1.id, item.id)
+    assert index.get_ids_by_type("image") == [image.id]
+
+    new_block = create_paragraph_block(text="New")
+    index.insert(new_block, parent_id=nested_1.id)
+    assert nested_1.children == [new_block] and nested_1.has_children
+    assert index.get_depth(new_block.id) == 2
+    _assert_index_is_consistent(index, page)
+
+    # Moves keep the moved subtree
+    index.move(nested_1.id, position=0)
+    assert page.children[0] is nested_1
+    assert index.get_depth(new_block.id) == 1
+    _assert_index_is_consistent(index, page)
+
+    index.move(image.id, parent_id=item.id, position=0)
+    assert item.children == [image, nested_2]
+    _assert_index_is_consistent(index, page)
+
+    assert index.delete(item.id) is item
+    assert image.id not in index and nested_2.id not in index
+    assert [block.id for block in page.children] == [
+        nested_1.id,
+        paragraph.id,
+        last.id,
+    ]
+    _assert_index_is_consistent(index, page)
+
+    with pytest.raises(ValueError):
+        index.move(nested_1.id, parent_id=new_block.id)
+    with pytest.raises(ValueError):
+        index.insert(create_paragraph_block(text="x", id=paragraph.id))
+    with pytest.raises(ValueError):
+        index.get_parent("missing")
+    _assert_index_is_consistent(index, page)
+
+
+def test_replace_urls_with_index():
+    page = _create_page()
+    index = BlockIndex(page)
+    replace_urls(index, {"https://example.com/a.png": "https://example.com/b.png"})
+    assert page.children[2].image.external.url == "https://example.com/b.png"
+
+    replace_urls(page, {"https://example.com/b.png": "https://example.com/c.png"})
+    assert page.children[2].image.external.url == "https://example.com/c.png"
@@ -0,0 +1,87 @@
+import os
+import time
+
+from jsondoc.bin.batch import convert_directory
+from jsondoc.bin.convert_jsondoc import convert_to_jsondoc
+from jsondoc.utils.cache import ConversionCache
+
+
+def test_conversion_cache(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"), max_size=10)
+
+    key = cache.make_key("<p>A</p>", source_format="html", indent=None)
+    assert key == cache.make_key(b"<p>A</p>", indent=None, source_format="html")
+    assert key != cache.make_key("<p>A</p>", source_format="html", indent=2)
+    assert cache.get(key) is None
+
+    cache.put(key, "12345")
+    other_key = cache.make_key("<p>B</p>", source_format="html", indent=None)
+    cache.put(other_key, "12345")
+    assert cache.get(key) == "12345"
+    assert cache.get_stats()["entries"] == 2
+
+    # Reading the first entry made the second one the least recently used
+    path = os.path.join(cache.cache_dir, other_key[:2], other_key + ".out")
+    os.utime(path, (time.time() - 10, time.time() - 10))
+    cache.put(cache.make_key("<p>C</p>"), "1")
+    assert cache.get(other_key) is None
+    assert cache.get(key) == "12345"
+
+    stats = cache.get_stats()
+    assert stats["entries"] == 2
+    assert stats["size"] == 6
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert "2 hits" in cache.format_stats()
+
+    # Overwriting an entry counts its new size only
+    cache.put(key, "123")
+    assert cache._size == 4
+
+
+def test_cached_conversions(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    input_dir = tmp_path / "src"
+    os.makedirs(input_dir)
+    for name in ["a", "b"]:
+        with open(input_dir / f"{name}.html", "w") as f:
+            f.write(f"<p>{name}</p>")
+
+    output_file = str(tmp_path / "a.json")
+    convert_to_jsondoc(
+        str(input_dir / "a.html"), output_file, source_format="html", cache=cache
+    )
+    with open(output_file) as f:
+        output = f.read()
+    os.remove(output_file)
+    convert_to_jsondoc(
+        str(input_dir / "a.html"), output_file, source_format="html", cache=cache
+    )
+    with open(output_file) as f:
+        # Ids would differ if it was converted again
+        assert f.read() == output
+    assert (cache.hits, cache.writes) == (1, 1)
+
+    summary = convert_directory(
+        convert_to_jsondoc,
+        str(input_dir),
+        str(tmp_path / "out"),
+        progress=None,
+        cache=cache,
+    )
+    assert [result.cached for result in summary.converted] == [False, False]
+    assert "0 from the cache" in summary.format()
+
+    summary = convert_directory(
+        convert_to_jsondoc,
+        str(input_dir),
+        str(tmp_path / "out2"),
+        workers=2,
+        progress=None,
+        cache=cache,
+    )
+    assert [result.cached for result in summary.converted] == [True, True]
+    with (
+        open(tmp_path / "out" / "b.json") as f,
+        open(tmp_path / "out2" / "b.json") as f2,
+    ):
+        assert f2.read() == f.read()
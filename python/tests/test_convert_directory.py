@@ -0,0 +1,64 @@
+import json
+import os
+
+from jsondoc.bin.batch import convert_directory
+from jsondoc.bin.convert_jsondoc import convert_to_jsondoc
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_convert_directory(tmp_path):
+    input_dir = tmp_path / "src"
+    output_dir = tmp_path / "out"
+    _write(str(input_dir / "a.html"), "<p>A</p>")
+    _write(str(input_dir / "sub" / "b.html"), "<p>B</p>")
+    _write(str(input_dir / "c.md"), "# C")
+    _write(str(input_dir / "bad.json"), "{")
+
+    summary = convert_directory(
+        convert_to_jsondoc,
+        str(input_dir),
+        str(output_dir),
+        glob="**/*.html",
+        workers=2,
+        force_page=True,
+        progress=None,
+    )
+    assert len(summary.converted) == 2
+    assert not summary.failed
+    with open(output_dir / "sub" / "b.json") as f:
+        page = json.load(f)
+    assert page["children"][0]["paragraph"]["rich_text"][0]["plain_text"] == "B"
+    assert "Slowest files:" in summary.format()
+
+    # Up-to-date outputs are skipped, others are converted
+    summary = convert_directory(
+        convert_to_jsondoc,
+        str(input_dir),
+        str(output_dir),
+        glob="**/*",
+        force_page=True,
+        progress=None,
+    )
+    assert len(summary.skipped) == 2
+    assert [os.path.basename(r.input_file) for r in summary.converted] == ["c.md"]
+    # JSON-DOC inputs need a target format, so the invalid file fails
+    assert [os.path.basename(r.input_file) for r in summary.failed] == ["bad.json"]
+    assert not os.path.exists(output_dir / "bad.json")
+    assert "bad.json" in summary.format()
+
+    # Outputs converted with other options are not up to date
+    summary = convert_directory(
+        convert_to_jsondoc,
+        str(input_dir),
+        str(output_dir),
+        glob="**/*.html",
+        progress=None,
+    )
+    assert len(summary.converted) == 2
+    with open(output_dir / "sub" / "b.json") as f:
+        assert json.load(f)["object"] == "block"
@@ -0,0 +1,97 @@
+import json
+import select
+import subprocess
+import sys
+from io import StringIO
+
+from jsondoc.bin.convert_jsondoc import convert_content
+from jsondoc.bin.jsonl import convert_jsonl
+
+RECORDS = [
+    {"id": 1, "format": "html", "content": "<p>One</p>"},
+    {"id": "two", "format": "markdown", "content": "Two"},
+    {"id": 3, "format": "unknown", "content": "Three"},
+    {"id": 4, "content": "<p>Four</p>"},
+]
+
+
+def _run(workers, max_in_flight=None):
+    input = StringIO(
+        "\n".join([json.dumps(record) for record in RECORDS] + ["", "{"]) + "\n"
+    )
+    output = StringIO()
+    counts = convert_jsonl(
+        convert_content,
+        input,
+        output,
+        workers=workers,
+        max_in_flight=max_in_flight,
+        source_format="html",
+        indent=2,
+    )
+    return counts, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_convert_jsonl():
+    counts, records = _run(workers=None)
+    assert counts == (3, 2)
+    assert [record["id"] for record in records] == [1, "two", 3, 4, None]
+    block = records[0]["jsondoc"]
+    assert block["paragraph"]["rich_text"][0]["plain_text"] == "One"
+    assert "Format not supported" in records[2]["error"]
+    assert "error" in records[4]
+
+    # The output of workers is in the order of the input
+    counts, parallel_records = _run(workers=2, max_in_flight=1)
+    assert counts == (3, 2)
+    assert [(record["id"], list(record)) for record in parallel_records] == [
+        (record["id"], list(record)) for record in records
+    ]
+
+
+# Converts the JSONL records of stdin with the workers and batch size given
+# as arguments
+JSONL_SCRIPT = """
+import sys
+
+from jsondoc.bin.convert_jsondoc import convert_content, convert_many_contents
+from jsondoc.bin.jsonl import convert_jsonl
+
+workers, batch_size = map(int, sys.argv[1:])
+convert_jsonl(
+    convert_content,
+    sys.stdin,
+    sys.stdout,
+    workers=workers,
+    source_format="html",
+    convert_many_fn=convert_many_contents,
+    batch_size=batch_size,
+)
+"""
+
+
+def test_convert_jsonl_replies_before_input_ends():
+    # A client that waits for each reply before sending the next record
+    for workers, batch_size in [(1, 1), (2, 1), (1, 4), (2, 4)]:
+        process = subprocess.Popen(
+            [sys.executable, "-c", JSONL_SCRIPT, str(workers), str(batch_size)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        try:
+            for record in RECORDS[:2]:
+                process.stdin.write(json.dumps(record) + "\n")
+                process.stdin.flush()
+                ready, _, _ = select.select([process.stdout], [], [], 10)
+                assert ready, (
+                    f"No reply with {workers} workers, batch size {batch_size}"
+                )
+                reply = json.loads(process.stdout.readline())
+                assert reply["id"] == record["id"] and "jsondoc" in reply
+
+            process.stdin.close()
+            assert process.wait(timeout=10) == 0
+        finally:
+            process.kill()
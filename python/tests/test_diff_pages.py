@@ -0,0 +1,60 @@
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import create_bullet_list_item_block, create_paragraph_block
+from jsondoc.serialize import jsondoc_dump_json
+from jsondoc.utils.diff import diff_pages
+from jsondoc.utils.patch import apply_patch
+
+HTML = (
+    "<p>First</p>"
+    "<ul><li>Item<ul><li>Nested 1</li><li>Nested 2</li></ul></li></ul>"
+    "<p>Last</p>"
+)
+
+
+def _dump_blocks(page):
+    page = page.model_copy(update={"id": "", "properties": None})
+    return jsondoc_dump_json(page)
+
+
+def test_diff_pages():
+    old = html_to_jsondoc(HTML, force_page=True)
+    # Unchanged blocks with new ids are matched by content
+    assert diff_pages(old, html_to_jsondoc(HTML, force_page=True)) == []
+
+    new = old.model_copy(deep=True)
+    first, item, last = new.children
+    nested_1, nested_2 = item.children
+    first.paragraph.rich_text[0].text.content = "Changed"
+    first.paragraph.color = "red"
+    item.children = [nested_2]
+    new.children = [last, create_paragraph_block(text="New"), first, item]
+
+    ops = diff_pages(old, new)
+    assert [op.op for op in ops] == [
+        "delete",
+        "move",
+        "insert",
+        "update_rich_text",
+        "update_props",
+    ]
+    assert ops[0].block_id == nested_1.id
+    assert (ops[1].block_id, ops[1].position) == (last.id, 0)
+    assert ops[4].props == {"color": "red"}
+
+    apply_patch(old, ops)
+    assert _dump_blocks(old) == _dump_blocks(new)
+
+
+def test_diff_pages_moves_out_of_replaced_blocks():
+    old = html_to_jsondoc(HTML, force_page=True)
+    new = old.model_copy(deep=True)
+    first, item, last = new.children
+    # The item becomes a paragraph with the same id, and its first child
+    # moves to the top level
+    replacement = create_paragraph_block(text="Paragraph", id=item.id)
+    replacement.children = [item.children[1], create_bullet_list_item_block("New")]
+    replacement.has_children = True
+    new.children = [item.children[0], first, replacement, last]
+
+    apply_patch(old, diff_pages(old, new))
+    assert _dump_blocks(old) == _dump_blocks(new)
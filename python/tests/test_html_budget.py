@@ -0,0 +1,112 @@
+import pytest
+
+from jsondoc.convert.html import (
+    ConversionBudgetExceeded,
+    HtmlToJsonDocConverter,
+    html_to_jsondoc,
+)
+from jsondoc.models.block.types.paragraph import ParagraphBlock
+from jsondoc.serialize import jsondoc_dump_json, load_jsondoc
+
+PARAGRAPHS_HTML = "".join(f"<p>Paragraph <b>{i}</b></p>" for i in range(100))
+DEEP_HTML = "<div>" * 5000 + "<p>Deep</p>" + "</div>" * 5000
+
+
+def _assert_well_formed(jsondoc):
+    # Should survive a serialization round trip
+    load_jsondoc(jsondoc_dump_json(jsondoc))
+
+
+def test_budgets_raise():
+    budgets = [
+        {"max_nodes": 50},
+        {"max_depth": 100},
+        {"max_output_blocks": 10},
+        {"deadline_seconds": 0},
+    ]
+    for budget in budgets:
+        budget_name = list(budget.keys())[0]
+        html = DEEP_HTML if budget_name == "max_depth" else PARAGRAPHS_HTML
+
+        with pytest.raises(ConversionBudgetExceeded) as excinfo:
+            html_to_jsondoc(html, **budget)
+
+        assert excinfo.value.budget == budget_name
+
+
+def test_budgets_within_limits():
+    ret = html_to_jsondoc(
+        PARAGRAPHS_HTML,
+        max_nodes=1000,
+        max_depth=10,
+        max_output_blocks=100,
+        deadline_seconds=60,
+    )
+    assert len(ret) == 100
+
+
+def test_budgets_truncate():
+    converter = HtmlToJsonDocConverter(
+        max_output_blocks=10, on_budget_exceeded="truncate"
+    )
+    ret = converter.convert(PARAGRAPHS_HTML)
+    assert len(ret) == 10
+    assert all(isinstance(block, ParagraphBlock) for block in ret)
+    assert converter.budget_exceeded.budget == "max_output_blocks"
+    _assert_well_formed(ret)
+
+    converter = HtmlToJsonDocConverter(max_nodes=50, on_budget_exceeded="truncate")
+    ret = converter.convert(PARAGRAPHS_HTML)
+    assert 0 < len(ret) < 100
+    _assert_well_formed(ret)
+
+    # Subtrees deeper than the limit are skipped
+    converter = HtmlToJsonDocConverter(max_depth=100, on_budget_exceeded="truncate")
+    ret = converter.convert(DEEP_HTML + "<p>Shallow</p>")
+    assert ret.paragraph.rich_text[0].plain_text == "Shallow"
+
+    # Budget counters are reset for every conversion
+    ret = converter.convert("<p>Shallow</p>")
+    assert converter.budget_exceeded is None
+
+
+def test_budgets_ignore_annotate_sections():
+    html = "<!DOCTYPE html><html><body>" + PARAGRAPHS_HTML + "</body></html>"
+    # html, body and 2 elements per paragraph
+    for max_nodes, n_paragraphs in [(2 + 20, 10), (2 + 21, 11)]:
+        for annotate_sections in [False, True]:
+            converter = HtmlToJsonDocConverter(
+                max_nodes=max_nodes,
+                on_budget_exceeded="truncate",
+                annotate_sections=annotate_sections,
+            )
+            assert len(converter.convert(html).children) == n_paragraphs
+
+    # Wrappers of all the content are counted too
+    wrapped_html = html.replace("<body>", "<body><div>")
+    for annotate_sections in [False, True]:
+        converter = HtmlToJsonDocConverter(
+            max_nodes=3 + 20,
+            on_budget_exceeded="truncate",
+            annotate_sections=annotate_sections,
+        )
+        assert len(converter.convert(wrapped_html).children) == 10
+
+    # <p> is at depth 3, <b> at depth 4
+    for annotate_sections in [False, True]:
+        with pytest.raises(ConversionBudgetExceeded):
+            html_to_jsondoc(html, max_depth=3, annotate_sections=annotate_sections)
+        html_to_jsondoc(html, max_depth=4, annotate_sections=annotate_sections)
+
+
+def test_block_budget_keeps_converted_children():
+    html = "<ul><li>Item<ul><li>Nested 1</li><li>Nested 2</li></ul></li></ul>"
+    converter = HtmlToJsonDocConverter(
+        max_output_blocks=2, on_budget_exceeded="truncate"
+    )
+    ret = converter.convert(html)
+    assert [block.bulleted_list_item.rich_text[0].plain_text for block in ret] == [
+        "Nested 1",
+        "Nested 2",
+    ]
+    _assert_well_formed(ret)
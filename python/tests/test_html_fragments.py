@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from jsondoc.convert.html import HtmlToJsonDocConverter, html_fragments_to_jsondoc
+from jsondoc.serialize import jsondoc_dump_json
+
+FRAGMENTS = [
+    "<p>First <b>fragment</b></p>",
+    "  plain text  ",
+    "<ul><li>one<li>two</ul><p>unclosed",
+    "",
+    "<table><tr><td>A</td><td>B</td></tr></table>",
+    "<!DOCTYPE html><html><head><title>Doc</title></head><body><p>x</p></body></html>",
+    b"<p>bytes</p>",
+]
+
+
+def _dump(obj) -> str:
+    return jsondoc_dump_json(obj) if obj != [] else "[]"
+
+
+def test_convert_fragments_matches_convert():
+    converter = HtmlToJsonDocConverter(
+        id_strategy="counter",
+        created_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+    )
+
+    for fragments in [FRAGMENTS, FRAGMENTS + ["<p>a<!-- unclosed comment"]]:
+        ret = converter.convert_fragments(fragments)
+        assert len(ret) == len(fragments)
+        for fragment, obj in zip(fragments, ret):
+            assert _dump(obj) == _dump(converter.convert(fragment))
+
+
+def test_html_fragments_to_jsondoc():
+    ret = html_fragments_to_jsondoc(["<p>a</p>", "<p>b</p><p>c</p>"])
+
+    assert ret[0].paragraph.rich_text[0].plain_text == "a"
+    assert [block.paragraph.rich_text[0].plain_text for block in ret[1]] == ["b", "c"]
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import create_page, create_paragraph_block
+from jsondoc.serialize import jsondoc_dump_json
+from jsondoc.utils.block import extract_blocks
+from tests.test_html_to_jsondoc import compare_jsondoc
+
+HTML_PATH = "../examples/html/html_all_elements.html"
+CREATED_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_deterministic_id_strategies():
+    html = open(HTML_PATH, "r").read()
+    reference = html_to_jsondoc(html)
+
+    for id_strategy in ["counter", "content"]:
+        ret1 = html_to_jsondoc(html, id_strategy=id_strategy, created_time=CREATED_TIME)
+        ret2 = html_to_jsondoc(html, id_strategy=id_strategy, created_time=CREATED_TIME)
+
+        assert jsondoc_dump_json(ret1) == jsondoc_dump_json(ret2)
+        assert compare_jsondoc(ret1, reference)
+
+        blocks = extract_blocks(ret1)
+        assert all(blocks.keys())
+        # Ids are unique
+        assert len(blocks) == len(list(_iter_blocks(ret1.children)))
+
+    # Different documents get different counter ids
+    ret3 = html_to_jsondoc(html + "<p>x</p>", id_strategy="counter")
+    assert ret3.children[0].id != ret1.children[0].id
+
+
+def test_single_created_time_snapshot():
+    ret = html_to_jsondoc(open(HTML_PATH, "r").read(), id_strategy="typeid")
+    assert ret.id.startswith("pg_")
+    created_times = {block.created_time for block in _iter_blocks(ret.children)}
+    assert created_times == {ret.created_time}
+
+
+def test_create_page_id_strategy():
+    children = [create_paragraph_block(text="a", id="", created_time=CREATED_TIME)]
+    page = create_page(
+        children=children,
+        id_strategy="counter",
+        id_seed="abc",
+        created_time=CREATED_TIME,
+    )
+    assert page.children[0].id == "abc00000-0000-0000-0000-000000000001"
+
+
+def _iter_blocks(blocks):
+    for block in blocks:
+        yield block
+        yield from _iter_blocks(getattr(block, "children", None) or [])
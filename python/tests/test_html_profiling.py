@@ -0,0 +1,77 @@
+from jsondoc.bin.convert_jsondoc import convert_content
+from jsondoc.convert.html import HtmlToJsonDocConverter
+from jsondoc.utils import timer
+from jsondoc.utils.profiling import collect_profile
+from tests.test_html_to_jsondoc import compare_jsondoc
+
+HTML_PATH = "../examples/html/html_all_elements.html"
+
+
+def test_profile_report():
+    html = open(HTML_PATH, "r").read()
+
+    converter = HtmlToJsonDocConverter(profile=True)
+    ret = converter.convert(html)
+
+    # Profiling must not change the output
+    assert compare_jsondoc(ret, HtmlToJsonDocConverter().convert(html))
+
+    report = converter.profile.to_dict()
+    assert set(report["stages"]) == {
+        "parse",
+        "normalize_whitespace",
+        "process_tag",
+        "run_final_block_transformations",
+        "create_page",
+    }
+
+    p_stats = report["tags"]["p"]
+    assert p_stats["count"] > 0
+    assert 0 <= p_stats["self_time"] <= p_stats["cumulative_time"]
+
+    assert report["handlers"]["convert_p"]["count"] == p_stats["count"]
+    assert report["handlers"]["convert_p"]["objects_created"] == p_stats["count"]
+
+    table = converter.profile.format_table()
+    assert "convert_p" in table
+
+    # Statistics accumulate until reset
+    converter.convert(html)
+    assert converter.profile.to_dict()["tags"]["p"]["count"] == 2 * p_stats["count"]
+    converter.profile.reset()
+    assert converter.profile.to_dict()["tags"] == {}
+
+
+def test_profile_disabled():
+    converter = HtmlToJsonDocConverter()
+    assert converter.profile is None
+    assert "process_tag" not in vars(converter)
+
+
+def test_collect_profile(capsys):
+    html = open(HTML_PATH, "r").read()
+
+    with collect_profile() as profile:
+        with timer("conversion"):
+            convert_content(html, "html", created_by="test")
+
+    report = profile.to_dict()["stages"]
+    assert {
+        "conversion",
+        "parse",
+        "process_tag",
+        "run_final_block_transformations",
+        "set_created_by",
+        "jsondoc_dump_json",
+    } <= set(report)
+    assert report["parse"]["peak_memory"] > 0
+    # Peaks of nested stages count towards the enclosing stage
+    assert report["conversion"]["peak_memory"] >= report["parse"]["peak_memory"]
+    assert 0 < report["parse"]["cpu_time"] <= report["conversion"]["cpu_time"]
+    assert "Peak (KiB)" in profile.format_table()
+
+    # Nothing is collected or printed outside of the block
+    capsys.readouterr()
+    convert_content(html, "html")
+    assert profile.to_dict()["stages"]["parse"]["count"] == 1
+    assert capsys.readouterr().out == ""
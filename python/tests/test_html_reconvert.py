@@ -0,0 +1,95 @@
+from jsondoc.convert.html import HTML_SECTION_METADATA_KEY, html_to_jsondoc, reconvert
+from tests.test_html_to_jsondoc import compare_jsondoc
+
+PREVIOUS_HTML = """<!DOCTYPE html>
+<html>
+<head><title>Sync test</title></head>
+<body>
+<h1>Heading</h1>
+<p>First <b>paragraph</b></p>
+<ul><li>one</li><li>two</li></ul>
+<p>Last paragraph</p>
+</body>
+</html>
+"""
+
+NEW_HTML = PREVIOUS_HTML.replace(
+    "<ul><li>one</li><li>two</li></ul>",
+    "<ul><li>one</li><li>two</li><li>three</li></ul>",
+)
+
+
+def _strip_section_metadata(page):
+    for block in page.children:
+        block.metadata = None
+    return page
+
+
+def test_annotated_conversion_matches_plain_conversion():
+    annotated = html_to_jsondoc(NEW_HTML, annotate_sections=True)
+    for block in annotated.children:
+        assert HTML_SECTION_METADATA_KEY in block.metadata
+
+    assert compare_jsondoc(
+        _strip_section_metadata(annotated), html_to_jsondoc(NEW_HTML)
+    )
+
+
+def test_reconvert_keeps_unchanged_block_ids():
+    for annotate_sections in [True, False]:
+        previous = html_to_jsondoc(PREVIOUS_HTML, annotate_sections=annotate_sections)
+        previous_ids = [block.id for block in previous.children]
+
+        ret = reconvert(PREVIOUS_HTML, previous, NEW_HTML)
+        ids = [block.id for block in ret.children]
+
+        assert ret.id == previous.id
+        # Title, heading and paragraphs are reused, list items are reconverted
+        assert ids[:3] == previous_ids[:3]
+        assert ids[-1] == previous_ids[-1]
+        assert len(set(ids[3:6]) & set(previous_ids)) == 0
+
+        assert compare_jsondoc(_strip_section_metadata(ret), html_to_jsondoc(NEW_HTML))
+
+
+def test_reconvert_mismatching_previous_jsondoc():
+    previous = html_to_jsondoc("<p>Something else</p><p>entirely</p>")
+
+    ret = reconvert(PREVIOUS_HTML, previous, NEW_HTML)
+
+    assert compare_jsondoc(_strip_section_metadata(ret), html_to_jsondoc(NEW_HTML))
+
+
+def test_reconvert_copies_reused_blocks():
+    previous = html_to_jsondoc(PREVIOUS_HTML, annotate_sections=True)
+    ret = reconvert(PREVIOUS_HTML, previous, NEW_HTML)
+
+    paragraph = ret.children[2]
+    assert paragraph.id == previous.children[2].id
+    paragraph.paragraph.rich_text[0].text.content = "Changed"
+    paragraph.metadata = None
+    assert previous.children[2].paragraph.rich_text[0].text.content == "First "
+    assert HTML_SECTION_METADATA_KEY in previous.children[2].metadata
+
+
+def test_reconvert_wrapped_page():
+    def wrap(html):
+        return html.replace("<body>", "<body>\n<div><main>").replace(
+            "</body>", "</main></div>\n</body>"
+        )
+
+    previous_html = wrap(PREVIOUS_HTML)
+    new_html = wrap(NEW_HTML)
+    previous = html_to_jsondoc(previous_html, annotate_sections=True)
+    # The title, the heading, the paragraphs and the list are separate sections
+    sections = {
+        block.metadata[HTML_SECTION_METADATA_KEY] for block in previous.children
+    }
+    assert len(sections) == 5
+    previous_ids = [block.id for block in previous.children]
+
+    ret = reconvert(previous_html, previous, new_html)
+    ids = [block.id for block in ret.children]
+    assert ids[:3] == previous_ids[:3]
+    assert ids[-1] == previous_ids[-1]
+    assert compare_jsondoc(_strip_section_metadata(ret), html_to_jsondoc(new_html))
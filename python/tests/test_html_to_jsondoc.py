@@ -72,6 +72,22 @@ def _process_example(json_path):
     assert compare_jsondoc(ret, jsondoc_reference), f"file {json_path} does not match"
 
 
+def test_whitespace_normalization():
+    html = "<ul>\n  <li>one  \t two</li>\n  <li>\n three </li>\n</ul><pre>a\t  b</pre>"
+
+    ret = html_to_jsondoc(html)
+
+    assert [block.type for block in ret] == [
+        "bulleted_list_item",
+        "bulleted_list_item",
+        "code",
+    ]
+    assert ret[0].bulleted_list_item.rich_text[0].plain_text == "one two"
+    assert ret[1].bulleted_list_item.rich_text[0].plain_text == "three"
+    # Whitespace is kept inside <pre>
+    assert ret[2].code.rich_text[0].plain_text == "a\t  b"
+
+
 def test_examples():
     current_dir = Path(__file__).parent
     html_jsondoc_pairs_dir = current_dir / "html_jsondoc_pairs"
@@ -0,0 +1,137 @@
+from html.parser import HTMLParser
+from io import StringIO
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.html_out import iter_html, jsondoc_to_html, write_html
+from jsondoc.rules import ALL_BLOCK_TYPES
+from jsondoc.serialize import load_jsondoc
+
+CREATED_TIME = "2024-01-01T00:00:00Z"
+
+
+def _block(id: str, type: str, data: dict, children: list | None = None) -> dict:
+    ret = {"object": "block", "id": id, "type": type, "created_time": CREATED_TIME}
+    ret[type] = data
+    if children is not None:
+        ret["children"] = children
+    return ret
+
+
+def _rich_text(text: str) -> list:
+    return [
+        {
+            "type": "text",
+            "text": {"content": text},
+            "annotations": {},
+            "plain_text": text,
+        }
+    ]
+
+
+class _ElementCollector(HTMLParser):
+    void_elements = {"img", "input"}
+
+    def __init__(self):
+        super().__init__()
+        self.open_elements = []
+        self.classes = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in self.void_elements:
+            self.open_elements.append(tag)
+        self.classes.update(
+            class_name
+            for name, value in attrs
+            if name == "class"
+            for class_name in value.split()
+        )
+
+    def handle_endtag(self, tag):
+        assert self.open_elements.pop() == tag
+
+
+def test_all_block_types():
+    page = load_jsondoc(
+        {
+            "object": "page",
+            "id": "page",
+            "created_time": CREATED_TIME,
+            "properties": {"title": {"title": _rich_text("Title")}},
+            "children": [
+                _block("1", "to_do", {"rich_text": _rich_text("Do"), "checked": True}),
+                _block("2", "toggle", {"rich_text": _rich_text("Toggle")}, []),
+                _block("3", "equation", {"expression": "a < b"}),
+                _block(
+                    "4",
+                    "column_list",
+                    {},
+                    [_block("5", "column", {}, [_block("6", "divider", {})])],
+                ),
+                _block("7", "table_row", {"cells": [_rich_text("cell")]}),
+            ],
+        }
+    )
+    page.children += html_to_jsondoc(
+        "<h1>H1</h1><h2>H2</h2><h3>H3</h3><p>Text</p>"
+        "<ul><li>Bullet</li></ul><ol><li>Number</li></ol>"
+        "<pre><code>code</code></pre><blockquote>Quote</blockquote>"
+        "<img src='https://example.com/a.png'>"
+        "<table><tr><th>A</th></tr><tr><td>1</td></tr></table>"
+    )
+    block_types = set()
+    stack = list(page.children)
+    while stack:
+        block = stack.pop()
+        block_types.add(type(block))
+        stack.extend(getattr(block, "children", None) or [])
+    assert block_types == set(ALL_BLOCK_TYPES)
+
+    ret = jsondoc_to_html(page)
+
+    collector = _ElementCollector()
+    collector.feed(ret)
+    assert collector.open_elements == []
+    assert "notion-unsupported-block" not in collector.classes
+    assert {
+        "json-doc-page-title",
+        "notion-to_do-block",
+        "notion-toggle-block",
+        "notion-equation-block",
+        "notion-column_list-block",
+        "notion-column",
+        "notion-header-block",
+        "notion-sub_header-block",
+        "notion-bulleted_list-block",
+        "notion-numbered_list-block",
+        "notion-code-block",
+        "notion-quote-block",
+        "notion-image-block",
+        "notion-table-block",
+        "notion-divider-block",
+    } <= collector.classes
+    assert "a &lt; b" in ret
+
+
+def test_escaping_and_unsafe_urls():
+    ret = jsondoc_to_html(
+        html_to_jsondoc(
+            '<p>&lt;script&gt; &amp; <a href="https://example.com/?a=1&amp;b=&quot;">'
+            'link</a> <a href="java\tscript:alert(1)">bad</a></p>'
+        )
+    )
+
+    assert "&lt;script&gt; &amp; " in ret
+    assert 'href="https://example.com/?a=1&amp;b=&quot;"' in ret
+    assert "script:" not in ret
+    assert "<span>bad</span>" in ret
+
+
+def test_streaming_matches_convert():
+    page = html_to_jsondoc("<h1>Title</h1><p>a</p><p>b</p>", force_page=True)
+
+    chunks = list(iter_html(page))
+    out = StringIO()
+    write_html(page, out)
+
+    assert len(chunks) == 5
+    assert "".join(chunks) == out.getvalue() == jsondoc_to_html(page)
@@ -1,8 +1,35 @@
+import itertools
+import json
+import random
+import re
+
+import pytest
+
+import jsondoc.convert.markdown as markdown
 from jsondoc.convert.html import html_to_jsondoc
-from jsondoc.convert.markdown import jsondoc_to_markdown
-from jsondoc.serialize import load_jsondoc, load_page
+from jsondoc.convert.markdown import (
+    JsonDocToMarkdownConverter,
+    get_escaper,
+    iter_markdown,
+    jsondoc_to_markdown,
+    write_markdown,
+)
+from jsondoc.serialize import jsondoc_dump_json, load_jsondoc, load_page
 from jsondoc.utils import load_json_file
 
+EXAMPLE_HTML = (
+    "<h1>Title</h1><h3>Sub</h3><p>Some <b>bold</b> text</p>"
+    "<blockquote><p>quoted</p><p>lines</p></blockquote>"
+    "<pre><code>x = 1</code></pre><hr>"
+    "<table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td>2</td></tr></table>"
+    "<p></p>"
+)
+
+EXAMPLE_MARKDOWN_BODY = (
+    "### Sub\n\nSome **bold** text\n\n\n> quoted\n> \n> lines\n\n"
+    "```\nx \\= 1\n```\n\n\n\n---\n\n\n\n| A | B |\n| --- | --- |\n| 1 | 2 |\n\n"
+)
+
 
 def test_convert_jsondoc_to_markdown():
     path = "../schema/page/ex1_success.json"
@@ -12,5 +39,132 @@ def test_convert_jsondoc_to_markdown():
     print(jsondoc_to_markdown(page))
 
 
+def test_markdown_output():
+    page = html_to_jsondoc(EXAMPLE_HTML, force_page=True)
+
+    assert jsondoc_to_markdown(page) == "Title\n=====\n\n" + EXAMPLE_MARKDOWN_BODY
+    assert jsondoc_to_markdown(
+        page, heading_style="atx_closed"
+    ) == "# Title #\n\n" + EXAMPLE_MARKDOWN_BODY.replace("### Sub", "### Sub ###")
+    # Lists of blocks are separated by blank lines
+    assert jsondoc_to_markdown(page.children[:2]) == "Title\n=====\n\n\n\n### Sub\n\n"
+
+
+def test_streaming_markdown_output(tmp_path):
+    page = html_to_jsondoc(EXAMPLE_HTML, force_page=True)
+
+    for jsondoc in [page, page.children, page.children[2]]:
+        expected = jsondoc_to_markdown(jsondoc)
+        assert "".join(iter_markdown(jsondoc)) == expected
+
+        path = tmp_path / "out.md"
+        with open(path, "w") as f:
+            write_markdown(jsondoc, f)
+        assert path.read_text() == expected
+
+    # One chunk per non-empty top-level block
+    assert len(list(iter_markdown(page))) == len(page.children) - 1
+
+
+def test_parallel_convert_page(monkeypatch):
+    page = html_to_jsondoc(EXAMPLE_HTML * 20, force_page=True)
+    page_dict = json.loads(jsondoc_dump_json(page))
+    converter = JsonDocToMarkdownConverter(heading_style="atx")
+    expected = converter.convert_page(page)
+
+    monkeypatch.setattr(markdown, "PARALLEL_MIN_BLOCKS", 10)
+    monkeypatch.setattr(markdown, "PARALLEL_MIN_CHUNK_SIZE", 7)
+    assert len(converter._get_parallel_chunks(page_dict["children"], 2)) == 8
+    assert converter._get_parallel_chunks(page_dict["children"], 1) is None
+
+    assert converter.convert_page(page_dict, workers=2) == expected
+    assert converter.convert_page(json.dumps(page_dict), workers=2) == expected
+    assert converter.convert_page(page, workers=2) == expected
+
+    # Invalid pages raise the same errors as when they're rendered serially
+    for invalid_page in [
+        {**page_dict, "object": "block"},
+        {**page_dict, "children": [*page_dict["children"], {"type": "paragraph"}]},
+    ]:
+        with pytest.raises(ValueError) as serial_error:
+            converter.convert_page(invalid_page)
+        with pytest.raises(ValueError) as parallel_error:
+            converter.convert_page(invalid_page, workers=2)
+        assert str(parallel_error.value) == str(serial_error.value)
+
+
+def test_markdown_budget():
+    page = html_to_jsondoc(EXAMPLE_HTML, force_page=True)
+    chunks = list(iter_markdown(page))
+
+    converter = JsonDocToMarkdownConverter(max_chars=len(chunks[0] + chunks[1]) + 1)
+    assert converter.convert(page) == chunks[0] + chunks[1]
+    assert converter.stopped_at_block_id == page.children[2].id
+    assert converter.convert_page(page) == chunks[0] + chunks[1]
+    assert "".join(converter.iter_markdown(page)) == chunks[0] + chunks[1]
+
+    converter = JsonDocToMarkdownConverter(
+        max_units=4, length_function=lambda text: len(text.split())
+    )
+    assert converter.convert(page) == chunks[0] + chunks[1]
+    assert converter.stopped_at_block_id == page.children[2].id
+
+    converter = JsonDocToMarkdownConverter(max_chars=10000)
+    assert converter.convert(page) == "".join(chunks)
+    assert converter.stopped_at_block_id is None
+
+
+def _reference_escape(text, escape_misc, escape_asterisks, escape_underscores):
+    if escape_misc:
+        text = re.sub(r"([\\&<`[>~#=+|-])", r"\\\1", text)
+        text = re.sub(r"([0-9])([.)])", r"\1\\\2", text)
+    if escape_asterisks:
+        text = text.replace("*", r"\*")
+    if escape_underscores:
+        text = text.replace("_", r"\_")
+    return text
+
+
+def test_escape():
+    rng = random.Random(0)
+    alphabet = "ab 19.)\\&<`[>~#=+|-*_"
+    texts = ["1. item", "2) item", "a.b", "x_y*z", "\\*"] + [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        for _ in range(500)
+    ]
+
+    for flags in itertools.product([True, False], repeat=3):
+        escape = get_escaper(*flags)
+        for text in texts:
+            assert escape(text) == _reference_escape(text, *flags)
+
+    # Escapers are shared across converters
+    assert JsonDocToMarkdownConverter()._escape is JsonDocToMarkdownConverter()._escape
+
+
 if __name__ == "__main__":
     test_convert_jsondoc_to_markdown()
+
+
+def test_legacy_block_handlers():
+    class LegacyConverter(JsonDocToMarkdownConverter):
+        def convert_paragraph_block(self, block, convert_as_inline):
+            text = self.convert_rich_text_list_to_markdown(block.paragraph.rich_text)
+            return f"<p>{text}</p>"
+
+        def convert_heading_n_block(self, n, block, convert_as_inline):
+            return f"h{n}\n\n"
+
+    page = html_to_jsondoc("<h2>Title</h2><p>Text</p>", force_page=True)
+    assert LegacyConverter().convert(page) == "h2\n\n<p>Text</p>"
+
+
+def test_table_cells():
+    html = "<table><tr><td> <b>a</b> \n b </td><td>\n</td><td>x<br>y</td></tr></table>"
+    jsondoc = html_to_jsondoc(html)
+    converter = JsonDocToMarkdownConverter()
+    expected = "|"
+    for cell in jsondoc.children[0].table_row.cells:
+        text = converter.convert_rich_text_list_to_markdown(cell)
+        expected += " " + text.strip().replace("\n", " ") + " |"
+    assert converter.convert(jsondoc).strip() == expected
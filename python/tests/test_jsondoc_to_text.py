@@ -0,0 +1,70 @@
+from io import StringIO
+
+from jsondoc.convert.budget import RenderBudget
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.text import iter_text, jsondoc_to_text, write_text
+from jsondoc.convert.utils import create_page
+
+HTML = (
+    "<p>Some <b>bold</b> text</p>"
+    "<ul><li>Item<ul><li>Nested</li></ul></li></ul>"
+    "<figure><img src='https://example.com/a.png'>"
+    "<figcaption>Caption</figcaption></figure>"
+    "<table><tr><th>A</th><th>B</th></tr><tr><td>1</td><td></td></tr></table>"
+)
+
+
+def _create_page():
+    return create_page(title="Title", children=html_to_jsondoc(HTML))
+
+
+def test_jsondoc_to_text():
+    page = _create_page()
+
+    assert jsondoc_to_text(page) == (
+        "Title\n\nSome bold text\n\nItem\n\nNested\n\nCaption\n\nA | B\n\n1 | "
+    )
+    assert jsondoc_to_text(
+        page, separator="\n", include_captions=False, table_mode="cells"
+    ) == ("Title\nSome bold text\nItem\nNested\nA\nB\n1")
+    assert jsondoc_to_text(page, separator=" ", table_mode="skip") == (
+        "Title Some bold text Item Nested Caption"
+    )
+
+    # Rows are skipped outside of tables too
+    row = page.children[-1].children[0]
+    assert jsondoc_to_text(row) == "A | B"
+    assert jsondoc_to_text(row, table_mode="skip") == ""
+
+
+def test_streaming_matches_jsondoc_to_text():
+    page = _create_page()
+
+    chunks = list(iter_text(page, table_mode="tsv"))
+    out = StringIO()
+    write_text(page, out, table_mode="tsv")
+
+    assert len(chunks) == 4
+    assert "".join(chunks) == out.getvalue()
+    assert out.getvalue() == jsondoc_to_text(page, table_mode="tsv")
+    assert out.getvalue().endswith("A\tB\n\n1\t")
+
+
+def test_text_budget():
+    page = _create_page()
+    full_text = jsondoc_to_text(page)
+
+    # Stops before the nested item, whose text would go over the limit
+    budget = RenderBudget(max_chars=len("Title\n\nSome bold text\n\nItem\n\nNes"))
+    assert jsondoc_to_text(page, budget=budget) == "Title\n\nSome bold text\n\nItem"
+    nested_item = page.children[1].children[0]
+    assert budget.stopped_at_block_id == nested_item.id
+
+    # Budgets that fit the whole text don't stop it
+    budget = RenderBudget(max_chars=len(full_text))
+    assert jsondoc_to_text(page, budget=budget) == full_text
+    assert budget.stopped_at_block_id is None
+
+    # Units are counted with the length function, e.g. words
+    ret = jsondoc_to_text(page, max_units=4, length_function=lambda x: len(x.split()))
+    assert ret == "Title\n\nSome bold text"
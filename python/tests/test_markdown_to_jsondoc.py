@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timezone
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.markdown_in import markdown_to_jsondoc
+from jsondoc.serialize import jsondoc_dump_json
+from jsondoc.utils import set_dict_recursive
+
+OPTIONS = {
+    "id_strategy": "counter",
+    "created_time": datetime(2024, 1, 1, tzinfo=timezone.utc),
+}
+
+
+def _dump_without_ids(obj) -> dict:
+    # Counter ids are seeded with a hash of the source, which differs
+    ret = json.loads(jsondoc_dump_json(obj))
+    set_dict_recursive(ret, "id", "")
+    return ret
+
+
+def test_markdown_matches_html_conversion():
+    markdown = (
+        "# Title\n\n"
+        "Some **bold** and *italic* text with a [link](https://example.com)"
+        " and `code`  \n"
+        "after a break\n\n"
+        "> quoted\n\n"
+        "- one\n"
+        "- two\n\n"
+        "1. first\n\n"
+        "2. second\n\n"
+        "```python\n"
+        "print(1)\n"
+        "```\n\n"
+        "---\n\n"
+        "| A | B |\n"
+        "|---|---|\n"
+        "| 1 | 2 |\n"
+    )
+    html = (
+        "<h1>Title</h1>\n"
+        "<p>Some <strong>bold</strong> and <em>italic</em> text with a "
+        '<a href="https://example.com">link</a> and <code>code</code><br />'
+        "after a break</p>\n"
+        "<blockquote>\n<p>quoted</p>\n</blockquote>\n"
+        "<ul>\n<li>one</li>\n<li>two</li>\n</ul>\n"
+        "<ol>\n<li><p>first</p></li>\n<li><p>second</p></li>\n</ol>\n"
+        "<pre><code>print(1)</code></pre>\n"
+        "<hr />\n"
+        "<table>\n<thead>\n<tr><th>A</th><th>B</th></tr>\n</thead>\n"
+        "<tbody>\n<tr><td>1</td><td>2</td></tr>\n</tbody>\n</table>\n"
+    )
+
+    ret = markdown_to_jsondoc(markdown, force_page=True, **OPTIONS)
+    expected = html_to_jsondoc(html, force_page=True, **OPTIONS)
+
+    # The HTML path doesn't get the language of code blocks
+    assert ret.children[8].code.language.value == "python"
+    ret.children[8].code.language = None
+    assert _dump_without_ids(ret) == _dump_without_ids(expected)
+
+
+def test_markdown_example_file():
+    with open("../examples/markdown/markdown_syntax_ex1.md", "r") as file:
+        content = file.read()
+
+    page = markdown_to_jsondoc(
+        content, force_page=True, smart=True, implicit_figures=True
+    )
+
+    assert page.properties.title.title[0].plain_text == "h1 Heading"
+    block_types = {block.type for block in page.children}
+    assert {"heading_1", "quote", "code", "table", "image"} <= block_types
+    image = next(block for block in page.children if block.type == "image")
+    assert image.image.caption[0].plain_text == "Alt text"
+
+
+def test_inline_edge_cases():
+    ret = markdown_to_jsondoc('"Quotes" -- and...', smart=True)
+    assert ret.paragraph.rich_text[0].plain_text == "“Quotes” – and…"
+
+    # Nested emphasis keeps the order of the text
+    ret = markdown_to_jsondoc("**a *b* c** ~~d~~")
+    assert [
+        (
+            rich_text.plain_text,
+            rich_text.annotations.bold,
+            rich_text.annotations.italic,
+            rich_text.annotations.strikethrough,
+        )
+        for rich_text in ret.paragraph.rich_text
+    ] == [
+        ("a ", True, None, None),
+        ("b", True, True, None),
+        (" c", True, None, None),
+        (" ", None, None, None),
+        ("d", None, None, True),
+    ]
+
+    # Deeply nested emphasis doesn't hit the recursion limit
+    ret = markdown_to_jsondoc("*a " * 2000 + "b*" * 2000)
+    assert ret.paragraph.rich_text[-1].annotations.italic
+    ret = markdown_to_jsondoc("*a **" * 2000 + "b" + "** a*" * 2000)
+    assert ret.paragraph.rich_text[-1].annotations.italic
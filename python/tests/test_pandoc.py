@@ -0,0 +1,155 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+import pytest
+
+from jsondoc.bin.batch import convert_directory
+from jsondoc.bin.convert_jsondoc import (
+    convert_content,
+    convert_many_contents,
+    convert_to_jsondoc,
+    is_pandoc_format,
+)
+from jsondoc.bin.jsonl import convert_jsonl
+from jsondoc.convert import pandoc
+from jsondoc.convert.pandoc import PandocClient, PandocTimeoutError, set_pandoc_servers
+
+
+class PandocServerHandler(BaseHTTPRequestHandler):
+    """
+    Answers like pandoc-server, wrapping the text in a paragraph
+    """
+
+    # Number of documents of each request
+    request_sizes = []
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        requests = data if self.path == "/batch" else [data]
+        self.request_sizes.append(len(requests))
+        results = []
+        for request in requests:
+            if request["text"] == "slow":
+                time.sleep(0.5)
+            if request["from"] == "unknown":
+                results.append("Unknown input format unknown")
+            else:
+                port = self.server.server_address[1]
+                output = f"<p>{request['text']} {port}</p>"
+                results.append({"output": output, "base64": False, "messages": []})
+
+        body = json.dumps(results if self.path == "/batch" else results[0])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_urls():
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), PandocServerHandler)]
+    servers.append(ThreadingHTTPServer(("127.0.0.1", 0), PandocServerHandler))
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pandoc_client(server_urls):
+    port_1, port_2 = [url.rsplit(":", 1)[1] for url in server_urls]
+    client = PandocClient(server_urls, timeout=0.35, batch_size=2)
+
+    # Servers take turns
+    assert client.convert_text("a", "rst") == f"<p>a {port_1}</p>"
+    assert client.convert_text(b"b", "rst") == f"<p>b {port_2}</p>"
+
+    # Batches of at most batch_size documents take turns too
+    results = client.convert_many([("a", "rst"), ("b", "org"), ("c", "unknown")])
+    assert results[:2] == [f"<p>a {port_1}</p>", f"<p>b {port_1}</p>"]
+    assert "Unknown input format" in str(results[2])
+
+    with pytest.raises(PandocTimeoutError):
+        client.convert_text("slow", "rst")
+    # The timeout of a batch is the timeout per document times its size
+    results = client.convert_many([("slow", "rst"), ("d", "rst")])
+    assert results[0].startswith("<p>slow ")
+
+
+def test_pandoc_client_fallback(monkeypatch):
+    calls = []
+
+    def convert_with_subprocess(input_file, format, content=None, timeout=None):
+        calls.append((input_file, format, content, timeout))
+        return "<p>subprocess</p>"
+
+    monkeypatch.setattr(pandoc, "_convert_with_subprocess", convert_with_subprocess)
+
+    # Nothing listens on port 9, so the subprocess path is used instead
+    client = PandocClient(["http://127.0.0.1:9"], timeout=5)
+    assert client.convert_text("a", "rst") == "<p>subprocess</p>"
+    assert client.convert_many([("b", "rst")]) == ["<p>subprocess</p>"]
+    assert PandocClient(timeout=6).convert_file("a.rst", None) == "<p>subprocess</p>"
+    # The subprocess is killed after the timeout too
+    assert calls == [
+        (None, "rst", "a", 5),
+        (None, "rst", "b", 5),
+        ("a.rst", None, None, 6),
+    ]
+
+
+def test_batched_conversions(server_urls, tmp_path):
+    set_pandoc_servers(server_urls, batch_size=2)
+    try:
+        input_dir = tmp_path / "src"
+        input_dir.mkdir()
+        for name in ["a", "b", "c"]:
+            (input_dir / f"{name}.rst").write_text(name)
+        (input_dir / "d.html").write_text("<p>d</p>")
+
+        PandocServerHandler.request_sizes = []
+        summary = convert_directory(
+            convert_to_jsondoc,
+            str(input_dir),
+            str(tmp_path / "out"),
+            progress=None,
+            convert_many_fn=convert_many_contents,
+            batch_size=2,
+        )
+        assert len(summary.converted) == 4
+        assert sorted(PandocServerHandler.request_sizes) == [1, 2]
+        output = json.loads((tmp_path / "out" / "c.json").read_text())
+        assert output["paragraph"]["rich_text"][0]["plain_text"].startswith("c ")
+
+        PandocServerHandler.request_sizes = []
+        records = [
+            {"id": 1, "format": "rst", "content": "a"},
+            {"id": 2, "format": "rst", "content": "b"},
+            {"id": 3, "format": "html", "content": "<p>c</p>"},
+            {"id": 4, "format": "rst", "content": "d"},
+        ]
+        output = StringIO()
+        convert_jsonl(
+            convert_content,
+            StringIO("\n".join(json.dumps(record) for record in records)),
+            output,
+            convert_many_fn=convert_many_contents,
+            batch_size=2,
+            is_batched_format=is_pandoc_format,
+        )
+        assert [json.loads(line)["id"] for line in output.getvalue().splitlines()] == [
+            1,
+            2,
+            3,
+            4,
+        ]
+        assert PandocServerHandler.request_sizes == [2, 1]
+    finally:
+        set_pandoc_servers(None)
@@ -0,0 +1,101 @@
+from pydantic import BaseModel
+
+from jsondoc.convert.html import html_to_jsondoc
+from jsondoc.convert.utils import create_page
+from jsondoc.models.block.base import BlockBase
+from jsondoc.models.block.types.rich_text.base import RichTextBase
+from jsondoc.utils import regenerate_ids, set_created_by, set_field_recursive
+from jsondoc.utils.block import extract_blocks
+from jsondoc.utils.visitor import transform, visit, walk
+
+HTML = (
+    "<p>First <b>bold</b></p>"
+    "<ul><li>Item<ul><li>Nested 1</li><li>Nested 2</li></ul></li></ul>"
+    "<p>Last</p>"
+)
+
+
+def _create_page():
+    return create_page(title="Title", children=html_to_jsondoc(HTML))
+
+
+def test_walk_and_visit():
+    page = _create_page()
+    blocks = list(extract_blocks(page).values())
+    assert list(walk(page, BlockBase)) == blocks
+
+    # A block referenced twice is visited once
+    page.children.append(page.children[0])
+    visited = []
+    visit(page, {BlockBase: visited.append, RichTextBase: visited.append})
+    assert [b for b in visited if isinstance(b, BlockBase)] == blocks
+    # The title and the text of the blocks
+    assert len([t for t in visited if isinstance(t, RichTextBase)]) == 7
+
+    set_created_by(page, "user-1")
+    assert page.created_by.id == "user-1"
+    assert all(block.created_by.id == "user-1" for block in blocks)
+
+    data = {"created_by": "a", "children": [{"created_by": "b"}, 1]}
+    set_field_recursive(data, "created_by", "c")
+    assert data == {"created_by": "c", "children": [{"created_by": "c"}, 1]}
+
+
+def test_transform():
+    page = _create_page()
+    paragraph, item, last = page.children
+    ids = list(extract_blocks(page))
+
+    new_page = regenerate_ids(page, copy=True)
+    assert list(extract_blocks(page)) == ids
+    assert new_page.id != page.id
+    assert set(extract_blocks(new_page)).isdisjoint(ids)
+    # Rich text isn't copied
+    assert new_page.children[0].paragraph is paragraph.paragraph
+
+    # Only the path to a replaced block is copied
+    def replace_nested_2(block):
+        if block.id == item.children[1].id:
+            return block.model_copy(update={"id": "nested-2"})
+
+    new_page = transform(page, {BlockBase: replace_nested_2}, copy=True)
+    assert new_page is not page
+    new_paragraph, new_item, new_last = new_page.children
+    assert new_paragraph is paragraph and new_last is last
+    assert new_item is not item
+    assert new_item.children[0] is item.children[0]
+    assert new_item.children[1].id == "nested-2"
+    assert item.children[1].id != "nested-2"
+
+    # In place, the page is edited
+    assert regenerate_ids(page) is page
+    assert page.children[0] is paragraph
+    assert set(extract_blocks(page)).isdisjoint(ids)
+
+
+def test_walk_new_model_classes():
+    class Holder(BaseModel):
+        value: int = 0
+
+    holder = Holder()
+    assert list(walk(holder, BlockBase)) == []
+
+    # A subclass defined after the walk can hold blocks
+    class BlockHolder(Holder):
+        block: BlockBase
+
+    paragraph = html_to_jsondoc("<p>Text</p>")
+    assert list(walk([holder, BlockHolder(block=paragraph)], BlockBase)) == [paragraph]
+
+    # So can a subclass of a field's class, defined after the field's class
+    # was found to hold no targets
+    class Container(BaseModel):
+        item: Holder
+
+    assert list(walk(Container(item=holder), BlockBase)) == []
+
+    class OtherBlockHolder(Holder):
+        block: BlockBase
+
+    container = Container(item=OtherBlockHolder(block=paragraph))
+    assert list(walk(container, BlockBase)) == [paragraph]